@@ -0,0 +1,151 @@
+"""
+Bookmark aliases and chained bookmarks, flattened at load time.
+
+In bunnify.json a bookmark can list other keys for itself (``"aliases": ["pull"]``)
+or build on another bookmark (``"extends": "pr"``), inheriting its fields and
+overriding some of them, typically ``defaults``. ``load_bookmarks`` flattens these
+into ordinary bookmarks, so a request is still a single lookup and nothing is
+chained at request time. Like the resolver, this module has no Django imports.
+"""
+from __future__ import annotations
+
+import logging
+from typing import Any
+
+# Get logger for this module
+logger = logging.getLogger(__name__)
+
+# Fields a chained bookmark inherits from the bookmark it extends
+INHERITED_FIELDS = ('description', 'url', 'old-url', 'oldurl', 'cache')
+
+
+class AliasError(ValueError):
+    """
+    A bunnify.json whose aliases or chains cannot be flattened; ``message`` is shown to the user
+    """
+    code = 'alias_error'
+
+    def __init__(self, message: str, key: str) -> None:
+        super().__init__(message)
+        self.message = message
+        self.key = key
+
+
+class UnknownReference(AliasError):
+    code = 'unknown_reference'
+
+
+class ChainCycle(AliasError):
+    code = 'chain_cycle'
+
+    def __init__(self, cycle: list[str]) -> None:
+        super().__init__(f"Bookmark chain has a cycle: {' → '.join(cycle)}", cycle[0])
+        self.cycle = cycle
+
+
+class AliasCollision(AliasError):
+    code = 'alias_collision'
+
+
+def alias_owners(data: dict[str, dict[str, Any]]) -> dict[str, str]:
+    """Map every alias to the key that declares it; raises AliasCollision"""
+    owners: dict[str, str] = {}
+    for key, entry in data.items():
+        for alias in entry.get('aliases') or []:
+            if alias in data:
+                raise AliasCollision(f"Alias '{alias}' of '{key}' is also a bookmark key", alias)
+            if alias in owners:
+                raise AliasCollision(f"Alias '{alias}' is declared by both '{owners[alias]}' and '{key}'", alias)
+            owners[alias] = key
+    return owners
+
+
+def extend(base: dict[str, Any], entry: dict[str, Any]) -> dict[str, Any]:
+    """A chained entry's own fields on top of the flattened bookmark it extends"""
+    flat = {field: base[field] for field in INHERITED_FIELDS if field in base}
+    flat.update({field: entry[field] for field in INHERITED_FIELDS if field in entry})
+    defaults = {**(base.get('defaults') or {}), **(entry.get('defaults') or {})}
+    if defaults:
+        flat['defaults'] = defaults
+    return flat
+
+
+def concrete(entry: dict[str, Any]) -> dict[str, Any]:
+    """An entry without chain fields, as stored"""
+    return {field: value for field, value in entry.items() if field not in ('extends', 'aliases')}
+
+
+class ChainResolver:
+    """
+    Flattens aliases and chains, recomputing only the chains affected by a change.
+
+    The resolver remembers the raw entries and flattened bookmarks of its previous
+    call, so a long-running ``watch_bookmarks`` process only rebuilds bookmarks
+    whose own entry or an entry they extend changed.
+    """
+
+    def __init__(self) -> None:
+        self.raw: dict[str, dict[str, Any]] = {}
+        self.flat: dict[str, dict[str, Any]] = {}
+        self.recomputed = 0
+
+    def resolve(self, data: dict[str, dict[str, Any]]) -> dict[str, dict[str, Any]]:
+        """
+        Concrete bookmarks for a parsed bunnify.json: every key and alias mapped to
+        a plain entry with a url. Raises an AliasError subclass for unknown
+        references, cycles and colliding aliases.
+        """
+        owners = alias_owners(data)
+        changed = {key for key, entry in data.items() if self.raw.get(key) != entry}
+        changed.update(key for key in self.raw if key not in data)
+
+        flat: dict[str, dict[str, Any]] = {}
+        dirty: dict[str, bool] = {}
+        recomputed = 0
+        for key in data:
+            if key in flat:
+                continue
+            # Walk up the chain to the first bookmark already flattened (or a root)
+            chain = [key]
+            while True:
+                parent = data[chain[-1]].get('extends')
+                if parent is None:
+                    break
+                target = owners.get(parent, parent)
+                if target not in data:
+                    raise UnknownReference(f"Bookmark '{chain[-1]}' extends unknown bookmark '{parent}'", chain[-1])
+                if target in chain:
+                    raise ChainCycle(chain[chain.index(target):] + [target])
+                if target in flat:
+                    chain.append(target)
+                    break
+                chain.append(target)
+            # Flatten from the root down; a bookmark is dirty if it or anything above it changed
+            for position in range(len(chain) - 1, -1, -1):
+                current = chain[position]
+                if current in flat:
+                    continue
+                parent = chain[position + 1] if position + 1 < len(chain) else None
+                dirty[current] = current in changed or (parent is not None and dirty[parent])
+                if not dirty[current] and current in self.flat:
+                    flat[current] = self.flat[current]
+                    continue
+                recomputed += 1
+                entry = data[current]
+                flat[current] = extend(flat[parent], entry) if parent is not None else concrete(entry)
+                if 'url' not in flat[current] or 'description' not in flat[current]:
+                    raise AliasError(f"Bookmark '{current}' needs a url and description, or extends", current)
+
+        for alias, owner in owners.items():
+            flat[alias] = flat[owner]
+
+        self.raw = data
+        self.flat = {key: entry for key, entry in flat.items() if key in data}
+        self.recomputed = recomputed
+        logger.debug(f"Flattened {len(flat)} bookmarks ({len(owners)} aliases), recomputed {recomputed}")
+        return flat
+
+
+def flatten_bookmarks(data: dict[str, dict[str, Any]]) -> dict[str, dict[str, Any]]:
+    """Flatten aliases and chains of a parsed bunnify.json, without reusing earlier results"""
+    return ChainResolver().resolve(data)
@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class BookmarksConfig(AppConfig):
     name = 'bookmarks'
+
+    def ready(self) -> None:
+        # Connect the signal handlers that keep the in-memory snapshot fresh
+        from . import snapshot  # noqa: F401
@@ -0,0 +1,120 @@
+"""
+Offline query resolution for ``manage.py resolve``.
+
+Resolving a query only needs the compiled snapshot file that ``load_bookmarks``
+writes, so ``manage.py`` dispatches ``resolve`` here before importing Django.
+This keeps startup to roughly the cost of the Python interpreter, which is fast
+enough for shell aliases and per-keystroke editor integrations.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, TextIO
+
+from .resolver import CompiledBookmark, ResolveError, error_details, resolve_query
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterable
+
+# Same default as settings.BUNNIFY_SNAPSHOT_FILE, without loading the settings
+DEFAULT_SNAPSHOT_FILE = Path(__file__).resolve().parent.parent / 'bunnify.snapshot.json'
+
+
+def snapshot_file_path() -> Path:
+    return Path(os.environ.get('BUNNIFY_SNAPSHOT_FILE', DEFAULT_SNAPSHOT_FILE))
+
+
+def load_snapshot_file(path: Path) -> dict[str, CompiledBookmark]:
+    """Read the bookmarks of a snapshot file written by load_bookmarks"""
+    data = json.loads(path.read_text(encoding='utf-8'))
+    return {
+        key: CompiledBookmark.compile(key, entry['description'], entry['url'], entry.get('defaults'), entry.get('cache'))
+        for key, entry in data['bookmarks'].items()
+    }
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    """Arguments shared by the fast entry point and the Django management command"""
+    parser.add_argument(
+        'queries',
+        nargs='*',
+        help='Queries to resolve, e.g. "pr 12345 org/repo". Reads one query per line from stdin if omitted'
+    )
+    parser.add_argument(
+        '--snapshot',
+        type=str,
+        default=None,
+        help='Path to the compiled snapshot file (default: BUNNIFY_SNAPSHOT_FILE)'
+    )
+    parser.add_argument(
+        '--json',
+        action='store_true',
+        help='Print one JSON object per query, in the format of POST /api/resolve/'
+    )
+
+
+def iter_queries(queries: list[str], stdin: TextIO) -> Iterable[str]:
+    """Queries from argv, or one per line from stdin"""
+    if queries:
+        yield from queries
+    else:
+        for line in stdin:
+            if line.strip():
+                yield line.rstrip('\n')
+
+
+def resolve_all(
+    queries: Iterable[str],
+    lookup: Callable[[str], CompiledBookmark | None],
+    stdout: TextIO,
+    stderr: TextIO,
+    as_json: bool = False,
+    fallback_key: str | None = None,
+) -> int:
+    """
+    Resolve queries and print one line per query (the URL, or an empty line on error,
+    so output stays aligned with input). Returns the process exit code.
+    """
+    exit_code = 0
+    for query in queries:
+        result: dict[str, Any]
+        try:
+            result = {'query': query, 'url': resolve_query(query, lookup, fallback_key)}
+        except ResolveError as e:
+            result = {'query': query, 'error': error_details(e)}
+            exit_code = 1
+            if not as_json:
+                stderr.write(f"{query}: {e.message}\n")
+        if as_json:
+            stdout.write(json.dumps(result) + '\n')
+        else:
+            stdout.write(result.get('url', '') + '\n')
+    stdout.flush()
+    return exit_code
+
+
+def main(argv: list[str]) -> int | None:
+    """
+    Fast entry point for ``manage.py resolve``. Returns None when the snapshot
+    file is unavailable, so the caller falls back to the Django command.
+    """
+    parser = argparse.ArgumentParser(prog='manage.py resolve', description='Resolve bookmark queries to URLs')
+    add_arguments(parser)
+    options = parser.parse_args(argv)
+    path = Path(options.snapshot) if options.snapshot else snapshot_file_path()
+    try:
+        bookmarks = load_snapshot_file(path)
+    except (OSError, ValueError, KeyError):
+        return None
+    return resolve_all(
+        iter_queries(options.queries, sys.stdin),
+        bookmarks.get,
+        sys.stdout,
+        sys.stderr,
+        options.json,
+        os.environ.get('BUNNIFY_FALLBACK_KEY', ''),
+    )
@@ -0,0 +1,221 @@
+"""
+Unix-socket resolver for shell integrations.
+
+``bunny pr<TAB>`` cannot afford an HTTP request and a Django request cycle per
+keystroke. ``manage.py serve_socket`` (started by bunnify-server) answers a line
+protocol on a Unix domain socket from the same in-memory snapshot as the web
+views, so a completion is a couple of dictionary lookups. One request per line:
+
+    resolve <query>    the URL /search/?q=<query> would redirect to
+    keys <prefix>      bookmark keys starting with prefix
+    params <query>     previously used values of the parameter being typed
+    ns <name>          use a personal namespace for the rest of the connection
+    ping               the current bookmark generation
+
+Every response is a header line, ``ok <count>`` followed by ``count`` lines, or a
+single ``error <code> <message>`` line. Lines answering ``keys`` and ``params``
+are ``<value>\\t<description>``. Shells keep one connection open, so a
+completion is a single round trip without connection setup.
+"""
+from __future__ import annotations
+
+import bisect
+import errno
+import logging
+import os
+import socket
+import socketserver
+import threading
+from collections import OrderedDict
+from typing import TYPE_CHECKING
+
+from django.conf import settings
+from django.db import connections
+
+from .history import record_query
+from .resolver import HELP_URL, ResolveError, resolve_query
+from .snapshot import NAMESPACE_PATTERN, BookmarkSnapshot, snapshot_for
+from .suggestions import BASE_URL, parameter_completions
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterable
+    from pathlib import Path
+
+    from .snapshot import NamespaceSnapshot
+
+# Get logger for this module
+logger = logging.getLogger(__name__)
+
+# Maximum number of lines answering one keys or params request
+MAX_COMPLETIONS = 500
+
+# Sorted keys of recently used snapshots, by generation, least recently used first
+_key_lists: OrderedDict[str, list[str]] = OrderedDict()
+_key_lists_lock = threading.Lock()
+KEY_LIST_CACHE_SIZE = 16
+
+
+class Session:
+    """
+    State of one client connection
+    """
+    __slots__ = ('namespace',)
+
+    def __init__(self) -> None:
+        self.namespace = ''
+
+
+def _line(text: str) -> str:
+    """A value as one protocol line field (no line breaks or tabs)"""
+    return ' '.join(text.split()) if any(c in text for c in '\t\r\n') else text
+
+
+def ok(lines: Iterable[str] = ()) -> str:
+    lines = list(lines)
+    return ''.join([f'ok {len(lines)}\n', *(f'{line}\n' for line in lines)])
+
+
+def error(code: str, message: str) -> str:
+    return f'error {code} {_line(message)}\n'
+
+
+def sorted_keys(snapshot: BookmarkSnapshot | NamespaceSnapshot) -> list[str]:
+    """Every key of a snapshot in sorted order, computed once per generation"""
+    keys = _key_lists.get(snapshot.generation)
+    if keys is None:
+        if isinstance(snapshot, BookmarkSnapshot):
+            keys = sorted(snapshot.bookmarks)
+        else:
+            keys = sorted(snapshot.base.bookmarks.keys() | snapshot.overrides.keys())
+        with _key_lists_lock:
+            _key_lists[snapshot.generation] = keys
+            while len(_key_lists) > KEY_LIST_CACHE_SIZE:
+                _key_lists.popitem(last=False)
+    return keys
+
+
+def complete_keys(snapshot: BookmarkSnapshot | NamespaceSnapshot, prefix: str, limit: int = MAX_COMPLETIONS) -> list[str]:
+    """Keys starting with ``prefix`` (case-sensitive, like lookups), in key order"""
+    keys = sorted_keys(snapshot)
+    start = bisect.bisect_left(keys, prefix)
+    matches = []
+    for key in keys[start:start + limit]:
+        if not key.startswith(prefix):
+            break
+        matches.append(key)
+    return matches
+
+
+def _resolve(argument: str, session: Session) -> str:
+    snapshot = snapshot_for(session.namespace)
+    try:
+        url = resolve_query(argument, snapshot.get, settings.BUNNIFY_FALLBACK_KEY)
+    except ResolveError as e:
+        return error(e.code, e.message)
+    if url == HELP_URL:
+        return ok([f'{BASE_URL}{HELP_URL}' + (f'?ns={session.namespace}' if session.namespace else '')])
+    record_query(session.namespace, argument, snapshot.get)
+    return ok([url])
+
+
+def _keys(argument: str, session: Session) -> str:
+    snapshot = snapshot_for(session.namespace)
+    lines = []
+    for key in complete_keys(snapshot, argument):
+        bookmark = snapshot.get(key)
+        lines.append(f'{key}\t{_line(bookmark.description) if bookmark else ""}')
+    return ok(lines)
+
+
+def _params(argument: str, session: Session) -> str:
+    completions = parameter_completions(argument, session.namespace, MAX_COMPLETIONS)
+    if completions is None:
+        return ok()
+    _, placeholder, _, values = completions
+    return ok(f'{_line(value)}\t{placeholder}' for value in values)
+
+
+def _namespace(argument: str, session: Session) -> str:
+    if argument and not NAMESPACE_PATTERN.fullmatch(argument):
+        return error('invalid_namespace', f"Invalid namespace '{argument}'")
+    session.namespace = argument
+    return ok()
+
+
+def _ping(argument: str, session: Session) -> str:
+    return ok([snapshot_for(session.namespace).generation])
+
+
+COMMANDS: dict[str, Callable[[str, Session], str]] = {
+    'resolve': _resolve,
+    'keys': _keys,
+    'params': _params,
+    'ns': _namespace,
+    'ping': _ping,
+}
+
+
+def respond(line: str, session: Session) -> str:
+    """The response to one request line"""
+    command, _, argument = line.rstrip('\r\n').partition(' ')
+    handler = COMMANDS.get(command)
+    if handler is None:
+        return error('bad_request', f"Unknown command '{command}' (expected {', '.join(COMMANDS)})")
+    try:
+        return handler(argument, session)
+    except Exception:
+        logger.exception(f"Socket request failed: {line.strip()!r}")
+        return error('internal_error', 'Internal error, see the bunnify log')
+
+
+class ResolverHandler(socketserver.StreamRequestHandler):
+    """
+    Answers the requests of one connection until the client disconnects
+    """
+
+    def handle(self) -> None:
+        session = Session()
+        for raw in self.rfile:
+            try:
+                response = respond(raw.decode('utf-8'), session)
+            except UnicodeDecodeError:
+                response = error('bad_request', 'Request is not UTF-8')
+            try:
+                self.wfile.write(response.encode('utf-8'))
+            except OSError:
+                return
+
+    def finish(self) -> None:
+        super().finish()
+        # Snapshot rebuilds query the database from this connection's thread
+        connections.close_all()
+
+
+class ResolverServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+
+def bind_socket(path: Path) -> ResolverServer:
+    """
+    Listen on ``path``, readable by the current user only. A socket file left by a
+    daemon that died is replaced; raises OSError if another daemon is listening.
+    """
+    if path.is_socket():
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(str(path))
+        except OSError:
+            logger.info(f"Removing stale socket {path}")
+            path.unlink()
+        else:
+            raise OSError(errno.EADDRINUSE, f'Another process is listening on {path}')
+        finally:
+            probe.close()
+    elif path.exists():
+        raise OSError(errno.EEXIST, f'{path} exists and is not a socket')
+
+    umask = os.umask(0o177)
+    try:
+        return ResolverServer(str(path), ResolverHandler)
+    finally:
+        os.umask(umask)
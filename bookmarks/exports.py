@@ -0,0 +1,210 @@
+"""
+Static redirect artifacts, so a front proxy can answer most navigations without Django.
+
+A bookmark generation compiles into:
+
+- ``redirects.map``: nginx ``map`` blocks for ``/<key>/`` and ``/search/?q=``,
+  to be ``include``d in the ``http`` block
+- ``html/<key>/index.html``: a tiny redirect page per parameterless bookmark,
+  for any static file server
+- ``redirects.json``: every fixed redirect and single-parameter prefix, for
+  other proxies and edge workers
+
+Parameterless bookmarks redirect to a fixed URL. Bookmarks whose URL holds one
+placeholder once are prefixes: the value goes between a fixed prefix and suffix.
+nginx passes the value on still URL-encoded, which means the same as the typed
+value only in the query string, so only prefixes whose placeholder sits after
+the ``?`` go into the nginx map. Everything else falls through to Django.
+Like the resolver, this module has no Django imports.
+"""
+from __future__ import annotations
+
+import html
+import json
+import logging
+import os
+import shutil
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from .resolver import PLACEHOLDER_PATTERN, is_browser_url
+
+if TYPE_CHECKING:
+    from .snapshot import BookmarkSnapshot
+
+# Get logger for this module
+logger = logging.getLogger(__name__)
+
+NGINX_FILE = 'redirects.map'
+JSON_FILE = 'redirects.json'
+HTML_DIR = 'html'
+FORMATS = ('nginx', 'html', 'json')
+
+# Characters nginx would read as variables or string delimiters in a map value
+NGINX_UNSAFE = ('$', '"', '\\', '\n', '\r')
+
+
+def nginx_safe(text: str) -> bool:
+    return not any(c in text for c in NGINX_UNSAFE)
+
+
+class Prefix:
+    """A single-parameter bookmark: prefix + value + suffix, and its target without a value"""
+    __slots__ = ('prefix', 'suffix', 'default')
+
+    def __init__(self, prefix: str, suffix: str, default: str | None) -> None:
+        self.prefix = prefix
+        self.suffix = suffix
+        self.default = default
+
+    def to_dict(self) -> dict[str, str | None]:
+        return {'prefix': self.prefix, 'suffix': self.suffix, 'default': self.default}
+
+
+class RedirectExport:
+    """
+    The statically servable redirects of one bookmark generation
+    """
+
+    def __init__(self, snapshot: BookmarkSnapshot) -> None:
+        self.generation = snapshot.generation
+        # Fixed targets and prefixes by key, in key order
+        self.fixed: dict[str, str] = {}
+        self.prefixes: dict[str, Prefix] = {}
+        self.skipped = 0
+        for bookmark in sorted(snapshot.bookmarks.values(), key=lambda b: b.key):
+            if is_browser_url(bookmark.url):
+                # Shown on a page with copy-paste instructions, never redirected
+                self.skipped += 1
+            elif not bookmark.placeholders:
+                self.fixed[bookmark.key] = bookmark.url
+            elif len(bookmark.placeholders) == 1:
+                placeholder = bookmark.placeholders[0]
+                prefix, _, suffix = bookmark.url.partition(f'#{{{placeholder}}}')
+                default = (bookmark.defaults or {}).get(placeholder)
+                self.prefixes[bookmark.key] = Prefix(
+                    prefix,
+                    suffix,
+                    None if default is None else prefix + default + suffix,
+                )
+            else:
+                self.skipped += 1
+
+    def nginx_prefixes(self) -> dict[str, Prefix]:
+        """Prefixes whose value lands in the query string, where its URL encoding can be passed on"""
+        return {
+            key: prefix
+            for key, prefix in self.prefixes.items()
+            if '?' in prefix.prefix and not PLACEHOLDER_PATTERN.search(prefix.suffix)
+        }
+
+    def nginx(self) -> str:
+        def quote(url: str) -> str:
+            return f'"{url}"'
+
+        fixed = {key: url for key, url in self.fixed.items() if nginx_safe(url)}
+        prefixes = {
+            key: prefix
+            for key, prefix in self.nginx_prefixes().items()
+            if nginx_safe(prefix.prefix + prefix.suffix + (prefix.default or ''))
+        }
+        lines = [
+            '# Bunnify redirects, generated by `manage.py export_redirects`: do not edit.',
+            f'# Generation {self.generation}: {len(fixed)} fixed redirects, {len(prefixes)} prefixes.',
+            '# Include in the http block; requests these maps leave empty (and any ?ns=) go to Django.',
+            '',
+            'map "$arg_ns:$uri" $bunnify_path_redirect {',
+            '    default "";',
+            *(f'    ":/{key}/" {quote(url)};' for key, url in fixed.items()),
+            '}',
+            '',
+            '# "key" or "key+" (the key followed by a value), with the still URL-encoded value in $bunnify_value',
+            'map "$arg_ns:$arg_q" $bunnify_query {',
+            '    default "";',
+            r'    "~^:(?<bunnify_key>\w+)(?:\+|%20)*$" "$bunnify_key";',
+            r'    "~^:(?<bunnify_key>\w+)(?:\+|%20)+(?<bunnify_value>(?!\+|%20).+)$" "$bunnify_key+";',
+            '}',
+            '',
+            'map $bunnify_query $bunnify_search_redirect {',
+            '    default "";',
+        ]
+        for key, url in fixed.items():
+            lines += [f'    "{key}" {quote(url)};', f'    "{key}+" {quote(url)};']
+        for key, prefix in prefixes.items():
+            if prefix.default is not None:
+                lines.append(f'    "{key}" {quote(prefix.default)};')
+            lines.append(f'    "{key}+" {quote(prefix.prefix + "$bunnify_value" + prefix.suffix)};')
+        lines += ['}', '']
+        return '\n'.join(lines)
+
+    def json(self) -> str:
+        return json.dumps({
+            'generation': self.generation,
+            'redirects': self.fixed,
+            'prefixes': {key: prefix.to_dict() for key, prefix in self.prefixes.items()},
+        }, indent=2) + '\n'
+
+    @staticmethod
+    def html(key: str, url: str) -> str:
+        attribute = html.escape(url, quote=True)
+        script = json.dumps(url).replace('<', '\\u003c')
+        return (
+            '<!DOCTYPE html>\n'
+            '<meta charset="utf-8">\n'
+            f'<title>{html.escape(key)}</title>\n'
+            f'<meta http-equiv="refresh" content="0; url={attribute}">\n'
+            f'<script>location.replace({script})</script>\n'
+            f'<a href="{attribute}">{html.escape(url)}</a>\n'
+        )
+
+    def write(self, directory: Path, formats: tuple[str, ...] = FORMATS) -> dict[str, int]:
+        """Write the artifacts into ``directory``; returns the number of files written per format"""
+        directory.mkdir(parents=True, exist_ok=True)
+        written = {}
+        if 'nginx' in formats:
+            written['nginx'] = int(write_if_changed(directory / NGINX_FILE, self.nginx()))
+        if 'json' in formats:
+            written['json'] = int(write_if_changed(directory / JSON_FILE, self.json()))
+        if 'html' in formats:
+            written['html'] = self.write_html(directory / HTML_DIR)
+        return written
+
+    def write_html(self, directory: Path) -> int:
+        """One index.html per parameterless key; pages of removed keys are deleted"""
+        directory.mkdir(parents=True, exist_ok=True)
+        written = sum(
+            write_if_changed(directory / key / 'index.html', self.html(key, url))
+            for key, url in self.fixed.items()
+        )
+        for stale in directory.iterdir():
+            if stale.is_dir() and stale.name not in self.fixed:
+                shutil.rmtree(stale)
+        return written
+
+
+def write_if_changed(path: Path, content: str) -> bool:
+    """
+    Atomically replace a file, unless it already has this content (so its
+    mtime, and a proxy's cache of it, stay valid across unrelated reloads)
+    """
+    data = content.encode()
+    try:
+        if path.read_bytes() == data:
+            return False
+    except OSError:
+        path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f'.{path.name}.{os.getpid()}.tmp')
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+    return True
+
+
+def export_redirects(snapshot: BookmarkSnapshot, directory: Path, formats: tuple[str, ...] = FORMATS) -> RedirectExport:
+    """Compile a bookmark generation into static redirect artifacts in ``directory``"""
+    export = RedirectExport(snapshot)
+    written = export.write(directory, formats)
+    logger.info(
+        f"Exported redirects to {directory}: generation={export.generation}, fixed={len(export.fixed)}, "
+        f"prefixes={len(export.prefixes)}, skipped={export.skipped}, files written={written}"
+    )
+    return export
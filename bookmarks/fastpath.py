@@ -0,0 +1,305 @@
+"""
+Fast-path dispatcher for redirect routes.
+
+``/search/?q=...`` and ``/<key>/`` redirects need none of the Django middleware
+stack (sessions, CSRF, auth, messages). The dispatchers below sit in front of
+the Django WSGI/ASGI application, answer those routes straight from the
+in-memory bookmark snapshot, and fall through to Django for everything else,
+including anything they cannot answer byte-for-byte the same way (non-GET
+methods, special browser URLs that need a rendered page).
+
+With BUNNIFY_SERVER_TIMING the dispatchers send the same Server-Timing phases
+as the views. While profile capture is enabled (BUNNIFY_PROFILE_SAMPLE_RATE, or
+BUNNIFY_PROFILE_HEADER and a request carrying the header) they hand requests
+to Django, where ServerTimingMiddleware samples and profiles them.
+"""
+from __future__ import annotations
+
+import logging
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any
+from urllib.parse import parse_qsl
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.urls import Resolver404, resolve
+
+from . import snapshot as bookmark_snapshot
+from .history import record as record_parameters
+from .history import record_search
+from .profiling import PROFILE_HEADER, timed, timed_request
+from .resolver import (
+    HELP_KEYS,
+    HELP_URL,
+    ResolveError,
+    UnknownKey,
+    find_bookmark,
+    is_browser_url,
+    map_named_parameters,
+    map_parameters,
+    redirect_max_age,
+    split_query,
+    substitute,
+)
+
+if TYPE_CHECKING:
+    from collections.abc import Awaitable, Callable, Iterable
+
+    from .snapshot import BookmarkSnapshot, NamespaceSnapshot
+
+# Get logger for this module
+logger = logging.getLogger(__name__)
+
+# (status, headers, body) of a response answered without Django
+FastResponse = tuple[int, list[tuple[str, str]], bytes]
+
+REASON_PHRASES = {302: 'Found', 304: 'Not Modified', 400: 'Bad Request', 404: 'Not Found'}
+
+
+@lru_cache(maxsize=4096)
+def fast_route(path: str) -> tuple[str, str] | None:
+    """
+    Map a request path to ('search', '') or ('redirect', key) if Django would
+    route it to search_redirect or redirect_bookmark, otherwise None
+    """
+    try:
+        match = resolve(path)
+    except Resolver404:
+        return None
+    if match.view_name == 'bookmarks:search':
+        return ('search', '')
+    if match.view_name == 'bookmarks:redirect':
+        return ('redirect', match.kwargs['key'])
+    return None
+
+
+def request_namespace(query_string: str) -> str:
+    """The personal namespace (?ns=<name>) of a query string, or '' for the shared bookmarks"""
+    if 'ns=' not in query_string:
+        return ''
+    namespace = dict(parse_qsl(query_string)).get('ns', '')
+    return namespace if bookmark_snapshot.NAMESPACE_PATTERN.fullmatch(namespace) else ''
+
+
+@lru_cache(maxsize=1)
+def _default_headers() -> tuple[tuple[str, str], ...]:
+    """Headers Django's security and clickjacking middleware add to every response"""
+    headers = []
+    if settings.SECURE_CONTENT_TYPE_NOSNIFF:
+        headers.append(('X-Content-Type-Options', 'nosniff'))
+    if settings.SECURE_REFERRER_POLICY:
+        headers.append(('Referrer-Policy', settings.SECURE_REFERRER_POLICY))
+    if settings.SECURE_CROSS_ORIGIN_OPENER_POLICY:
+        headers.append(('Cross-Origin-Opener-Policy', settings.SECURE_CROSS_ORIGIN_OPENER_POLICY))
+    headers.append(('X-Frame-Options', settings.X_FRAME_OPTIONS))
+    return tuple(headers)
+
+
+def _response(
+    status: int,
+    body: str = '',
+    location: str | None = None,
+    extra_headers: list[tuple[str, str]] | None = None,
+) -> FastResponse:
+    content = body.encode()
+    # Like Django's HttpResponseNotModified, a 304 carries no Content-Type
+    headers = [('Content-Type', 'text/html; charset=utf-8')] if status != 304 else []
+    if location is not None:
+        headers.append(('Location', location))
+    if extra_headers:
+        headers.extend(extra_headers)
+    headers.append(('Content-Length', str(len(content))))
+    headers.extend(_default_headers())
+    return status, headers, content
+
+
+def answer(
+    route: tuple[str, str],
+    query_string: str,
+    snapshot: BookmarkSnapshot | NamespaceSnapshot,
+    if_none_match: str = '',
+) -> FastResponse | None:
+    """
+    Answer a fast-path route from the snapshot, or return None to let Django handle it
+    """
+    name, key = route
+    params = dict(parse_qsl(query_string, keep_blank_values=True))
+
+    if name == 'search':
+        query = params.get('q', '').strip()
+        logger.info(f"Search redirect request: query='{query}'")
+        if not query:
+            logger.warning("Empty search query received")
+            return _response(404, "No search query provided")
+        key, param_string = split_query(query)
+        if key in HELP_KEYS:
+            logger.info(f"Redirecting to help/list page for key='{key}'")
+            namespace = request_namespace(query_string)
+            return _response(302, location=f'{HELP_URL}?ns={namespace}' if namespace else HELP_URL)
+    else:
+        logger.info(f"Direct bookmark redirect request: key='{key}'")
+        param_string = ''
+
+    try:
+        with timed('lookup'):
+            if name == 'search':
+                bookmark, param_string = find_bookmark(query, snapshot.get, settings.BUNNIFY_FALLBACK_KEY)
+            else:
+                bookmark = snapshot.get(key)
+                if bookmark is None:
+                    raise UnknownKey(key)
+    except UnknownKey as e:
+        logger.warning(f"Bookmark not found: key='{key}'")
+        return _response(404, e.message)
+
+    try:
+        with timed('substitution'):
+            if name == 'search':
+                param_mapping = map_parameters(bookmark, param_string)
+            else:
+                param_mapping = map_named_parameters(bookmark, params)
+            url = substitute(bookmark.url, param_mapping)
+    except ResolveError as e:
+        logger.warning(f"Cannot resolve bookmark '{key}': {e.code}")
+        return _response(e.status, e.message)
+
+    if is_browser_url(url) or not _is_plain_header(url):
+        # Needs the rendered copy-paste page or header encoding; let Django handle it
+        return None
+    logger.info(f"Redirecting to: {url}")
+    namespace = snapshot.namespace if isinstance(snapshot, bookmark_snapshot.NamespaceSnapshot) else ''
+    if name == 'search':
+        record_search(namespace, query, bookmark, param_string, param_mapping)
+    else:
+        record_parameters(namespace, bookmark.key, param_mapping)
+    max_age = redirect_max_age(bookmark, settings.BUNNIFY_REDIRECT_MAX_AGE)
+    if max_age:
+        # Same browser caching rules as views.bookmark_response
+        etag = f'"{snapshot.generation}"'
+        cache_headers = [('Cache-Control', f'private, max-age={max_age}'), ('ETag', etag)]
+        if if_none_match == etag:
+            return _response(304, extra_headers=cache_headers)
+        return _response(302, location=url, extra_headers=cache_headers)
+    return _response(302, location=url)
+
+
+def timed_answer(
+    route: tuple[str, str],
+    query_string: str,
+    snapshot: BookmarkSnapshot | NamespaceSnapshot,
+    if_none_match: str = '',
+    server_timing: bool = False,
+) -> FastResponse | None:
+    """``answer``, with a Server-Timing header of its phases if ``server_timing``"""
+    if not server_timing:
+        return answer(route, query_string, snapshot, if_none_match)
+    with timed_request() as timer:
+        result = answer(route, query_string, snapshot, if_none_match)
+    if result is not None:
+        result[1].append(('Server-Timing', timer.header()))
+    return result
+
+
+class Instrumentation:
+    """The profiling settings the dispatchers honour, read once"""
+    __slots__ = ('server_timing', 'sampling', 'profile_header')
+
+    def __init__(self) -> None:
+        self.server_timing = settings.BUNNIFY_SERVER_TIMING
+        # The middleware samples 1 in N of the requests it sees, so while sampling it must see them all
+        self.sampling = settings.BUNNIFY_PROFILE_SAMPLE_RATE > 0
+        self.profile_header = settings.BUNNIFY_PROFILE_HEADER
+
+    def needs_django(self, profile_header: str | bytes | None) -> bool:
+        """True if the request may be profiled, which only ServerTimingMiddleware does"""
+        return self.sampling or bool(self.profile_header and profile_header)
+
+
+def _is_plain_header(value: str) -> bool:
+    """True if the value can go into a header as-is (latin-1, no line breaks)"""
+    if '\n' in value or '\r' in value:
+        return False
+    try:
+        value.encode('iso-8859-1')
+    except UnicodeEncodeError:
+        return False
+    return True
+
+
+class FastPathWSGI:
+    """
+    WSGI middleware that answers redirect routes before Django sees the request
+    """
+
+    def __init__(self, app: Callable[..., Iterable[bytes]]) -> None:
+        self.app = app
+        self.instrumentation = Instrumentation()
+
+    def __call__(self, environ: dict[str, Any], start_response: Callable[..., Any]) -> Iterable[bytes]:
+        profile_header = environ.get(f"HTTP_{PROFILE_HEADER.upper().replace('-', '_')}")
+        if environ.get('REQUEST_METHOD') == 'GET' and not self.instrumentation.needs_django(profile_header):
+            try:
+                path = environ.get('PATH_INFO', '/').encode('iso-8859-1').decode('utf-8')
+            except UnicodeError:
+                path = None
+            route = fast_route(path) if path else None
+            if route is not None:
+                query_string = environ.get('QUERY_STRING', '')
+                result = timed_answer(
+                    route,
+                    query_string,
+                    bookmark_snapshot.snapshot_for(request_namespace(query_string)),
+                    environ.get('HTTP_IF_NONE_MATCH', ''),
+                    self.instrumentation.server_timing,
+                )
+                if result is not None:
+                    status, headers, body = result
+                    start_response(f'{status} {REASON_PHRASES[status]}', headers)
+                    return [body]
+        return self.app(environ, start_response)
+
+
+class FastPathASGI:
+    """
+    ASGI middleware that answers redirect routes before Django sees the request
+    """
+
+    def __init__(self, app: Callable[..., Awaitable[None]]) -> None:
+        self.app = app
+        self.instrumentation = Instrumentation()
+
+    async def __call__(self, scope: dict[str, Any], receive: Callable[..., Any], send: Callable[..., Any]) -> None:
+        if scope['type'] == 'http' and scope['method'] == 'GET':
+            request_headers = dict(scope.get('headers', []))
+            if self.instrumentation.needs_django(request_headers.get(PROFILE_HEADER.lower().encode())):
+                await self.app(scope, receive, send)
+                return
+            path = scope['path']
+            root_path = scope.get('root_path', '')
+            if root_path and path.startswith(root_path):
+                path = path[len(root_path):]
+            route = fast_route(path)
+            if route is not None:
+                query_string = scope.get('query_string', b'').decode('iso-8859-1')
+                namespace = request_namespace(query_string)
+                snapshot = bookmark_snapshot.current_snapshot(namespace)
+                if snapshot is None:
+                    # Rebuilding touches the ORM, which must not run in the event loop
+                    snapshot = await sync_to_async(bookmark_snapshot.snapshot_for)(namespace)
+                result = timed_answer(
+                    route,
+                    query_string,
+                    snapshot,
+                    request_headers.get(b'if-none-match', b'').decode('iso-8859-1'),
+                    self.instrumentation.server_timing,
+                )
+                if result is not None:
+                    status, headers, body = result
+                    await send({
+                        'type': 'http.response.start',
+                        'status': status,
+                        'headers': [(name.lower().encode(), value.encode('iso-8859-1', 'replace')) for name, value in headers],
+                    })
+                    await send({'type': 'http.response.body', 'body': body})
+                    return
+        await self.app(scope, receive, send)
@@ -0,0 +1,103 @@
+"""
+Bookmarks tracked in a git repository.
+
+``watch_bookmarks --git`` follows bunnify.json in a local checkout or a bare
+mirror: it fetches on an interval and, when a new commit changes the file's
+blob, diffs the old and new bookmarks key by key so that only the changed keys
+are written. The commit that last changed the file is recorded as the
+bookmarks' revision; the generation stays the content hash. Like the resolver,
+this module has no Django imports.
+"""
+from __future__ import annotations
+
+import logging
+import subprocess
+from pathlib import Path
+from typing import Any
+
+# Get logger for this module
+logger = logging.getLogger(__name__)
+
+# Seconds before a git command (e.g. a fetch from an unreachable remote) is abandoned
+GIT_TIMEOUT = 60
+
+
+class GitError(Exception):
+    """A git command failed; the message is git's error output"""
+
+
+class GitSource:
+    """
+    One bookmarks file in a git repository, read straight from the object database
+    (the working tree of a checkout is never touched)
+    """
+
+    def __init__(self, repo: Path, path: str = 'bunnify.json', ref: str | None = None) -> None:
+        self.repo = Path(repo)
+        self.path = path
+        self._ref = ref
+
+    def __str__(self) -> str:
+        return f'{self.repo}:{self.path}'
+
+    def git(self, *args: str) -> bytes:
+        try:
+            result = subprocess.run(
+                ['git', '-C', str(self.repo), *args],
+                capture_output=True,
+                timeout=GIT_TIMEOUT,
+                check=False,
+            )
+        except (OSError, subprocess.TimeoutExpired) as e:
+            raise GitError(f"git {args[0]} failed: {e}") from e
+        if result.returncode != 0:
+            message = result.stderr.decode(errors='replace').strip()
+            raise GitError(message or f"git {' '.join(args)} exited with status {result.returncode}")
+        return result.stdout
+
+    @property
+    def ref(self) -> str:
+        """The ref followed: as given, else the current branch's upstream, else HEAD"""
+        if self._ref is None:
+            try:
+                self._ref = self.git('rev-parse', '--abbrev-ref', '--symbolic-full-name', '@{upstream}').decode().strip()
+            except GitError:
+                self._ref = 'HEAD'
+        return self._ref
+
+    def fetch(self) -> bool:
+        """Fetch from the default remote; False if the repository has no remote"""
+        if not self.git('remote').strip():
+            return False
+        self.git('fetch', '--quiet', '--prune')
+        return True
+
+    def commit(self) -> str:
+        """SHA of the commit the followed ref points at"""
+        return self.git('rev-parse', '--verify', f'{self.ref}^{{commit}}').decode().strip()
+
+    def blob(self, commit: str) -> str:
+        """SHA of the bookmarks file's blob at a commit"""
+        return self.git('rev-parse', '--verify', f'{commit}:{self.path}').decode().strip()
+
+    def read(self, blob: str) -> bytes:
+        return self.git('cat-file', 'blob', blob)
+
+    def last_change(self, commit: str) -> str:
+        """The commit, at or before ``commit``, that last changed the bookmarks file"""
+        return self.git('log', '-1', '--format=%H', commit, '--', self.path).decode().strip() or commit
+
+
+def diff_entries(
+    old: dict[str, dict[str, Any]],
+    new: dict[str, dict[str, Any]],
+) -> tuple[dict[str, dict[str, Any]], list[str]]:
+    """Bookmarks added or changed from ``old`` to ``new``, and the keys removed"""
+    changed = {}
+    for key, entry in new.items():
+        previous = old.get(key)
+        # Entries a chain resolver reused are the same object: skip the deep comparison
+        if previous is not entry and previous != entry:
+            changed[key] = entry
+    removed = [key for key in old if key not in new]
+    return changed, removed
@@ -0,0 +1,172 @@
+"""
+Previously used parameter values, for omnibox completions.
+
+Every resolved redirect (and every command saved by the command palette) records
+the values typed for it, per namespace, bookmark key and placeholder, so one
+user's values are never offered to another. Placeholder defaults and plain-text
+searches sent to the fallback bookmark are not recorded. Recording only puts the
+values on a bounded queue (values are dropped when it is full); a background
+thread updates the index, so redirects never wait for it. The index is in memory
+and capped at BUNNIFY_PARAM_HISTORY_SIZE values, evicting the least recently used one.
+"""
+from __future__ import annotations
+
+import logging
+import queue
+import threading
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any
+
+from django.conf import settings
+
+from .resolver import (
+    HELP_KEYS,
+    ResolveError,
+    find_bookmark,
+    map_parameters,
+    split_query,
+    typed_placeholders,
+)
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Mapping
+
+    from .resolver import BookmarkLike
+
+# Get logger for this module
+logger = logging.getLogger(__name__)
+
+
+class ParameterHistory:
+    """
+    Use counts of parameter values per (namespace, key, placeholder), bounded by LRU eviction
+    """
+
+    def __init__(self, capacity: int) -> None:
+        self.capacity = capacity
+        self._lock = threading.Lock()
+        # (namespace, key, placeholder) -> {value: use count}, least recently used first
+        self._values: dict[tuple[str, str, str], OrderedDict[str, int]] = {}
+        # Every (namespace, key, placeholder, value), least recently used first, for eviction
+        self._lru: OrderedDict[tuple[str, str, str, str], None] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._lru)
+
+    def add(self, namespace: str, key: str, param_mapping: Mapping[str, str]) -> None:
+        with self._lock:
+            for placeholder, value in param_mapping.items():
+                values = self._values.setdefault((namespace, key, placeholder), OrderedDict())
+                values[value] = values.get(value, 0) + 1
+                values.move_to_end(value)
+                entry = (namespace, key, placeholder, value)
+                self._lru[entry] = None
+                self._lru.move_to_end(entry)
+            while len(self._lru) > self.capacity:
+                *old_slot, old_value = self._lru.popitem(last=False)[0]
+                values = self._values[tuple(old_slot)]
+                del values[old_value]
+                if not values:
+                    del self._values[tuple(old_slot)]
+
+    def values(self, namespace: str, key: str, placeholder: str, prefix: str = '', limit: int = 10) -> list[str]:
+        """Values starting with prefix (case-insensitive), most used first, then most recent"""
+        prefix = prefix.lower()
+        with self._lock:
+            values = self._values.get((namespace, key, placeholder))
+            if not values:
+                return []
+            # Most recent first, so the stable sort breaks count ties by recency
+            candidates = [(value, count) for value, count in reversed(values.items()) if value.lower().startswith(prefix)]
+        candidates.sort(key=lambda item: -item[1])
+        return [value for value, _ in candidates[:limit]]
+
+
+history = ParameterHistory(settings.BUNNIFY_PARAM_HISTORY_SIZE)
+_queue: queue.Queue[tuple[str, str, Mapping[str, str]]] = queue.Queue(settings.BUNNIFY_PARAM_HISTORY_QUEUE_SIZE)
+_worker: threading.Thread | None = None
+_worker_lock = threading.Lock()
+# Redirects whose values were dropped because the queue was full
+_dropped = 0
+_dropped_lock = threading.Lock()
+
+
+def _consume() -> None:
+    while True:
+        namespace, key, param_mapping = _queue.get()
+        try:
+            history.add(namespace, key, param_mapping)
+        except Exception:
+            logger.exception(f"Failed to record parameter history for '{key}'")
+        finally:
+            _queue.task_done()
+
+
+def record(namespace: str, key: str, param_mapping: Mapping[str, str]) -> None:
+    """Queue the parameter values of a redirect resolved in ``namespace`` ('' for shared) for the history index"""
+    global _worker
+    if not param_mapping:
+        return
+    if _worker is None:
+        with _worker_lock:
+            if _worker is None:
+                _worker = threading.Thread(target=_consume, name='bunnify-param-history', daemon=True)
+                _worker.start()
+    try:
+        _queue.put_nowait((namespace, key, param_mapping))
+    except queue.Full:
+        global _dropped
+        with _dropped_lock:
+            _dropped += 1
+        logger.debug(f"Parameter history queue full, dropped values for '{key}'")
+
+
+def record_search(
+    namespace: str,
+    query: str,
+    bookmark: BookmarkLike,
+    param_string: str,
+    param_mapping: Mapping[str, str],
+) -> None:
+    """
+    Queue the values typed in a resolved search query. Nothing is recorded for a
+    plain-text search that went to the fallback bookmark, and placeholder
+    defaults are left out.
+    """
+    if bookmark.key != split_query(query)[0]:
+        return
+    record(namespace, bookmark.key, {
+        placeholder: param_mapping[placeholder] for placeholder in typed_placeholders(bookmark, param_string)
+    })
+
+
+def record_query(namespace: str, query: str, lookup: Callable[[str], BookmarkLike | None]) -> None:
+    """Record the parameters of a search query made in ``namespace``, if it resolves"""
+    query = query.strip()
+    if not query or query.split(None, 1)[0] in HELP_KEYS:
+        return
+    try:
+        bookmark, param_string = find_bookmark(query, lookup, settings.BUNNIFY_FALLBACK_KEY)
+        record_search(namespace, query, bookmark, param_string, map_parameters(bookmark, param_string))
+    except ResolveError:
+        pass
+
+
+def suggest_values(namespace: str, key: str, placeholder: str, prefix: str = '', limit: int = 10) -> list[str]:
+    """Previously used values of a bookmark parameter in ``namespace``, best first"""
+    return history.values(namespace, key, placeholder, prefix, limit)
+
+
+def metrics() -> dict[str, Any]:
+    """Parameter history statistics for /api/metrics/"""
+    return {
+        'values': len(history),
+        'capacity': history.capacity,
+        'queued': _queue.qsize(),
+        'dropped': _dropped,
+    }
+
+
+def flush() -> None:
+    """Wait until every queued value is in the index"""
+    _queue.join()
@@ -0,0 +1,239 @@
+"""
+Concurrent liveness checks of bookmark URLs.
+
+A small HTTP/1.1 client on asyncio streams (no third-party dependencies): each host
+gets its own pool of keep-alive connections and a limit on concurrent requests, so
+thousands of URLs are probed in seconds without hammering any single server. Links
+are probed with HEAD and fall back to GET when the server rejects HEAD. Like the
+resolver, this module has no Django imports; ``check_links`` stores the results.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import ssl
+import time
+from typing import TYPE_CHECKING, Any
+from urllib.parse import urlsplit
+
+from .resolver import is_browser_url, substitute, url_placeholders
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+
+    from .resolver import BookmarkLike
+
+# Get logger for this module
+logger = logging.getLogger(__name__)
+
+USER_AGENT = 'bunnify-link-check/1.0'
+
+
+class LinkResult:
+    """
+    Outcome of one URL check: the HTTP status, or the error that prevented one
+    """
+    __slots__ = ('url', 'status', 'error', 'method', 'elapsed')
+
+    def __init__(
+        self,
+        url: str,
+        status: int | None = None,
+        error: str = '',
+        method: str = 'HEAD',
+        elapsed: float = 0.0,
+    ) -> None:
+        self.url = url
+        self.status = status
+        self.error = error
+        self.method = method
+        self.elapsed = elapsed
+
+    @property
+    def ok(self) -> bool:
+        """Redirects count as alive: the host answered for this URL"""
+        return self.status is not None and self.status < 400
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            'url': self.url,
+            'ok': self.ok,
+            'status': self.status,
+            'error': self.error,
+            'method': self.method,
+            'elapsed_ms': round(self.elapsed * 1000, 1),
+        }
+
+    def __repr__(self) -> str:
+        return f"LinkResult(url={self.url!r}, status={self.status!r}, error={self.error!r})"
+
+
+def checkable_url(bookmark: BookmarkLike) -> str | None:
+    """
+    The URL to probe for a bookmark: its URL with every placeholder filled from
+    its defaults. None for browser URLs and placeholders without a default.
+    """
+    if is_browser_url(bookmark.url):
+        return None
+    defaults = bookmark.defaults or {}
+    placeholders = url_placeholders(bookmark.url)
+    if any(placeholder not in defaults for placeholder in placeholders):
+        return None
+    url = substitute(bookmark.url, {placeholder: defaults[placeholder] for placeholder in placeholders})
+    if urlsplit(url).scheme not in ('http', 'https'):
+        return None
+    return url
+
+
+class HostPool:
+    """
+    Keep-alive connections to one scheme://host:port, at most ``limit`` in use at once
+    """
+
+    def __init__(self, scheme: str, host: str, port: int, limit: int, ssl_context: ssl.SSLContext | None) -> None:
+        self.scheme = scheme
+        self.host = host
+        self.port = port
+        self.ssl_context = ssl_context
+        self.semaphore = asyncio.Semaphore(limit)
+        self.idle: list[tuple[asyncio.StreamReader, asyncio.StreamWriter]] = []
+        self.connections_opened = 0
+
+    @property
+    def host_header(self) -> str:
+        default_port = 443 if self.scheme == 'https' else 80
+        return self.host if self.port == default_port else f'{self.host}:{self.port}'
+
+    async def request(self, method: str, target: str) -> int:
+        """Send one request and return the response status (the body is never read)"""
+        async with self.semaphore:
+            if self.idle:
+                reader, writer = self.idle.pop()
+                try:
+                    return await self._exchange(reader, writer, method, target)
+                except (OSError, asyncio.IncompleteReadError, ConnectionError):
+                    pass  # The server closed the idle connection; retry on a new one
+            reader, writer = await asyncio.open_connection(
+                self.host,
+                self.port,
+                ssl=self.ssl_context if self.scheme == 'https' else None,
+                server_hostname=self.host if self.scheme == 'https' else None,
+            )
+            self.connections_opened += 1
+            return await self._exchange(reader, writer, method, target)
+
+    async def _exchange(
+        self,
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter,
+        method: str,
+        target: str,
+    ) -> int:
+        writer.write(
+            f'{method} {target} HTTP/1.1\r\n'
+            f'Host: {self.host_header}\r\n'
+            f'User-Agent: {USER_AGENT}\r\n'
+            'Accept: */*\r\n'
+            'Connection: keep-alive\r\n'
+            '\r\n'.encode('latin-1')
+        )
+        try:
+            await writer.drain()
+            head = await reader.readuntil(b'\r\n\r\n')
+        except BaseException:
+            writer.close()
+            raise
+
+        status_line, *header_lines = head.decode('latin-1').split('\r\n')
+        parts = status_line.split(None, 2)
+        if len(parts) < 2 or not parts[0].startswith('HTTP/') or not parts[1].isdigit():
+            writer.close()
+            raise ConnectionError(f'invalid status line {status_line!r}')
+        headers = {}
+        for line in header_lines:
+            name, _, value = line.partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        # Only bodiless HEAD responses leave the connection ready for the next request;
+        # a GET body is never read, so that connection is dropped
+        if method == 'HEAD' and headers.get('connection', '').lower() != 'close' and parts[0] == 'HTTP/1.1':
+            self.idle.append((reader, writer))
+        else:
+            writer.close()
+        return int(parts[1])
+
+    def close(self) -> None:
+        for _, writer in self.idle:
+            writer.close()
+        self.idle.clear()
+
+
+class LinkChecker:
+    """
+    Checks many URLs concurrently, with one connection pool per host
+    """
+
+    def __init__(self, per_host: int = 4, concurrency: int = 200, timeout: float = 10.0) -> None:
+        self.per_host = per_host
+        self.timeout = timeout
+        self.concurrency = asyncio.Semaphore(concurrency)
+        self.pools: dict[tuple[str, str, int], HostPool] = {}
+        self.ssl_context = ssl.create_default_context()
+
+    def pool(self, url: str) -> tuple[HostPool, str]:
+        """The pool for a URL's host and the request target (path and query)"""
+        parts = urlsplit(url)
+        if parts.scheme not in ('http', 'https') or not parts.hostname:
+            raise ValueError(f"not an http(s) URL: {url}")
+        port = parts.port or (443 if parts.scheme == 'https' else 80)
+        pool_key = (parts.scheme, parts.hostname, port)
+        if pool_key not in self.pools:
+            self.pools[pool_key] = HostPool(parts.scheme, parts.hostname, port, self.per_host, self.ssl_context)
+        target = parts.path or '/'
+        if parts.query:
+            target += f'?{parts.query}'
+        return self.pools[pool_key], target.replace(' ', '%20')
+
+    async def check(self, url: str) -> LinkResult:
+        result = LinkResult(url)
+        start = time.perf_counter()
+        async with self.concurrency:
+            try:
+                pool, target = self.pool(url)
+                async with asyncio.timeout(self.timeout):
+                    result.status = await pool.request('HEAD', target)
+                    # Many servers reject or mishandle HEAD; GET is the authoritative answer
+                    if result.status >= 400:
+                        result.method = 'GET'
+                        result.status = await pool.request('GET', target)
+            except TimeoutError:
+                result.error = f'timed out after {self.timeout:g}s'
+            except ssl.SSLError as e:
+                result.error = f'TLS error: {e.reason or e}'
+            except (OSError, ConnectionError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError) as e:
+                result.error = str(e) or type(e).__name__
+        result.elapsed = time.perf_counter() - start
+        if not result.ok:
+            logger.debug(f"Dead link {url}: {result.status or result.error}")
+        return result
+
+    async def check_all(self, urls: Iterable[str]) -> dict[str, LinkResult]:
+        unique = list(dict.fromkeys(urls))
+        try:
+            results = await asyncio.gather(*(self.check(url) for url in unique))
+        finally:
+            for pool in self.pools.values():
+                pool.close()
+        return {result.url: result for result in results}
+
+
+def check_urls(
+    urls: Iterable[str],
+    per_host: int = 4,
+    concurrency: int = 200,
+    timeout: float = 10.0,
+) -> dict[str, LinkResult]:
+    """Check every URL (duplicates once) and return the results by URL"""
+    async def run() -> dict[str, LinkResult]:
+        return await LinkChecker(per_host, concurrency, timeout).check_all(urls)
+    return asyncio.run(run())
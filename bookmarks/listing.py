@@ -0,0 +1,174 @@
+"""
+Paginated bookmark listing for ``/list/`` and ``/api/bookmarks/``.
+
+For every bookmark generation the bookmarks are sorted once, with a lowercase
+search text (key, description, parameters and URL) per bookmark, and the page
+shell around the cards is rendered once. A request then costs one page: the
+cards after a key cursor that match the filter, and the link checks of those
+cards only, however many bookmarks there are.
+
+A personal namespace gets its own listing, merging its personal bookmarks into
+the shared order; it is rebuilt only when either side changes.
+"""
+from __future__ import annotations
+
+import heapq
+import logging
+import threading
+import time
+from bisect import bisect_right
+from collections import OrderedDict
+from datetime import timedelta
+from typing import TYPE_CHECKING, Any
+
+from django.conf import settings
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from .links import checkable_url
+from .models import LinkCheck
+from .reloads import server_phase
+from .sharedcache import generation_cached
+from .snapshot import get_namespace_snapshot, get_snapshot
+
+if TYPE_CHECKING:
+    from .resolver import CompiledBookmark
+    from .snapshot import BookmarkSnapshot, NamespaceSnapshot
+
+# Get logger for this module
+logger = logging.getLogger(__name__)
+
+# Upper bound of ?limit= on /api/bookmarks/
+MAX_PAGE_SIZE = 500
+
+# Stands in for the first page of cards while the shell is rendered
+CARDS_MARKER = '<!-- bunnify:cards -->'
+
+
+class Listing:
+    """
+    The bookmarks of one generation in key order, with their search texts
+    and the rendered page shell
+    """
+
+    def __init__(self, generation: str, bookmarks: list[CompiledBookmark], personal: frozenset[str] = frozenset()) -> None:
+        self.generation = generation
+        self.bookmarks = bookmarks
+        self.keys = [bookmark.key for bookmark in bookmarks]
+        self.personal = personal
+        self.texts = [
+            '\n'.join((bookmark.key, bookmark.description, *bookmark.placeholders, bookmark.url)).lower()
+            for bookmark in bookmarks
+        ]
+        self._shell: tuple[str, str] | None = None
+
+    @classmethod
+    def from_snapshot(cls, snapshot: BookmarkSnapshot) -> Listing:
+        return cls(snapshot.generation, sorted(snapshot.bookmarks.values(), key=lambda b: b.key))
+
+    @classmethod
+    def for_namespace(cls, snapshot: NamespaceSnapshot, shared: Listing) -> Listing:
+        """Personal bookmarks merged into the shared order, shadowing shared ones with the same key"""
+        personal = sorted(snapshot.overrides.values(), key=lambda b: b.key)
+        shared_bookmarks = [bookmark for bookmark in shared.bookmarks if bookmark.key not in snapshot.overrides]
+        return cls(
+            snapshot.generation,
+            list(heapq.merge(personal, shared_bookmarks, key=lambda b: b.key)),
+            frozenset(snapshot.overrides),
+        )
+
+    def __len__(self) -> int:
+        return len(self.bookmarks)
+
+    def page(self, query: str = '', after: str = '', limit: int = 100) -> tuple[list[CompiledBookmark], str | None]:
+        """
+        Up to ``limit`` bookmarks after the key ``after`` whose search text contains
+        every word of ``query``, and the cursor of the next page (None on the last page)
+        """
+        terms = query.lower().split()
+        start = bisect_right(self.keys, after) if after else 0
+        found: list[CompiledBookmark] = []
+        for position in range(start, len(self.bookmarks)):
+            if terms:
+                text = self.texts[position]
+                if not all(term in text for term in terms):
+                    continue
+            if len(found) == limit:
+                return found, found[-1].key
+            found.append(self.bookmarks[position])
+        return found, None
+
+    def shell(self, namespace: str) -> tuple[str, str]:
+        """The page before and after the cards; the same for every request of this generation"""
+        if self._shell is None:
+            def render() -> tuple[str, str]:
+                html = render_to_string('bookmarks/list.html', {
+                    'total': len(self),
+                    'namespace': namespace,
+                    'page_size': settings.BUNNIFY_LIST_PAGE_SIZE,
+                    'cards': CARDS_MARKER,
+                })
+                head, _, tail = html.partition(CARDS_MARKER)
+                return head, tail
+
+            # A namespace listing's generation covers the namespace too
+            self._shell = generation_cached('list-shell', self.generation, render)
+        return self._shell
+
+    def entries(self, bookmarks: list[CompiledBookmark]) -> list[dict[str, Any]]:
+        """Display fields of a page of bookmarks, with their recent link checks"""
+        urls = {bookmark.key: checkable_url(bookmark) for bookmark in bookmarks}
+        # Link checks older than the TTL are not shown: the link may have been fixed since
+        cutoff = timezone.now() - timedelta(seconds=settings.BUNNIFY_LINK_CHECK_TTL)
+        checked = [url for url in urls.values() if url]
+        link_checks = {
+            check.url: check
+            for check in LinkCheck.objects.filter(url__in=checked, checked_at__gte=cutoff)
+        } if checked else {}
+        return [
+            {
+                'key': bookmark.key,
+                'description': bookmark.description,
+                'url': bookmark.url,
+                'params': list(bookmark.placeholders),
+                'personal': bookmark.key in self.personal,
+                'link': link_checks.get(urls[bookmark.key]),
+            }
+            for bookmark in bookmarks
+        ]
+
+
+_lock = threading.Lock()
+_listing: Listing | None = None
+_namespace_listings: OrderedDict[str, tuple[Listing, Listing]] = OrderedDict()
+
+
+def get_listing(namespace: str = '') -> Listing:
+    """Return the listing of the current generation, building it on reload"""
+    global _listing
+    snapshot = get_snapshot()
+    listing = _listing
+    if listing is None or listing.generation != snapshot.generation:
+        with _lock:
+            if _listing is None or _listing.generation != snapshot.generation:
+                start = time.perf_counter()
+                _listing = Listing.from_snapshot(snapshot)
+                elapsed = time.perf_counter() - start
+                server_phase('listing', elapsed, len(_listing))
+                logger.info(f"Built bookmark listing: generation={_listing.generation}, ms={elapsed * 1000:.1f}")
+            listing = _listing
+    if not namespace:
+        return listing
+
+    namespace_snapshot = get_namespace_snapshot(namespace)
+    cached = _namespace_listings.get(namespace)
+    if cached is not None and cached[0].generation == namespace_snapshot.generation and cached[1] is listing:
+        return cached[0]
+    personal = Listing.for_namespace(namespace_snapshot, listing)
+    with _lock:
+        _namespace_listings[namespace] = (personal, listing)
+        _namespace_listings.move_to_end(namespace)
+        while len(_namespace_listings) > settings.BUNNIFY_NAMESPACE_CACHE_SIZE:
+            _namespace_listings.popitem(last=False)
+    logger.info(f"Built namespace bookmark listing: namespace={namespace}, personal={len(personal.personal)}")
+    return personal
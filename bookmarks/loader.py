@@ -0,0 +1,163 @@
+"""
+Writing bookmark sets to the database.
+
+Shared by ``load_bookmarks`` (bunnify.json), snapshot replication and other
+bookmark sources. Every write runs in one transaction, so readers keep seeing
+the previous bookmarks until the commit, and ends by publishing the new
+generation through the snapshot file so running servers rebuild their lookups.
+"""
+from __future__ import annotations
+
+import logging
+from pathlib import Path
+from typing import Any
+
+from django.conf import settings
+from django.db import transaction
+
+from .aliases import ChainResolver, UnknownReference, alias_owners
+from .exports import export_redirects
+from .models import Bookmark, BookmarkRevision
+from .reloads import count, phase
+from .snapshot import (
+    BookmarkSnapshot,
+    NamespaceSnapshot,
+    get_snapshot,
+    write_snapshot_file,
+)
+
+# Get logger for this module
+logger = logging.getLogger(__name__)
+
+
+def bookmark_from_entry(key: str, entry: dict[str, Any], namespace: str = '') -> Bookmark:
+    """Build an unsaved Bookmark from a bunnify.json (or snapshot) entry"""
+    return Bookmark(
+        namespace=namespace,
+        key=key,
+        description=entry['description'],
+        url=entry['url'],
+        # Handle both "old-url" and "oldurl" variants
+        old_url=entry.get('old-url') or entry.get('oldurl'),
+        defaults=entry.get('defaults') or {},
+        cache_max_age=entry.get('cache'),
+    )
+
+
+# Remembers the previous file, so a long-running watch_bookmarks process only
+# recomputes the chains affected by an edit
+_chains = ChainResolver()
+
+
+def flatten_entries(data: dict[str, dict[str, Any]], namespace: str = '') -> dict[str, dict[str, Any]]:
+    """
+    Concrete bookmarks for a parsed bunnify.json, with aliases and chained
+    bookmarks flattened. Raises AliasError for unknown references and cycles.
+
+    A personal file (namespace) must be self-contained: its bookmarks are
+    stored flattened, so one extending a shared bookmark would keep the shared
+    fields of the day it was loaded. Extending a shared key raises UnknownReference.
+    """
+    if not namespace:
+        entries = _chains.resolve(data)
+        logger.info(f"Flattened {len(data)} entries into {len(entries)} bookmarks (recomputed {_chains.recomputed})")
+        return entries
+    owners = alias_owners(data)
+    for key, entry in data.items():
+        parent = entry.get('extends')
+        if parent is not None and owners.get(parent, parent) not in data:
+            raise UnknownReference(
+                f"Personal bookmark '{key}' extends '{parent}', which is not in the {namespace} file "
+                f"(personal bookmarks cannot extend shared ones)",
+                key,
+            )
+    return ChainResolver().resolve(data)
+
+
+# Fields compared to decide whether a bookmark changed
+BOOKMARK_FIELDS = ('description', 'url', 'old_url', 'defaults', 'cache_max_age')
+
+
+def sync_bookmarks(
+    entries: dict[str, dict[str, Any]],
+    namespace: str = '',
+    revision: str | None = None,
+    source: str = '',
+) -> tuple[int, int, int]:
+    """
+    Make the bookmarks of a namespace ('' for the shared bookmarks) match
+    ``entries`` in a single transaction, writing only the bookmarks that were
+    added, changed or removed, so a reload of a large file with a few edits
+    touches a few rows. ``revision`` (e.g. a git commit SHA) is recorded as the
+    source of the new bookmarks; their generation stays the content hash.
+    Returns (created, updated, removed) counts.
+    """
+    with transaction.atomic():
+        with phase('diff'):
+            existing = {bookmark.key: bookmark for bookmark in Bookmark.objects.filter(namespace=namespace)}
+            changed = {}
+            created_count = 0
+            for key, entry in entries.items():
+                current = existing.get(key)
+                if current is None:
+                    created_count += 1
+                else:
+                    bookmark = bookmark_from_entry(key, entry)
+                    if all(getattr(current, field) == getattr(bookmark, field) for field in BOOKMARK_FIELDS):
+                        continue
+                changed[key] = entry
+            removed = [key for key in existing if key not in entries]
+        count('existing_rows', len(existing))
+        apply_changes(changed, removed, namespace, revision, source)
+    return created_count, len(changed) - created_count, len(removed)
+
+
+def apply_changes(
+    changed: dict[str, dict[str, Any]],
+    removed: list[str],
+    namespace: str = '',
+    revision: str | None = None,
+    source: str = '',
+) -> None:
+    """
+    Apply an incremental change set in a single transaction: create or update
+    the ``changed`` bookmarks, delete the ``removed`` keys and record the
+    source ``revision``, or forget the previous one (the generation is the content hash either way)
+    """
+    bookmarks = Bookmark.objects.filter(namespace=namespace)
+    count('changed_rows', len(changed))
+    count('removed_rows', len(removed))
+    with phase('write'), transaction.atomic():
+        if removed:
+            bookmarks.filter(key__in=removed).delete()
+        if changed:
+            bookmarks.filter(key__in=list(changed)).delete()
+            Bookmark.objects.bulk_create([bookmark_from_entry(key, entry, namespace) for key, entry in changed.items()])
+        if revision:
+            BookmarkRevision.objects.update_or_create(namespace=namespace, defaults={'revision': revision, 'source': source})
+        else:
+            BookmarkRevision.objects.filter(namespace=namespace).delete()
+    logger.info(f"Applied bookmark changes: {len(changed)} changed, {len(removed)} removed" + (f", revision {revision}" if revision else ""))
+
+
+def publish_snapshot(namespace: str = '') -> BookmarkSnapshot | NamespaceSnapshot:
+    """
+    Write the snapshot file for the bookmarks now in the database. Publishing
+    a namespace rebuilds only its personal bookmarks, never the shared snapshot.
+    """
+    snapshot: BookmarkSnapshot | NamespaceSnapshot
+    with phase('publish'):
+        if namespace:
+            snapshot = NamespaceSnapshot.from_database(namespace, get_snapshot())
+        else:
+            snapshot = BookmarkSnapshot.from_database()
+        path = write_snapshot_file(snapshot)
+    count('snapshot_bytes', path.stat().st_size)
+    if not namespace and settings.BUNNIFY_EXPORT_DIR:
+        # Keep the static redirects of a front proxy in step with the bookmarks
+        with phase('export'):
+            try:
+                export_redirects(snapshot, Path(settings.BUNNIFY_EXPORT_DIR))
+            except OSError as e:
+                logger.error(f"Cannot export redirects to {settings.BUNNIFY_EXPORT_DIR}: {e}")
+    return snapshot
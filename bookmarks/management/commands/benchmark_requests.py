@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+import secrets
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Any
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+from django.test import Client
+
+from bookmarks.management.scratch import load_generated_bookmarks, scratch_database
+
+# Get logger for this module
+logger = logging.getLogger(__name__)
+
+MANAGE_PY = Path(settings.BASE_DIR) / 'manage.py'
+
+# Requests measured, through the full Django stack (the WSGI fast path is not involved)
+BENCHMARK_PATHS = [
+    '/search/?q=k00001+django',
+    '/k00000/',
+    '/api/suggestions/?q=k00',
+    '/cmd/',
+    '/list/',
+]
+
+PROFILES = ('development', 'production')
+
+
+class Command(BaseCommand):
+    help = 'Measure per-request time of the bookmark views under the current settings profile (BUNNIFY_ENV)'
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=2000,
+            help='Requests per URL (default: 2000)'
+        )
+        parser.add_argument(
+            '--bookmarks',
+            type=int,
+            default=200,
+            help='Number of bookmarks in the scratch database (default: 200)'
+        )
+        parser.add_argument(
+            '--compare',
+            action='store_true',
+            help='Run the benchmark under every settings profile and print the per-request gain'
+        )
+        parser.add_argument(
+            '--json',
+            action='store_true',
+            help='Print the results as JSON'
+        )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        if options['compare']:
+            self.compare(options)
+            return
+
+        with scratch_database(prefix='bunnify-benchmark-') as tmp_path:
+            load_generated_bookmarks(tmp_path, options['bookmarks'])
+            results = self.measure(options['requests'])
+
+        if options['json']:
+            self.stdout.write(json.dumps({'profile': settings.BUNNIFY_ENV, 'results': results}))
+            return
+        self.stdout.write(f'Settings profile: {settings.BUNNIFY_ENV} (DEBUG={settings.DEBUG})')
+        self.stdout.write(f'{"path":<28} {"mean µs":>9} {"p50 µs":>9}')
+        for path, (mean, median) in results.items():
+            self.stdout.write(f'{path:<28} {mean:>9.1f} {median:>9.1f}')
+
+    def measure(self, count: int) -> dict[str, tuple[float, float]]:
+        """Mean and median microseconds per request, for every benchmark path"""
+        client = Client(HTTP_HOST='127.0.0.1')
+        results = {}
+        for path in BENCHMARK_PATHS:
+            for _ in range(min(count, 50)):
+                client.get(path)  # Warm up connections, snapshots and template caches
+            timings = []
+            for _ in range(count):
+                start = time.perf_counter()
+                response = client.get(path)
+                timings.append(time.perf_counter() - start)
+            if response.status_code not in (200, 302):
+                raise CommandError(f'{path} returned HTTP {response.status_code}')
+            timings.sort()
+            results[path] = (sum(timings) / count * 1e6, timings[count // 2] * 1e6)
+            logger.info(f"Benchmarked {path}: mean={results[path][0]:.1f}µs")
+        return results
+
+    def compare(self, options: dict[str, Any]) -> None:
+        """Run the benchmark in one process per settings profile and print the gain"""
+        by_profile = {}
+        # The production profile refuses to start without these; the benchmark client sends Host 127.0.0.1
+        env = {
+            'BUNNIFY_SECRET_KEY': secrets.token_urlsafe(50),
+            'BUNNIFY_ALLOWED_HOSTS': '127.0.0.1',
+            **os.environ,
+        }
+        for profile in PROFILES:
+            self.stdout.write(f'⏱  Benchmarking the {profile} profile...')
+            result = subprocess.run(
+                [sys.executable, str(MANAGE_PY), 'benchmark_requests', '--json',
+                 '--requests', str(options['requests']), '--bookmarks', str(options['bookmarks'])],
+                capture_output=True,
+                text=True,
+                env={**env, 'BUNNIFY_ENV': profile},
+            )
+            if result.returncode != 0:
+                raise CommandError(f'Benchmark failed for the {profile} profile:\n{result.stderr}')
+            by_profile[profile] = json.loads(result.stdout.strip().splitlines()[-1])['results']
+
+        development, production = (by_profile[profile] for profile in PROFILES)
+        self.stdout.write(f'\n{"path":<28} {"dev µs":>9} {"prod µs":>9} {"gain":>7}')
+        for path in BENCHMARK_PATHS:
+            before, after = development[path][0], production[path][0]
+            self.stdout.write(f'{path:<28} {before:>9.1f} {after:>9.1f} {(before - after) / before:>7.0%}')
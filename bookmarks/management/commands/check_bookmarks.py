@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+import glob
+import json
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any
+
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+
+from bookmarks.validation import check_file, key_collisions
+
+# Get logger for this module
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Validate bookmark files without loading them (read-only, files checked in parallel)'
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            'paths',
+            nargs='+',
+            help='Bookmark files or glob patterns, e.g. "teams/**/*.json"'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count() or 1,
+            help='Number of worker processes (default: number of CPUs)'
+        )
+        parser.add_argument(
+            '--json',
+            action='store_true',
+            help='Print a machine-readable JSON report'
+        )
+        parser.add_argument(
+            '--output',
+            type=str,
+            default=None,
+            help='Also write the JSON report to this file'
+        )
+
+    def expand_paths(self, patterns: list[str]) -> list[str]:
+        """Files matching the paths and glob patterns, in order, without duplicates"""
+        files: dict[str, None] = {}
+        for pattern in patterns:
+            matches = sorted(glob.glob(pattern, recursive=True)) if glob.has_magic(pattern) else [pattern]
+            if not matches:
+                raise CommandError(f'No files match {pattern}')
+            for match in matches:
+                files[str(Path(match))] = None
+        return list(files)
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        paths = self.expand_paths(options['paths'])
+        workers = max(1, min(options['workers'], len(paths)))
+        logger.info(f"Checking {len(paths)} bookmark files with {workers} workers")
+
+        start = time.perf_counter()
+        if workers == 1:
+            reports = [check_file(path) for path in paths]
+        else:
+            # One file per task, so the run takes about as long as the largest file
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                reports = list(pool.map(check_file, paths))
+
+        collisions = key_collisions(reports)
+        for report in reports:
+            for key, files in collisions.items():
+                if report['path'] in files and key in report['keys']:
+                    others = ', '.join(f for f in files if f != report['path'])
+                    report['errors'].append({'code': 'key_collision', 'message': f"also defined in {others}", 'key': key})
+
+        result = {
+            'files': [
+                {'path': r['path'], 'bookmarks': len(r['keys']), 'errors': r['errors'], 'warnings': r['warnings']}
+                for r in reports
+            ],
+            'collisions': collisions,
+            'summary': {
+                'files': len(reports),
+                'bookmarks': sum(len(r['keys']) for r in reports),
+                'errors': sum(len(r['errors']) for r in reports),
+                'warnings': sum(len(r['warnings']) for r in reports),
+                'seconds': round(time.perf_counter() - start, 3),
+            },
+        }
+        result['summary']['ok'] = result['summary']['errors'] == 0
+        logger.info(f"Checked bookmark files: {result['summary']}")
+
+        if options['output']:
+            Path(options['output']).write_text(json.dumps(result, indent=2) + '\n', encoding='utf-8')
+        if options['json']:
+            self.stdout.write(json.dumps(result, indent=2))
+        else:
+            self.print_report(result)
+
+        if not result['summary']['ok']:
+            raise CommandError(f"{result['summary']['errors']} errors in bookmark files")
+
+    def print_report(self, result: dict[str, Any]) -> None:
+        for report in result['files']:
+            if report['errors']:
+                self.stdout.write(self.style.ERROR(f"✗ {report['path']}"))
+            else:
+                self.stdout.write(self.style.SUCCESS(f"✓ {report['path']} ({report['bookmarks']} bookmarks)"))
+            for issue in report['errors']:
+                self.stdout.write(self.style.ERROR(f"    {issue.get('key', '-')}: {issue['message']}"))
+            for issue in report['warnings']:
+                self.stdout.write(self.style.WARNING(f"    {issue.get('key', '-')}: {issue['message']}"))
+        summary = result['summary']
+        self.stdout.write(
+            f"\n{summary['files']} files, {summary['bookmarks']} bookmarks: "
+            f"{summary['errors']} errors, {summary['warnings']} warnings ({summary['seconds']}s)"
+        )
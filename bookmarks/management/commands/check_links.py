@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import json
+import logging
+import time
+from datetime import timedelta
+from typing import Any
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandParser
+from django.utils import timezone
+
+from bookmarks.links import LinkResult, check_urls, checkable_url
+from bookmarks.models import Bookmark, LinkCheck
+
+# Get logger for this module
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Check that bookmark URLs (with their defaults filled in) are alive, concurrently'
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Check every link, even those checked less than BUNNIFY_LINK_CHECK_TTL seconds ago'
+        )
+        parser.add_argument(
+            '--per-host',
+            type=int,
+            default=settings.BUNNIFY_LINK_CHECK_PER_HOST,
+            help=f'Concurrent requests per host (default: {settings.BUNNIFY_LINK_CHECK_PER_HOST})'
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=200,
+            help='Concurrent requests in total (default: 200)'
+        )
+        parser.add_argument(
+            '--timeout',
+            type=float,
+            default=settings.BUNNIFY_LINK_CHECK_TIMEOUT,
+            help=f'Seconds before a link counts as dead (default: {settings.BUNNIFY_LINK_CHECK_TIMEOUT:g})'
+        )
+        parser.add_argument(
+            '--json',
+            action='store_true',
+            help='Print a machine-readable JSON report'
+        )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        # Personal bookmarks are labelled namespace/key
+        urls_by_key = {
+            f'{bookmark.namespace}/{bookmark.key}' if bookmark.namespace else bookmark.key: checkable_url(bookmark)
+            for bookmark in Bookmark.objects.all()
+        }
+        urls = {url for url in urls_by_key.values() if url}
+        skipped = sorted(key for key, url in urls_by_key.items() if not url)
+
+        stored = {check.url: check for check in LinkCheck.objects.all()}
+        cutoff = timezone.now() - timedelta(seconds=settings.BUNNIFY_LINK_CHECK_TTL)
+        cached = set() if options['force'] else {url for url in urls if url in stored and stored[url].checked_at >= cutoff}
+        to_check = sorted(urls - cached)
+        logger.info(f"Checking {len(to_check)} links ({len(cached)} cached, {len(skipped)} bookmarks skipped)")
+        if not options['json']:
+            self.stdout.write(f'🔗 Checking {len(to_check)} links ({len(cached)} checked recently, {len(skipped)} not checkable)')
+
+        start = time.perf_counter()
+        results = check_urls(to_check, options['per_host'], options['concurrency'], options['timeout'])
+        elapsed = time.perf_counter() - start
+        self.save(results, stored, urls)
+
+        links = []
+        for key, url in sorted(urls_by_key.items()):
+            if not url:
+                continue
+            result = results.get(url)
+            if result is None:
+                check = stored[url]
+                result = LinkResult(url, check.status, check.error, check.method, check.elapsed_ms / 1000)
+            links.append({'key': key, **result.to_dict(), 'cached': url in cached})
+
+        dead = [link for link in links if not link['ok']]
+        summary = {
+            'links': len(urls),
+            'checked': len(to_check),
+            'cached': len(cached),
+            'skipped': len(skipped),
+            'dead': len(dead),
+            'seconds': round(elapsed, 3),
+        }
+        logger.info(f"Checked links: {summary}")
+
+        if options['json']:
+            self.stdout.write(json.dumps({'links': links, 'skipped': skipped, 'summary': summary}, indent=2))
+            return
+        for link in dead:
+            reason = f"HTTP {link['status']}" if link['status'] else link['error']
+            self.stdout.write(self.style.ERROR(f"✗ {link['key']}: {link['url']} ({reason})"))
+        self.stdout.write(self.style.SUCCESS(
+            f"✓ Checked {len(to_check)} links in {elapsed:.2f}s: {len(links) - len(dead)} alive, {len(dead)} dead"
+        ))
+
+    def save(self, results: dict[str, LinkResult], stored: dict[str, LinkCheck], urls: set[str]) -> None:
+        """Store the new results and forget URLs no bookmark points at anymore"""
+        now = timezone.now()
+        LinkCheck.objects.bulk_create(
+            [
+                LinkCheck(
+                    url=result.url,
+                    status=result.status,
+                    error=result.error,
+                    method=result.method,
+                    elapsed_ms=round(result.elapsed * 1000, 1),
+                    checked_at=now,
+                )
+                for result in results.values()
+            ],
+            update_conflicts=True,
+            unique_fields=['url'],
+            update_fields=['status', 'error', 'method', 'elapsed_ms', 'checked_at'],
+        )
+        obsolete = [check.pk for url, check in stored.items() if url not in urls]
+        if obsolete:
+            LinkCheck.objects.filter(pk__in=obsolete).delete()
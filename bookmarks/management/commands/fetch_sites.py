@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+import logging
+import time
+from datetime import timedelta
+from typing import Any
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandParser
+from django.db.models.functions import Length
+from django.utils import timezone
+
+from bookmarks.models import Bookmark, SiteIcon
+from bookmarks.sites import SiteResult, fetch_sites, site_origin
+
+# Get logger for this module
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Fetch the favicon and page title of every bookmark host, concurrently, for /list/ and /cmd/'
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Fetch every host, even those fetched less than BUNNIFY_SITE_TTL seconds ago'
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=16,
+            help='Hosts fetched at once (default: 16)'
+        )
+        parser.add_argument(
+            '--timeout',
+            type=float,
+            default=settings.BUNNIFY_LINK_CHECK_TIMEOUT,
+            help=f'Seconds before a request is abandoned (default: {settings.BUNNIFY_LINK_CHECK_TIMEOUT:g})'
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=0,
+            help='Keep running and look for new or expired hosts every this many seconds (default: fetch once)'
+        )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        if not options['interval']:
+            self.fetch(options)
+            return
+        try:
+            while True:
+                self.fetch(options)
+                # Later passes only fetch hosts that are new or expired
+                options['force'] = False
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            logger.info("Site fetcher stopped by user (KeyboardInterrupt)")
+            self.stdout.write(self.style.WARNING('\n👋 Stopped fetching sites'))
+
+    def fetch(self, options: dict[str, Any]) -> None:
+        """One pass: fetch the hosts that are new or expired, then apply the size bound"""
+        origins = {site_origin(url) for url in Bookmark.objects.values_list('url', flat=True)}
+        origins.discard(None)
+
+        stored = {site.origin: site for site in SiteIcon.objects.defer('icon')}
+        cutoff = timezone.now() - timedelta(seconds=settings.BUNNIFY_SITE_TTL)
+        cached = set() if options['force'] else {
+            origin for origin in origins if origin in stored and stored[origin].fetched_at >= cutoff
+        }
+        to_fetch = sorted(origins - cached)
+        obsolete = [site.pk for origin, site in stored.items() if origin not in origins]
+        if not to_fetch and not obsolete:
+            logger.debug(f"All {len(origins)} sites fetched recently")
+            return
+        logger.info(f"Fetching {len(to_fetch)} sites ({len(cached)} cached)")
+        self.stdout.write(f'🌐 Fetching {len(to_fetch)} sites ({len(cached)} fetched recently)')
+
+        start = time.perf_counter()
+        results = fetch_sites(to_fetch, options['concurrency'], options['timeout'], settings.BUNNIFY_SITE_ICON_MAX_BYTES)
+        elapsed = time.perf_counter() - start
+        self.save(results, obsolete)
+        evicted = self.evict(settings.BUNNIFY_SITE_CACHE_MAX_BYTES)
+
+        titles = sum(1 for result in results.values() if result.title)
+        icons = sum(1 for result in results.values() if result.icon)
+        logger.info(f"Fetched {len(results)} sites in {elapsed:.2f}s: {titles} titles, {icons} icons, {evicted} icons evicted")
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ Fetched {len(results)} sites in {elapsed:.2f}s: {titles} titles, {icons} icons'
+            + (f', {evicted} icons evicted' if evicted else '')
+        ))
+
+    def save(self, results: dict[str, SiteResult], obsolete: list[int]) -> None:
+        """Store the new results and forget hosts no bookmark points at anymore"""
+        now = timezone.now()
+        SiteIcon.objects.bulk_create(
+            [
+                SiteIcon(
+                    origin=result.origin,
+                    title=result.title,
+                    icon=result.icon,
+                    icon_type=result.icon_type,
+                    error=result.error,
+                    fetched_at=now,
+                )
+                for result in results.values()
+            ],
+            update_conflicts=True,
+            unique_fields=['origin'],
+            update_fields=['title', 'icon', 'icon_type', 'error', 'fetched_at'],
+        )
+        if obsolete:
+            SiteIcon.objects.filter(pk__in=obsolete).delete()
+
+    def evict(self, max_bytes: int) -> int:
+        """
+        Drop the icons of the least recently fetched hosts until all icons fit in
+        ``max_bytes``. Titles stay, and the hosts are fetched again once they expire.
+        """
+        total = 0
+        evicted = []
+        sizes = SiteIcon.objects.annotate(size=Length('icon')).filter(size__gt=0).order_by('-fetched_at', 'origin')
+        for pk, size in sizes.values_list('pk', 'size'):
+            total += size
+            if total > max_bytes:
+                evicted.append(pk)
+        if evicted:
+            SiteIcon.objects.filter(pk__in=evicted).update(icon=b'', icon_type='', error='icon evicted (BUNNIFY_SITE_CACHE_MAX_BYTES)')
+        return len(evicted)
@@ -5,10 +5,14 @@ import logging
 from pathlib import Path
 from typing import Any
 
-from django.core.management.base import BaseCommand, CommandParser
+from django.core.management.base import BaseCommand, CommandError, CommandParser
 from jsonschema import ValidationError, validate
 
-from bookmarks.models import Bookmark
+from bookmarks.aliases import AliasError
+from bookmarks.loader import flatten_entries, publish_snapshot, sync_bookmarks
+from bookmarks.reloads import ReloadTimer, count, phase
+from bookmarks.snapshot import NAMESPACE_PATTERN
+from bookmarks.validation import BOOKMARKS_SCHEMA, RESERVED_KEYWORDS
 
 # Get logger for this module
 logger = logging.getLogger(__name__)
@@ -24,80 +28,37 @@ class Command(BaseCommand):
             default=str(Path.home() / 'work' / 'bunnify' / 'bunnify.json'),
             help='Path to the JSON file containing bookmarks'
         )
+        parser.add_argument(
+            '--namespace',
+            type=str,
+            default='',
+            help='Load the file as the personal bookmarks of this namespace, shadowing shared keys'
+        )
+        parser.add_argument(
+            '--profile',
+            action='store_true',
+            help='Print how long each reload phase took, with byte sizes and row counts'
+        )
 
     def handle(self, *args: Any, **options: Any) -> None:
         json_file_path = Path(options['file']).resolve()
-        logger.info(f"Loading bookmarks from: {json_file_path}")
-        
-        # Define JSON schema for validation
-        schema = {
-            "type": "object",
-            "patternProperties": {
-                "^[a-zA-Z0-9_]+$": {
-                    "type": "object",
-                    "properties": {
-                        "description": {"type": "string"},
-                        "url": {"type": "string"},
-                        "old-url": {"type": "string"},
-                        "oldurl": {"type": "string"}
-                    },
-                    "required": ["description", "url"]
-                }
-            }
-        }
+        namespace = options['namespace']
+        if namespace and not NAMESPACE_PATTERN.fullmatch(namespace):
+            raise CommandError(f'Invalid namespace "{namespace}": use letters, digits, "_" and "-"')
+        logger.info(f"Loading bookmarks from: {json_file_path}" + (f" into namespace '{namespace}'" if namespace else ""))
         
         self.stdout.write(f'📖 Loading bookmarks from: {json_file_path}')
+        if namespace:
+            self.stdout.write(f'👤 Namespace: {namespace}')
         
+        timer = ReloadTimer('file', namespace)
         try:
-            # Read and parse JSON file
-            data = json.loads(json_file_path.read_text(encoding='utf-8'))
-            
-            # Validate schema
-            logger.info("Starting JSON schema validation")
-            validate(instance=data, schema=schema)
-            logger.info("JSON schema validation passed")
-            self.stdout.write(self.style.SUCCESS(f'✓ JSON schema validation passed'))
-            
-            # Check for reserved keywords
-            reserved_keywords = ['h', 'help']
-            for key in data.keys():
-                if key in reserved_keywords:
-                    logger.error(f"Reserved keyword violation: bookmark key '{key}' is reserved")
-                    self.stdout.write(
-                        self.style.ERROR(
-                            f'Error: Bookmark key "{key}" is reserved and cannot be used.\n'
-                            f'Reserved keywords: {", ".join(reserved_keywords)}'
-                        )
-                    )
-                    return
-            
-            # Clear existing bookmarks
-            existing_count = Bookmark.objects.count()
-            Bookmark.objects.all().delete()
-            logger.info(f"Cleared {existing_count} existing bookmarks")
-            self.stdout.write(self.style.WARNING('Cleared existing bookmarks'))
-            
-            # Load bookmarks
-            created_count = 0
-            for key, bookmark_data in data.items():
-                # Handle both "old-url" and "oldurl" variants
-                old_url = bookmark_data.get('old-url') or bookmark_data.get('oldurl')
-                defaults = bookmark_data.get('defaults', {})
-                
-                Bookmark.objects.create(
-                    key=key,
-                    description=bookmark_data['description'],
-                    url=bookmark_data['url'],
-                    old_url=old_url,
-                    defaults=defaults
-                )
-                created_count += 1
-                logger.debug(f"Created bookmark: key='{key}', url='{bookmark_data['url']}'")
-            
-            logger.info(f"Successfully loaded {created_count} bookmarks")
-            self.stdout.write(
-                self.style.SUCCESS(f'✓ Successfully loaded {created_count} bookmarks')
-            )
+            with timer:
+                loaded = self.load(json_file_path, namespace)
+                if loaded:
+                    timer.finish()
+            if loaded and options['profile']:
+                self.print_profile(timer)
             
         except FileNotFoundError:
             logger.error(f"File not found: {json_file_path}")
@@ -109,6 +70,11 @@ class Command(BaseCommand):
             self.stdout.write(
                 self.style.ERROR(f'Error: Invalid JSON format: {e}')
             )
+        except AliasError as e:
+            logger.error(f"Invalid aliases or chained bookmarks: {e.message}")
+            self.stdout.write(
+                self.style.ERROR(f'Error: {e.message}')
+            )
         except ValidationError as e:
             logger.error(f"Schema validation failed: {e.message}", exc_info=True)
             self.stdout.write(
@@ -119,3 +85,67 @@ class Command(BaseCommand):
             self.stdout.write(
                 self.style.ERROR(f'Error: {e}')
             )
+
+    def load(self, json_file_path: Path, namespace: str) -> bool:
+        """Validate and apply the file, timing each phase; False if it was rejected"""
+        # Read and parse JSON file
+        with phase('read'):
+            raw = json_file_path.read_bytes()
+        count('file_bytes', len(raw))
+        with phase('parse'):
+            data = json.loads(raw)
+        count('entries', len(data) if isinstance(data, dict) else 0)
+        
+        # Validate schema
+        logger.info("Starting JSON schema validation")
+        with phase('validate'):
+            validate(instance=data, schema=BOOKMARKS_SCHEMA)
+        logger.info("JSON schema validation passed")
+        self.stdout.write(self.style.SUCCESS(f'✓ JSON schema validation passed'))
+        
+        # Flatten aliases and chained bookmarks into concrete bookmarks, so
+        # requests never follow chains
+        with phase('flatten'):
+            entries = flatten_entries(data, namespace)
+        count('bookmarks', len(entries))
+        
+        # Check for reserved keywords
+        for key in entries.keys():
+            if key in RESERVED_KEYWORDS:
+                logger.error(f"Reserved keyword violation: bookmark key '{key}' is reserved")
+                self.stdout.write(
+                    self.style.ERROR(
+                        f'Error: Bookmark key "{key}" is reserved and cannot be used.\n'
+                        f'Reserved keywords: {", ".join(RESERVED_KEYWORDS)}'
+                    )
+                )
+                return False
+        
+        # Apply only the differences, in a single transaction: readers keep
+        # seeing the previous bookmarks until the commit, never an empty table
+        created_count, updated_count, removed_count = sync_bookmarks(entries, namespace)
+        if removed_count:
+            self.stdout.write(self.style.WARNING(f'Removed {removed_count} bookmarks'))
+        
+        # Publish the new generation so running servers rebuild their lookups
+        publish_snapshot(namespace)
+        
+        logger.info(f"Successfully loaded {len(entries)} bookmarks ({created_count} created, {updated_count} updated, {removed_count} removed)")
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'✓ Successfully loaded {len(entries)} bookmarks '
+                f'({created_count} created, {updated_count} updated, {removed_count} removed)'
+            )
+        )
+        return True
+    
+    def print_profile(self, timer: ReloadTimer) -> None:
+        """Print the phase breakdown of a finished reload"""
+        total = timer.total or 0.0
+        self.stdout.write(f'\n⏱️  Reload phases ({total * 1000:.1f} ms in total):')
+        for name, duration in timer.ordered_phases():
+            share = duration / total * 100 if total else 0.0
+            self.stdout.write(f'    {name:<10} {duration * 1000:>9.1f} ms  {share:5.1f}%')
+        other = total - sum(timer.phases.values())
+        self.stdout.write(f'    {"other":<10} {other * 1000:>9.1f} ms  {other / total * 100 if total else 0.0:5.1f}%')
+        self.stdout.write('  ' + ', '.join(f'{name}={value:,}' for name, value in timer.counts.items()))
@@ -0,0 +1,165 @@
+from __future__ import annotations
+
+import json
+import logging
+from pathlib import Path
+from typing import Any
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+from django.db import connections
+from django.test import Client
+
+from bookmarks.replay import ENDPOINTS, HTTPTarget, ReplayResult, read_trace, replay
+
+# Get logger for this module
+logger = logging.getLogger(__name__)
+
+
+class ClientSession:
+    """Sends requests through the Django test client, in this process (the WSGI fast path is not involved)"""
+
+    def __init__(self) -> None:
+        self.client = Client(HTTP_HOST='127.0.0.1')
+
+    def get(self, path: str) -> int:
+        return self.client.get(path).status_code
+
+    def close(self) -> None:
+        connections.close_all()
+
+
+class ClientTarget:
+    def session(self) -> ClientSession:
+        return ClientSession()
+
+
+def default_logs() -> list[Path]:
+    """The log file and its rotated backups (bunnify.log.1 is the newest), oldest first"""
+    log_file = Path(settings.LOG_FILE)
+    backups = sorted(
+        (path for path in log_file.parent.glob(f'{log_file.name}.*') if path.suffix[1:].isdigit()),
+        key=lambda path: int(path.suffix[1:]),
+        reverse=True,
+    )
+    return [*backups, log_file] if log_file.exists() else backups
+
+
+class Command(BaseCommand):
+    help = 'Replay the requests of the bunnify log against a running instance or in process, with latency percentiles per endpoint'
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            '--log',
+            action='append',
+            dest='logs',
+            help=f'Log file to replay, may be repeated (default: {settings.LOG_FILE} and its rotated backups)'
+        )
+        parser.add_argument(
+            '--url',
+            help='Base URL of a running instance, e.g. http://127.0.0.1:8000 (default: the Django test client in this process)'
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=8,
+            help='Requests in flight at once (default: 8)'
+        )
+        parser.add_argument(
+            '--speedup',
+            type=float,
+            default=0,
+            help='Keep the logged spacing of requests, this many times faster (default: 0, as fast as possible)'
+        )
+        parser.add_argument(
+            '--endpoint',
+            action='append',
+            dest='endpoints',
+            choices=ENDPOINTS,
+            help='Replay only these endpoints, may be repeated (default: all)'
+        )
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=0,
+            help='Replay only the first this many requests (default: all)'
+        )
+        parser.add_argument(
+            '--timeout',
+            type=float,
+            default=10,
+            help='Seconds before a request to --url is abandoned (default: 10)'
+        )
+        parser.add_argument(
+            '--no-keep-alive',
+            action='store_true',
+            help='Open a connection per request to --url (runserver answers keep-alive requests about 40ms late)'
+        )
+        parser.add_argument(
+            '--json',
+            action='store_true',
+            help='Print the results as JSON'
+        )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        logs = [Path(path) for path in options['logs']] if options['logs'] else default_logs()
+        missing = [str(path) for path in logs if not path.is_file()]
+        if not logs or missing:
+            raise CommandError(f'Log file not found: {", ".join(missing) or settings.LOG_FILE}')
+        if options['concurrency'] < 1 or options['speedup'] < 0:
+            raise CommandError('--concurrency must be at least 1 and --speedup at least 0')
+
+        trace = read_trace(logs, options['endpoints'] or ENDPOINTS)
+        if options['limit']:
+            trace = trace[:options['limit']]
+        if not trace:
+            raise CommandError(f'No requests found in {", ".join(map(str, logs))}')
+
+        if options['url']:
+            try:
+                target = HTTPTarget(options['url'], options['timeout'], not options['no_keep_alive'])
+            except ValueError as e:
+                raise CommandError(str(e))
+        else:
+            target = ClientTarget()
+        if not options['json']:
+            span = trace[-1].at - trace[0].at
+            pace = f'{options["speedup"]:g}x the logged pace' if options['speedup'] else 'as fast as possible'
+            self.stdout.write(
+                f'🔁 Replaying {len(trace)} requests spanning {span / 3600:.1f}h against '
+                f'{options["url"] or "the test client"}, {options["concurrency"]} at a time, {pace}'
+            )
+
+        result = replay(trace, target, options['concurrency'], options['speedup'])
+        if options['json']:
+            self.stdout.write(json.dumps(result.as_dict()))
+            return
+        self.report(result, options['speedup'])
+
+    def report(self, result: ReplayResult, speedup: float) -> None:
+        stats = result.as_dict()
+        self.stdout.write(
+            f'\n{"endpoint":<10} {"requests":>9} {"req/s":>8} {"p50 ms":>8} {"p95 ms":>8} '
+            f'{"p99 ms":>8} {"max ms":>8}  statuses'
+        )
+        for endpoint, row in [*stats['endpoints'].items(), ('total', stats['total'])]:
+            statuses = ' '.join(f'{status}×{count}' for status, count in row['statuses'].items())
+            self.stdout.write(
+                f'{endpoint:<10} {row["requests"]:>9} {row["per_second"]:>8.1f} {row["p50_ms"]:>8.2f} '
+                f'{row["p95_ms"]:>8.2f} {row["p99_ms"]:>8.2f} {row["max_ms"]:>8.2f}  {statuses}'
+            )
+        self.stdout.write(f'\nElapsed: {stats["elapsed_s"]:.2f}s')
+        if speedup:
+            # Sends that started late: the target (or the client) did not keep up with the pace
+            self.stdout.write(f'Send lag p99: {stats["lag_p99_ms"]:.2f}ms')
+
+        errors = [error for endpoint in result.endpoints.values() for error in endpoint.errors]
+        server_errors = sum(count for status, count in result.total().statuses.items() if status >= 500)
+        if errors:
+            self.stdout.write(self.style.ERROR(f'✗ {len(errors)} requests failed'))
+            for error in errors[:5]:
+                self.stdout.write(f'  {error}')
+        if server_errors:
+            self.stdout.write(self.style.WARNING(f'⚠️  {server_errors} responses were server errors'))
+        if not errors and not server_errors:
+            self.stdout.write(self.style.SUCCESS('✓ Replay finished without errors'))
@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+import logging
+import time
+from typing import Any
+
+from django.core.management.base import BaseCommand, CommandParser
+
+from bookmarks.replication import Replica, ReplicationError
+
+# Get logger for this module
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Mirror the bookmarks of a primary Bunnify node (run instead of watch_bookmarks on replicas)'
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            '--primary',
+            type=str,
+            required=True,
+            help='Base URL of the primary node, e.g. http://10.0.0.5:8000'
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=1.0,
+            help='Poll interval in seconds (default: 1)'
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Sync once and exit'
+        )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        replica = Replica(options['primary'])
+        interval = options['interval']
+        
+        logger.info(f"Starting replica of {replica.snapshot_url}, interval: {interval}s")
+        self.stdout.write(
+            self.style.SUCCESS(f'🔁 Replicating bookmarks from {replica.snapshot_url}')
+        )
+        
+        try:
+            while True:
+                try:
+                    result = replica.sync_once()
+                    if result != 'unchanged':
+                        self.stdout.write(
+                            self.style.SUCCESS(f'✓ Applied {result} update from primary')
+                        )
+                except ReplicationError as e:
+                    logger.error(f"Replication failed: {e}")
+                    self.stdout.write(
+                        self.style.ERROR(f'✗ Replication failed: {e}')
+                    )
+                if options['once']:
+                    return
+                time.sleep(interval)
+        except KeyboardInterrupt:
+            logger.info("Replica stopped by user (KeyboardInterrupt)")
+            self.stdout.write(
+                self.style.WARNING('\n\n👋 Stopped replicating')
+            )
@@ -0,0 +1,41 @@
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+from typing import Any
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+
+from bookmarks.cli import add_arguments, iter_queries, load_snapshot_file, resolve_all
+from bookmarks.snapshot import get_snapshot
+
+
+class Command(BaseCommand):
+    help = 'Resolve bookmark queries (e.g. "pr 12345 org/repo") to URLs without a running server'
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        add_arguments(parser)
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        # manage.py normally answers `resolve` from the snapshot file before Django
+        # is loaded (see bookmarks/cli.py); this command is the fallback that reads
+        # the database when there is no snapshot file yet
+        if options['snapshot']:
+            try:
+                lookup = load_snapshot_file(Path(options['snapshot'])).get
+            except (OSError, ValueError, KeyError) as e:
+                raise CommandError(f'Cannot read snapshot file {options["snapshot"]}: {e}')
+        else:
+            lookup = get_snapshot().get
+        
+        exit_code = resolve_all(
+            iter_queries(options['queries'], sys.stdin),
+            lookup,
+            self.stdout,
+            self.stderr,
+            options['json'],
+            settings.BUNNIFY_FALLBACK_KEY,
+        )
+        if exit_code:
+            sys.exit(exit_code)
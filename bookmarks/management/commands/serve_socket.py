@@ -0,0 +1,51 @@
+from __future__ import annotations
+
+import logging
+import signal
+import sys
+from pathlib import Path
+from typing import Any
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+
+from bookmarks.daemon import bind_socket
+from bookmarks.snapshot import get_snapshot
+
+# Get logger for this module
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Resolve queries and complete keys and parameters for shells over a Unix domain socket'
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            '--socket',
+            type=str,
+            default=str(settings.BUNNIFY_SOCKET),
+            help=f'Path of the Unix domain socket (default: {settings.BUNNIFY_SOCKET})'
+        )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        path = Path(options['socket'])
+        try:
+            server = bind_socket(path)
+        except OSError as e:
+            raise CommandError(f'Cannot listen on {path}: {e.strerror or e}')
+
+        # Stop cleanly (removing the socket file) when bunnify-server kills the daemon
+        signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
+        snapshot = get_snapshot()
+        logger.info(f"Resolver socket listening on {path}, generation={snapshot.generation}")
+        self.stdout.write(self.style.SUCCESS(f'🔌 Resolver socket listening on {path} ({len(snapshot)} bookmarks)'))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            path.unlink(missing_ok=True)
+            logger.info(f"Resolver socket {path} closed")
+            self.stdout.write(self.style.SUCCESS('\n👋 Resolver socket stopped'))
@@ -0,0 +1,239 @@
+from __future__ import annotations
+
+import logging
+import os
+import random
+import signal
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+from django.db import OperationalError, connections
+from django.test import Client
+
+from bookmarks.management.scratch import (
+    generated_bookmarks,
+    load_generated_bookmarks,
+    scratch_database,
+    write_bookmarks_file,
+)
+from bookmarks.replay import percentile
+
+# Get logger for this module
+logger = logging.getLogger(__name__)
+
+MANAGE_PY = Path(settings.BASE_DIR) / 'manage.py'
+
+# Seconds a rewritten file may take to be published before the run fails
+RELOAD_TIMEOUT = 30
+
+
+class SoakResults:
+    """Outcomes of one client thread, merged after the run"""
+
+    def __init__(self) -> None:
+        self.latencies: dict[str, list[float]] = {'steady': [], 'reload': []}
+        self.not_found: list[str] = []
+        self.server_errors: list[str] = []
+        self.lock_errors: list[str] = []
+
+    def merge(self, other: SoakResults) -> None:
+        for phase, values in other.latencies.items():
+            self.latencies[phase].extend(values)
+        self.not_found.extend(other.not_found)
+        self.server_errors.extend(other.server_errors)
+        self.lock_errors.extend(other.lock_errors)
+
+
+class Command(BaseCommand):
+    help = 'Soak test: concurrent redirects and suggestions while watch_bookmarks reloads a large file'
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            '--bookmarks',
+            type=int,
+            default=5000,
+            help='Number of bookmarks in the generated file (default: 5000)'
+        )
+        parser.add_argument(
+            '--threads',
+            type=int,
+            default=8,
+            help='Number of concurrent client threads (default: 8)'
+        )
+        parser.add_argument(
+            '--steady',
+            type=float,
+            default=5,
+            help='Seconds of traffic without reloads, the baseline (default: 5)'
+        )
+        parser.add_argument(
+            '--reload',
+            type=float,
+            default=10,
+            help='Seconds of traffic while the file is rewritten and reloaded in a tight loop (default: 10)'
+        )
+        parser.add_argument(
+            '--watch-interval',
+            type=float,
+            default=0.05,
+            help='watch_bookmarks check interval in seconds (default: 0.05)'
+        )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        # Run against a scratch database and snapshot file, never the real bookmarks
+        with scratch_database(prefix='bunnify-soak-') as tmp_path:
+            self.run_soak(tmp_path, options)
+
+    def run_soak(self, tmp_path: Path, options: dict[str, Any]) -> None:
+        count = options['bookmarks']
+        snapshot_path = settings.BUNNIFY_SNAPSHOT_FILE
+
+        self.stdout.write(f'🧪 Soak test: {count} bookmarks, {options["threads"]} client threads')
+        bookmarks_path = load_generated_bookmarks(tmp_path, count)
+
+        watcher_log = tmp_path / 'watcher.log'
+        env = {
+            **os.environ,
+            'BUNNIFY_DB_PATH': connections['default'].settings_dict['NAME'],
+            'BUNNIFY_SNAPSHOT_FILE': str(snapshot_path),
+            'PYTHONUNBUFFERED': '1',
+        }
+        with open(watcher_log, 'w') as log:
+            watcher = subprocess.Popen(
+                [sys.executable, str(MANAGE_PY), 'watch_bookmarks',
+                 '--file', str(bookmarks_path), '--interval', str(options['watch_interval'])],
+                stdout=log,
+                stderr=subprocess.STDOUT,
+                env=env,
+            )
+        try:
+            self.wait_for(lambda: 'Watching' in watcher_log.read_text(), timeout=30, what='watch_bookmarks to start')
+            results, reloads, reload_timeouts = self.drive(bookmarks_path, snapshot_path, count, options)
+        finally:
+            watcher.send_signal(signal.SIGINT)
+            try:
+                watcher.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                watcher.kill()
+
+        reload_errors = [line for line in watcher_log.read_text().splitlines() if 'Error reloading' in line]
+        self.report(results, reloads, reload_errors, reload_timeouts)
+
+    def wait_for(self, condition: Any, timeout: float, what: str) -> None:
+        deadline = time.monotonic() + timeout
+        while not condition():
+            if time.monotonic() > deadline:
+                raise CommandError(f'Timed out waiting for {what}')
+            time.sleep(0.01)
+
+    def drive(
+        self,
+        bookmarks_path: Path,
+        snapshot_path: Path,
+        count: int,
+        options: dict[str, Any],
+    ) -> tuple[SoakResults, int, list[str]]:
+        """Run the client threads through the steady and reload phases"""
+        stop = threading.Event()
+        phase = ['steady']
+        reloads = 0
+        timeouts: list[str] = []
+        per_thread = [SoakResults() for _ in range(options['threads'])]
+
+        def client_loop(results: SoakResults, seed: int) -> None:
+            client = Client(HTTP_HOST='127.0.0.1')
+            rng = random.Random(seed)
+            while not stop.is_set():
+                n = rng.randrange(count)
+                if rng.random() < 0.75:
+                    path = f'/search/?q=k{n:05d}+term{n}'
+                    expected = 302
+                else:
+                    path = f'/api/suggestions/?q={f"k{n:05d}"[:rng.randint(1, 6)]}'
+                    expected = 200
+                current_phase = phase[0]
+                start = time.perf_counter()
+                try:
+                    status = client.get(path).status_code
+                except OperationalError as e:
+                    (results.lock_errors if 'locked' in str(e) else results.server_errors).append(f'{path}: {e}')
+                    continue
+                except Exception as e:
+                    results.server_errors.append(f'{path}: {e!r}')
+                    continue
+                results.latencies[current_phase].append(time.perf_counter() - start)
+                if status == 404:
+                    results.not_found.append(path)
+                elif status != expected:
+                    results.server_errors.append(f'{path}: HTTP {status}')
+            connections.close_all()
+
+        def reload_loop() -> None:
+            # Rewrite the file as soon as the previous revision is published
+            nonlocal reloads
+            revision = 0
+            while not stop.is_set():
+                revision += 1
+                marker = snapshot_path.stat().st_mtime_ns
+                write_bookmarks_file(bookmarks_path, generated_bookmarks(count, revision))
+                deadline = time.monotonic() + RELOAD_TIMEOUT
+                while snapshot_path.stat().st_mtime_ns == marker:
+                    if time.monotonic() > deadline:
+                        timeouts.append(f'Revision {revision} was not published within {RELOAD_TIMEOUT}s')
+                        return
+                    time.sleep(0.005)
+                reloads += 1
+
+        threads = [threading.Thread(target=client_loop, args=(results, n)) for n, results in enumerate(per_thread)]
+        for thread in threads:
+            thread.start()
+        time.sleep(options['steady'])
+
+        self.stdout.write('🔄 Reloading in a tight loop...')
+        phase[0] = 'reload'
+        reloader = threading.Thread(target=reload_loop)
+        reloader.start()
+        time.sleep(options['reload'])
+        stop.set()
+        for thread in [*threads, reloader]:
+            thread.join()
+
+        merged = SoakResults()
+        for results in per_thread:
+            merged.merge(results)
+        return merged, reloads, timeouts
+
+    def report(self, results: SoakResults, reloads: int, reload_errors: list[str], reload_timeouts: list[str]) -> None:
+        self.stdout.write(f'\n{"phase":<8} {"requests":>9} {"p50 ms":>8} {"p95 ms":>8} {"p99 ms":>8} {"max ms":>8}')
+        for phase, latencies in results.latencies.items():
+            latencies.sort()
+            self.stdout.write(
+                f'{phase:<8} {len(latencies):>9} '
+                + ' '.join(f'{percentile(latencies, q) * 1000:>8.2f}' for q in (0.5, 0.95, 0.99, 1.0))
+            )
+        self.stdout.write(f'\nReloads completed: {reloads}')
+
+        failures = {
+            'Spurious 404s': results.not_found,
+            'Server errors': results.server_errors,
+            'DB lock errors': results.lock_errors,
+            'Reload errors': reload_errors,
+            'Reload timeouts': reload_timeouts,
+        }
+        for label, items in failures.items():
+            self.stdout.write(f'{label}: {len(items)}')
+            for item in items[:5]:
+                self.stdout.write(f'  {item}')
+        logger.info(f"Soak test finished: {reloads} reloads, " + ', '.join(f'{label}={len(items)}' for label, items in failures.items()))
+
+        if reloads == 0:
+            raise CommandError('No reload completed during the reload phase')
+        if any(failures.values()):
+            raise CommandError('Reloads were visible to live traffic')
+        self.stdout.write(self.style.SUCCESS('✓ Reloads were invisible to live traffic'))
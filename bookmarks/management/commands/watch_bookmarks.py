@@ -8,9 +8,21 @@ from pathlib import Path
 from typing import Any
 
 from django.core.management import call_command
-from django.core.management.base import BaseCommand, CommandParser
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+from jsonschema import ValidationError, validate
 
+from bookmarks import reloads
+from bookmarks.aliases import AliasError
+from bookmarks.gitsource import GitError, GitSource, diff_entries
+from bookmarks.loader import (
+    apply_changes,
+    flatten_entries,
+    publish_snapshot,
+    sync_bookmarks,
+)
 from bookmarks.models import Bookmark
+from bookmarks.reloads import ReloadTimer, phase
+from bookmarks.validation import BOOKMARKS_SCHEMA, RESERVED_KEYWORDS
 
 # Get logger for this module
 logger = logging.getLogger(__name__)
@@ -19,6 +31,9 @@ logger = logging.getLogger(__name__)
 class Command(BaseCommand):
     help = 'Watch bunnify.json file for changes and reload automatically'
 
+    # Last commit, blob and flattened bookmarks applied in --git mode
+    git_state: dict[str, Any] | None = None
+
     def add_arguments(self, parser: CommandParser) -> None:
         parser.add_argument(
             '--file',
@@ -28,10 +43,45 @@ class Command(BaseCommand):
         )
         parser.add_argument(
             '--interval',
-            type=int,
+            type=float,
             default=2,
             help='Check interval in seconds (default: 2)'
         )
+        parser.add_argument(
+            '--namespace',
+            type=str,
+            default='',
+            help='Reload the file as the personal bookmarks of this namespace'
+        )
+        parser.add_argument(
+            '--git',
+            type=str,
+            default=None,
+            help='Follow the bookmarks file in this git checkout or bare mirror instead of --file'
+        )
+        parser.add_argument(
+            '--git-path',
+            type=str,
+            default='bunnify.json',
+            help='Path of the bookmarks file inside the repository (default: bunnify.json)'
+        )
+        parser.add_argument(
+            '--git-ref',
+            type=str,
+            default=None,
+            help="Ref to follow (default: the current branch's upstream, else HEAD)"
+        )
+        parser.add_argument(
+            '--fetch-interval',
+            type=float,
+            default=60,
+            help='Seconds between fetches from the remote in --git mode (default: 60)'
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='In --git mode, fetch and apply the latest commit once, then exit'
+        )
 
     def get_file_hash(self, filepath: Path) -> str | None:
         """Calculate SHA256 hash of file contents"""
@@ -41,6 +91,9 @@ class Command(BaseCommand):
             return None
 
     def handle(self, *args: Any, **options: Any) -> None:
+        if options['git']:
+            self.watch_git(options)
+            return
         json_file_path = Path(options['file']).resolve()
         interval = options['interval']
         
@@ -76,13 +129,16 @@ class Command(BaseCommand):
                     try:
                         # Reload bookmarks
                         logger.info("Reloading bookmarks via load_bookmarks command")
-                        call_command('load_bookmarks', file=str(json_file_path), verbosity=0)
+                        previous = reloads.last
+                        call_command('load_bookmarks', file=str(json_file_path), namespace=options['namespace'], verbosity=0)
                         
                         # Count loaded bookmarks
-                        count = Bookmark.objects.count()
+                        count = Bookmark.objects.filter(namespace=options['namespace']).count()
                         logger.info(f"Successfully reloaded {count} bookmarks")
+                        stats = reloads.last if reloads.last is not previous else None
+                        timing = f" in {stats['total_ms']:.0f}ms" if stats else ''
                         self.stdout.write(
-                            self.style.SUCCESS(f'✓ Reloaded {count} bookmarks\n')
+                            self.style.SUCCESS(f'✓ Reloaded {count} bookmarks{timing}\n')
                         )
                     except Exception as e:
                         logger.error(f"Error reloading bookmarks: {e}", exc_info=True)
@@ -97,3 +153,98 @@ class Command(BaseCommand):
             self.stdout.write(
                 self.style.WARNING('\n\n👋 Stopped watching for changes')
             )
+
+    def watch_git(self, options: dict[str, Any]) -> None:
+        """Poll the followed ref every --interval, fetching every --fetch-interval"""
+        source = GitSource(Path(options['git']).resolve(), options['git_path'], options['git_ref'])
+        namespace = options['namespace']
+        interval = options['interval']
+        try:
+            ref = source.ref
+            source.commit()
+        except GitError as e:
+            raise CommandError(f'Cannot read {source}: {e}')
+        logger.info(f"Starting git watcher for: {source}, ref: {ref}, interval: {interval}s")
+        if not options['once']:
+            self.stdout.write(self.style.SUCCESS(f'👀 Watching {source} at {ref} for new commits...'))
+
+        last_fetch = None
+        try:
+            while True:
+                if last_fetch is None or time.monotonic() - last_fetch >= options['fetch_interval']:
+                    last_fetch = time.monotonic()
+                    try:
+                        source.fetch()
+                    except GitError as e:
+                        logger.warning(f"Fetch failed for {source}: {e}")
+                        self.stdout.write(self.style.WARNING(f'⚠️  Fetch failed: {e}'))
+                try:
+                    self.reload_from_git(source, namespace)
+                except GitError as e:
+                    logger.error(f"Cannot read {source}: {e}")
+                    self.stdout.write(self.style.ERROR(f'✗ Cannot read {source}: {e}'))
+                if options['once']:
+                    return
+                time.sleep(interval)
+        except KeyboardInterrupt:
+            logger.info("Git watcher stopped by user (KeyboardInterrupt)")
+            self.stdout.write(self.style.WARNING('\n\n👋 Stopped watching for changes'))
+
+    def reload_from_git(self, source: GitSource, namespace: str = '') -> bool:
+        """
+        Apply the followed ref's bookmarks if its file changed since the last call.
+        The first call syncs the whole file; later ones write only the keys that the
+        blob diff changed. Returns whether anything was applied.
+        """
+        state = self.git_state
+        commit = source.commit()
+        if state is not None and commit == state['commit']:
+            return False
+        blob = source.blob(commit)
+        if state is not None and blob == state['blob']:
+            # A commit that did not touch the bookmarks file
+            state['commit'] = commit
+            return False
+
+        with ReloadTimer('git', namespace) as timer:
+            with phase('read'):
+                revision = source.last_change(commit)
+                raw = source.read(blob)
+            reloads.count('file_bytes', len(raw))
+            try:
+                with phase('parse'):
+                    data = json.loads(raw)
+                with phase('validate'):
+                    validate(instance=data, schema=BOOKMARKS_SCHEMA)
+                with phase('flatten'):
+                    entries = flatten_entries(data, namespace)
+                reloads.count('bookmarks', len(entries))
+                reserved = [key for key in entries if key in RESERVED_KEYWORDS]
+                if reserved:
+                    raise ValueError(f'Bookmark key "{reserved[0]}" is reserved ({", ".join(RESERVED_KEYWORDS)})')
+            except (ValueError, ValidationError, AliasError) as e:
+                # Keep serving the previous bookmarks; the next commit gets another chance
+                message = getattr(e, 'message', None) or str(e)
+                logger.error(f"Invalid bookmarks at {commit[:12]} in {source}: {message}")
+                self.stdout.write(self.style.ERROR(f'✗ Invalid bookmarks at {commit[:12]}: {message}'))
+                self.git_state = {'commit': commit, 'blob': blob, 'entries': state['entries'] if state else None}
+                return False
+
+            previous = state['entries'] if state else None
+            if previous is None:
+                created, updated, removed = sync_bookmarks(entries, namespace, revision, str(source))
+                summary = f'{created} created, {updated} updated, {removed} removed'
+            else:
+                with phase('diff'):
+                    changed, removed_keys = diff_entries(previous, entries)
+                apply_changes(changed, removed_keys, namespace, revision, str(source))
+                summary = f'{len(changed)} changed, {len(removed_keys)} removed'
+            snapshot = publish_snapshot(namespace)
+            self.git_state = {'commit': commit, 'blob': blob, 'entries': entries}
+            stats = timer.finish()
+
+        logger.info(f"Applied {source} at {commit}: {summary}, generation={snapshot.generation}, revision={revision}")
+        self.stdout.write(self.style.SUCCESS(
+            f"✓ Applied {commit[:12]} ({summary}) in {stats['total_ms']:.0f}ms: {timer.summary()}"
+        ))
+        return True
@@ -0,0 +1,73 @@
+"""
+Scratch database for load-generating commands (soak_test, benchmark_requests),
+so they never touch the real bookmarks.
+"""
+from __future__ import annotations
+
+import json
+import os
+import tempfile
+from collections.abc import Iterator
+from contextlib import contextmanager
+from io import StringIO
+from pathlib import Path
+from typing import Any
+
+from django.core.management import call_command
+from django.db import connections
+from django.test.utils import override_settings
+
+
+@contextmanager
+def scratch_database(prefix: str = 'bunnify-') -> Iterator[Path]:
+    """
+    Point the default database and the snapshot file at a fresh temporary
+    directory (migrated) for the duration of the block; yields the directory
+    """
+    with tempfile.TemporaryDirectory(prefix=prefix) as tmp_dir:
+        tmp_path = Path(tmp_dir)
+        connection = connections['default']
+        connection.close()
+        original_name = connection.settings_dict['NAME']
+        connection.settings_dict['NAME'] = str(tmp_path / 'scratch.sqlite3')
+        try:
+            with override_settings(BUNNIFY_SNAPSHOT_FILE=tmp_path / 'scratch.snapshot.json'):
+                call_command('migrate', verbosity=0)
+                yield tmp_path
+        finally:
+            connections.close_all()
+            connection.settings_dict['NAME'] = original_name
+
+
+def generated_bookmarks(count: int, revision: int = 0) -> dict[str, dict[str, Any]]:
+    """
+    Bookmark file of one revision: keys k00000... exist in every revision (odd ones
+    take a parameter), a tenth of them change per revision and a few short-lived
+    keys come and go
+    """
+    data = {}
+    for n in range(count):
+        key = f'k{n:05d}'
+        edited = revision if n % 10 == revision % 10 else 0
+        if n % 2:
+            data[key] = {'description': f'Search {n} (revision {edited})', 'url': f'https://example.com/{n}/?q=#{{query}}'}
+        else:
+            data[key] = {'description': f'Page {n} (revision {edited})', 'url': f'https://example.com/{n}/'}
+    for n in range(count // 100):
+        data[f'churn{revision}_{n}'] = {'description': 'Short-lived', 'url': f'https://example.com/churn/{n}/'}
+    return data
+
+
+def write_bookmarks_file(path: Path, data: dict[str, Any]) -> None:
+    """Replace the file atomically so a watcher never reads half of it"""
+    tmp = path.with_suffix('.tmp')
+    tmp.write_text(json.dumps(data), encoding='utf-8')
+    os.replace(tmp, path)
+
+
+def load_generated_bookmarks(tmp_path: Path, count: int) -> Path:
+    """Write and load a generated bookmarks file; returns its path"""
+    path = tmp_path / 'bunnify.json'
+    write_bookmarks_file(path, generated_bookmarks(count))
+    call_command('load_bookmarks', file=str(path), stdout=StringIO())
+    return path
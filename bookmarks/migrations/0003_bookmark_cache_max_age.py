@@ -0,0 +1,18 @@
+# Generated by Django 6.0.1 on 2026-10-19 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookmarks', '0002_bookmark_defaults'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bookmark',
+            name='cache_max_age',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 6.0.1 on 2026-10-19 00:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookmarks', '0003_bookmark_cache_max_age'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LinkCheck',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('url', models.URLField(max_length=1000, unique=True)),
+                ('status', models.PositiveSmallIntegerField(blank=True, null=True)),
+                ('error', models.TextField(blank=True, default='')),
+                ('method', models.CharField(default='HEAD', max_length=8)),
+                ('elapsed_ms', models.FloatField(default=0)),
+                ('checked_at', models.DateTimeField(db_index=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 6.0.1 on 2026-10-19 00:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookmarks', '0004_linkcheck'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bookmark',
+            name='namespace',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=100),
+        ),
+        migrations.AlterField(
+            model_name='bookmark',
+            name='key',
+            field=models.CharField(db_index=True, max_length=100),
+        ),
+        migrations.AddConstraint(
+            model_name='bookmark',
+            constraint=models.UniqueConstraint(fields=('namespace', 'key'), name='unique_bookmark_key_per_namespace'),
+        ),
+    ]
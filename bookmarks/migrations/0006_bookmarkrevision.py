@@ -0,0 +1,23 @@
+# Generated by Django 6.0.1 on 2026-10-19 00:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookmarks', '0005_bookmark_namespace'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BookmarkRevision',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('namespace', models.CharField(blank=True, default='', max_length=100, unique=True)),
+                ('revision', models.CharField(max_length=64)),
+                ('source', models.CharField(blank=True, default='', max_length=1000)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 6.0.1 on 2026-10-19 00:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookmarks', '0006_bookmarkrevision'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SiteIcon',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('origin', models.CharField(max_length=300, unique=True)),
+                ('title', models.CharField(blank=True, default='', max_length=200)),
+                ('icon', models.BinaryField(blank=True, default=b'')),
+                ('icon_type', models.CharField(blank=True, default='', max_length=50)),
+                ('error', models.TextField(blank=True, default='')),
+                ('fetched_at', models.DateTimeField(db_index=True)),
+            ],
+        ),
+    ]
@@ -5,14 +5,70 @@ class Bookmark(models.Model):
     """
     Model to store bookmarks from the JSON file
     """
-    key = models.CharField(max_length=100, unique=True, db_index=True)
+    # Personal bookmarks live in a namespace and shadow shared ones (namespace '')
+    namespace = models.CharField(max_length=100, blank=True, default='', db_index=True)
+    key = models.CharField(max_length=100, db_index=True)
     description = models.TextField()
     url = models.URLField(max_length=1000)
     old_url = models.URLField(max_length=1000, blank=True, null=True)
     defaults = models.JSONField(default=dict, blank=True)  # Default values for parameters
+    cache_max_age = models.PositiveIntegerField(blank=True, null=True)  # Browser cache lifetime of the redirect (seconds)
     
     class Meta:
         ordering = ['key']
+        constraints = [
+            models.UniqueConstraint(fields=['namespace', 'key'], name='unique_bookmark_key_per_namespace'),
+        ]
     
     def __str__(self):
+        if self.namespace:
+            return f"{self.namespace}/{self.key}: {self.description}"
         return f"{self.key}: {self.description}"
+
+
+class LinkCheck(models.Model):
+    """
+    Last liveness check of a bookmark URL (with its defaults filled in), see check_links
+    """
+    url = models.URLField(max_length=1000, unique=True)
+    status = models.PositiveSmallIntegerField(blank=True, null=True)  # HTTP status, None if the request failed
+    error = models.TextField(blank=True, default='')
+    method = models.CharField(max_length=8, default='HEAD')
+    elapsed_ms = models.FloatField(default=0)
+    checked_at = models.DateTimeField(db_index=True)
+    
+    @property
+    def ok(self) -> bool:
+        return self.status is not None and self.status < 400
+    
+    def __str__(self):
+        return f"{self.url}: {self.status or self.error}"
+
+
+class SiteIcon(models.Model):
+    """
+    Favicon and front page title of a bookmark host (scheme://host[:port]), see fetch_sites
+    """
+    origin = models.CharField(max_length=300, unique=True)
+    title = models.CharField(max_length=200, blank=True, default='')
+    icon = models.BinaryField(blank=True, default=b'')
+    icon_type = models.CharField(max_length=50, blank=True, default='')
+    error = models.TextField(blank=True, default='')
+    fetched_at = models.DateTimeField(db_index=True)
+    
+    def __str__(self):
+        return f"{self.origin}: {self.title or self.error}"
+
+
+class BookmarkRevision(models.Model):
+    """
+    Source revision of the bookmarks of a namespace, e.g. the git commit they were loaded
+    from; a label only, the generation stays the content hash
+    """
+    namespace = models.CharField(max_length=100, blank=True, default='', unique=True)
+    revision = models.CharField(max_length=64)
+    source = models.CharField(max_length=1000, blank=True, default='')  # e.g. repository:path
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"{self.namespace or '(shared)'}: {self.revision}"
@@ -0,0 +1,167 @@
+"""
+Opt-in per-request instrumentation.
+
+Views mark their phases with ``timed('lookup')``, ``timed('render')``, ...; when
+``ServerTimingMiddleware`` is active the phase durations are sent back in a
+``Server-Timing`` header (visible in the browser dev tools). Outside of an
+instrumented request ``timed`` is a no-op.
+
+The middleware can also capture a cProfile and tracemalloc dump for 1 in N
+requests, or for requests carrying an ``X-Bunnify-Profile`` header, into
+``BUNNIFY_PROFILE_DIR`` for offline analysis (``python -m pstats <file>.prof``).
+"""
+from __future__ import annotations
+
+import cProfile
+import logging
+import os
+import threading
+import time
+import tracemalloc
+from contextvars import ContextVar
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+    from django.http import HttpRequest, HttpResponse
+
+# Get logger for this module
+logger = logging.getLogger(__name__)
+
+# Request header that asks for a profile dump of this request
+PROFILE_HEADER = 'X-Bunnify-Profile'
+
+# Response header naming the dump files of a profiled request
+PROFILE_DUMP_HEADER = 'X-Bunnify-Profile-Dump'
+
+
+class RequestTimer:
+    """Accumulated phase durations (seconds) of one request, in first-seen order"""
+
+    def __init__(self) -> None:
+        self.start = time.perf_counter()
+        self.phases: dict[str, float] = {}
+
+    def add(self, name: str, duration: float) -> None:
+        self.phases[name] = self.phases.get(name, 0.0) + duration
+
+    def header(self) -> str:
+        """Server-Timing header value, durations in milliseconds"""
+        total = time.perf_counter() - self.start
+        entries = [f'{name};dur={duration * 1000:.3f}' for name, duration in self.phases.items()]
+        entries.append(f'total;dur={total * 1000:.3f}')
+        return ', '.join(entries)
+
+
+_current_timer: ContextVar[RequestTimer | None] = ContextVar('bunnify_request_timer', default=None)
+
+
+class timed:
+    """
+    Context manager that records the duration of a request phase:
+
+        with timed('lookup'):
+            bookmark = snapshot.get(key)
+    """
+    __slots__ = ('name', 'timer', 'start')
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+
+    def __enter__(self) -> None:
+        self.timer = _current_timer.get()
+        if self.timer is not None:
+            self.start = time.perf_counter()
+
+    def __exit__(self, *exc_info: object) -> None:
+        if self.timer is not None:
+            self.timer.add(self.name, time.perf_counter() - self.start)
+
+
+class timed_request:
+    """
+    Context manager that collects the ``timed`` phases of a request handled
+    outside the middleware (the fast path), yielding its RequestTimer
+    """
+    __slots__ = ('timer', 'token')
+
+    def __enter__(self) -> RequestTimer:
+        self.timer = RequestTimer()
+        self.token = _current_timer.set(self.timer)
+        return self.timer
+
+    def __exit__(self, *exc_info: object) -> None:
+        _current_timer.reset(self.token)
+
+
+class ServerTimingMiddleware:
+    """
+    Adds a Server-Timing header with the phase breakdown of every request and
+    captures sampled cProfile/tracemalloc dumps. Removes itself from the
+    middleware chain when neither is enabled.
+    """
+
+    def __init__(self, get_response: Callable[[HttpRequest], HttpResponse]) -> None:
+        self.get_response = get_response
+        self.server_timing = settings.BUNNIFY_SERVER_TIMING
+        self.sample_rate = settings.BUNNIFY_PROFILE_SAMPLE_RATE
+        self.allow_header = settings.BUNNIFY_PROFILE_HEADER
+        if not (self.server_timing or self.sample_rate or self.allow_header):
+            raise MiddlewareNotUsed
+        self.profile_dir = Path(settings.BUNNIFY_PROFILE_DIR)
+        self._counter = 0
+        # cProfile and tracemalloc are process-wide, so only one capture runs at a time
+        self._capture_lock = threading.Lock()
+
+    def should_profile(self, request: HttpRequest) -> bool:
+        if self.allow_header and request.headers.get(PROFILE_HEADER):
+            return True
+        if self.sample_rate:
+            self._counter += 1
+            return self._counter % self.sample_rate == 0
+        return False
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        timer = RequestTimer()
+        token = _current_timer.set(timer)
+        try:
+            if self.should_profile(request) and self._capture_lock.acquire(blocking=False):
+                try:
+                    response = self.profile(request)
+                finally:
+                    self._capture_lock.release()
+            else:
+                response = self.get_response(request)
+        finally:
+            _current_timer.reset(token)
+
+        if self.server_timing:
+            response['Server-Timing'] = timer.header()
+        return response
+
+    def profile(self, request: HttpRequest) -> HttpResponse:
+        """Run the request under cProfile and tracemalloc and dump both"""
+        started_tracing = not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        profiler = cProfile.Profile()
+        try:
+            response = profiler.runcall(self.get_response, request)
+            memory = tracemalloc.take_snapshot()
+        finally:
+            if started_tracing:
+                tracemalloc.stop()
+
+        match = request.resolver_match
+        name = f'{time.time_ns()}-{os.getpid()}-{match.url_name if match else "request"}'
+        self.profile_dir.mkdir(parents=True, exist_ok=True)
+        profiler.dump_stats(self.profile_dir / f'{name}.prof')
+        memory.dump(str(self.profile_dir / f'{name}.tracemalloc'))
+        logger.info(f"Profiled {request.method} {request.path}: {self.profile_dir / name}.{{prof,tracemalloc}}")
+        response[PROFILE_DUMP_HEADER] = name
+        return response
@@ -0,0 +1,216 @@
+"""
+Phase timings of bookmark reloads.
+
+A reload (``load_bookmarks``, ``watch_bookmarks``, a replica sync) runs under a
+ReloadTimer, and the loader marks its phases with ``phase('parse')``,
+``phase('write')``, ... and records byte sizes and row counts with ``count``.
+Outside of a reload both are no-ops. A finished reload is logged as one
+structured line and appended to a JSON Lines history next to the snapshot file,
+which ``/api/metrics/`` serves, so the phase that grows first with the file is
+visible without a profiler.
+
+Server processes time their side of a reload, rebuilding the snapshot and the
+suggestion index, with ``server_phase``.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+import time
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any
+
+from django.conf import settings
+
+# Get logger for this module
+logger = logging.getLogger(__name__)
+
+# Reload phases in pipeline order (a reload runs the phases its source needs)
+PHASES = ('fetch', 'read', 'parse', 'validate', 'flatten', 'diff', 'write', 'publish', 'export')
+
+
+class ReloadTimer:
+    """
+    Phase durations (seconds) and counts of one reload:
+
+        with ReloadTimer('file') as timer:
+            with phase('parse'):
+                data = json.loads(raw)
+            ...
+            timer.finish()
+    """
+
+    def __init__(self, source: str, namespace: str = '') -> None:
+        self.source = source
+        self.namespace = namespace
+        self.phases: dict[str, float] = {}
+        self.counts: dict[str, int] = {}
+        self.started_at = time.time()
+        self.start = time.perf_counter()
+        self.total: float | None = None
+
+    def __enter__(self) -> ReloadTimer:
+        self._token = _current_timer.set(self)
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        _current_timer.reset(self._token)
+
+    def add(self, name: str, duration: float) -> None:
+        self.phases[name] = self.phases.get(name, 0.0) + duration
+
+    def count(self, name: str, value: int) -> None:
+        self.counts[name] = self.counts.get(name, 0) + value
+
+    def as_dict(self) -> dict[str, Any]:
+        total = self.total if self.total is not None else time.perf_counter() - self.start
+        return {
+            'source': self.source,
+            'namespace': self.namespace,
+            'at': round(self.started_at, 3),
+            'total_ms': round(total * 1000, 3),
+            'phases_ms': {name: round(duration * 1000, 3) for name, duration in self.ordered_phases()},
+            'counts': dict(self.counts),
+        }
+
+    def ordered_phases(self) -> list[tuple[str, float]]:
+        """Phases in pipeline order, then any others in first-seen order"""
+        order = {name: position for position, name in enumerate(PHASES)}
+        return sorted(self.phases.items(), key=lambda item: order.get(item[0], len(PHASES)))
+
+    def summary(self) -> str:
+        """One-line breakdown such as: read 0.4ms, parse 2.1ms, write 5.0ms"""
+        return ', '.join(f'{name} {duration * 1000:.1f}ms' for name, duration in self.ordered_phases())
+
+    def finish(self) -> dict[str, Any]:
+        """Mark the reload as successful: log it and append it to the reload history"""
+        global last
+        self.total = time.perf_counter() - self.start
+        stats = self.as_dict()
+        fields = ' '.join(
+            [f'{name}_ms={ms}' for name, ms in stats['phases_ms'].items()]
+            + [f'{name}={value}' for name, value in self.counts.items()]
+        )
+        logger.info(
+            f"Reload finished: source={self.source} namespace={self.namespace or '-'} total_ms={stats['total_ms']} {fields}",
+            extra={'reload': stats},
+        )
+        last = stats
+        append_history(stats)
+        return stats
+
+
+_current_timer: ContextVar[ReloadTimer | None] = ContextVar('bunnify_reload_timer', default=None)
+
+# The last reload finished in this process
+last: dict[str, Any] | None = None
+
+
+class phase:
+    """
+    Context manager that records the duration of a reload phase:
+
+        with phase('diff'):
+            changed, removed = diff_entries(old, new)
+    """
+    __slots__ = ('name', 'timer', 'start')
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+
+    def __enter__(self) -> None:
+        self.timer = _current_timer.get()
+        if self.timer is not None:
+            self.start = time.perf_counter()
+
+    def __exit__(self, *exc_info: object) -> None:
+        if self.timer is not None:
+            self.timer.add(self.name, time.perf_counter() - self.start)
+
+
+def count(name: str, value: int) -> None:
+    """Add to a count (bytes, rows) of the current reload, if any"""
+    timer = _current_timer.get()
+    if timer is not None:
+        timer.count(name, value)
+
+
+def history_file() -> Path:
+    """Reload history, next to the snapshot file (its .jsonl suffix cannot clash with namespace files)"""
+    path = Path(settings.BUNNIFY_SNAPSHOT_FILE)
+    return path.with_name(f'{path.stem}.reloads.jsonl')
+
+
+_history_lock = threading.Lock()
+
+
+def append_history(stats: dict[str, Any]) -> None:
+    """Append a reload, keeping the last BUNNIFY_RELOAD_HISTORY entries"""
+    path = history_file()
+    limit = settings.BUNNIFY_RELOAD_HISTORY
+    try:
+        with _history_lock:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with open(path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(stats) + '\n')
+            # Trim once the file holds twice the limit, so most appends are a single write
+            lines = path.read_text(encoding='utf-8').splitlines(keepends=True)
+            if len(lines) > 2 * limit:
+                tmp = path.with_name(f'.{path.name}.{os.getpid()}.tmp')
+                tmp.write_text(''.join(lines[-limit:]), encoding='utf-8')
+                os.replace(tmp, path)
+    except OSError as e:
+        logger.warning(f"Cannot write reload history {path}: {e}")
+
+
+def recent_reloads(limit: int | None = None) -> list[dict[str, Any]]:
+    """The most recent reloads (of any process), newest last"""
+    limit = limit or settings.BUNNIFY_RELOAD_HISTORY
+    try:
+        lines = history_file().read_text(encoding='utf-8').splitlines()
+    except OSError:
+        return []
+    reloads = []
+    for line in lines[-limit:]:
+        try:
+            reloads.append(json.loads(line))
+        except ValueError:
+            continue  # A line cut short by a crash
+    return reloads
+
+
+class ServerPhaseStats:
+    """Count, last and slowest duration of one server-side reload phase in this process"""
+    __slots__ = ('count', 'last_ms', 'max_ms', 'last_rows')
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.last_ms = 0.0
+        self.max_ms = 0.0
+        self.last_rows = 0
+
+    def as_dict(self) -> dict[str, Any]:
+        return {'count': self.count, 'last_ms': self.last_ms, 'max_ms': self.max_ms, 'last_rows': self.last_rows}
+
+
+_server_phases: dict[str, ServerPhaseStats] = {}
+
+
+def server_phase(name: str, duration: float, rows: int = 0) -> None:
+    """Record a server-side reload phase, e.g. rebuilding the snapshot after a reload"""
+    stats = _server_phases.setdefault(name, ServerPhaseStats())
+    stats.count += 1
+    stats.last_ms = round(duration * 1000, 3)
+    stats.max_ms = max(stats.max_ms, stats.last_ms)
+    stats.last_rows = rows
+
+
+def metrics() -> dict[str, Any]:
+    """Reload statistics for /api/metrics/"""
+    return {
+        'server': {name: stats.as_dict() for name, stats in _server_phases.items()},
+        'recent': recent_reloads(),
+    }
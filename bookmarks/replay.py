@@ -0,0 +1,315 @@
+"""
+Replay of real traffic from the bunnify log.
+
+Every redirect, list and palette request is logged with its query or key, so
+the log holds the real mix of keys, parameters and unknown keys. ``read_trace``
+turns log files into a trace of (time, endpoint, path) entries and ``replay``
+sends them again, ``concurrency`` at a time, either as fast as possible or at
+their original pace sped up by ``speedup``. Latencies are collected per
+endpoint. Like the resolver, this module has no Django imports; the target is
+a running instance (``HTTPTarget``) or anything with the same ``session()``.
+"""
+from __future__ import annotations
+
+import http.client
+import logging
+import re
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from typing import TYPE_CHECKING, Any, Protocol
+from urllib.parse import quote, quote_plus, urlsplit
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+    from pathlib import Path
+
+# Get logger for this module
+logger = logging.getLogger(__name__)
+
+USER_AGENT = 'bunnify-replay/1.0'
+
+# A line of the verbose or simple log format of bunnify/settings.py
+LOG_LINE = re.compile(
+    r'^\[(?P<at>\d{4}-\d\d-\d\d \d\d:\d\d:\d\d)\] \[\w+\]'
+    r'(?: \[PID:(?P<pid>\d+)\] \[(?P<source>[\w.]+):[^\]]*\])? (?P<message>.*)$'
+)
+
+# Request messages of bookmarks.views and bookmarks.fastpath, by endpoint
+REQUEST_MESSAGES = [
+    ('search', re.compile(r"^Search redirect request: query='(?P<value>.*)'$")),
+    ('redirect', re.compile(r"^Direct bookmark redirect request: key='(?P<value>.*)'$")),
+    ('list', re.compile(r'^List bookmarks request$')),
+    ('cmd', re.compile(r'^Command palette request$')),
+]
+
+ENDPOINTS = tuple(endpoint for endpoint, _ in REQUEST_MESSAGES)
+
+
+def request_path(endpoint: str, value: str) -> str:
+    if endpoint == 'search':
+        return f'/search/?q={quote_plus(value)}'
+    if endpoint == 'redirect':
+        return f'/{quote(value)}/'
+    return f'/{endpoint}/'
+
+
+class TraceEntry:
+    """One logged request: when it arrived (seconds since the epoch) and how to send it again"""
+    __slots__ = ('at', 'endpoint', 'path')
+
+    def __init__(self, at: float, endpoint: str, path: str) -> None:
+        self.at = at
+        self.endpoint = endpoint
+        self.path = path
+
+    def __repr__(self) -> str:
+        return f"TraceEntry(at={self.at!r}, endpoint={self.endpoint!r}, path={self.path!r})"
+
+
+def parse_log(lines: Iterable[str]) -> list[TraceEntry]:
+    """
+    The requests of one log file, in log order. The fast path logs a search
+    and then hands browser URLs over to Django, which logs it again: the
+    second line of such a pair (same process, same query) is skipped.
+    """
+    trace = []
+    # Last search the fast path logged, per process
+    fast_searches: dict[str | None, str] = {}
+    for line in lines:
+        match = LOG_LINE.match(line.rstrip('\n'))
+        if match is None:
+            continue
+        for endpoint, pattern in REQUEST_MESSAGES:
+            request = pattern.match(match['message'])
+            if request is not None:
+                break
+        else:
+            continue
+        value = request.groupdict().get('value', '')
+        pid = match['pid']
+        if endpoint == 'search':
+            if match['source'] == 'bookmarks.views' and fast_searches.get(pid) == value:
+                del fast_searches[pid]
+                continue
+            if match['source'] == 'bookmarks.fastpath':
+                fast_searches[pid] = value
+        else:
+            fast_searches.pop(pid, None)
+        at = datetime.strptime(match['at'], '%Y-%m-%d %H:%M:%S').timestamp()
+        trace.append(TraceEntry(at, endpoint, request_path(endpoint, value)))
+    return trace
+
+
+def read_trace(paths: Iterable[Path], endpoints: Iterable[str] = ENDPOINTS) -> list[TraceEntry]:
+    """The requests of several log files (e.g. rotated ones), in time order"""
+    wanted = set(endpoints)
+    trace = []
+    for path in paths:
+        with open(path, encoding='utf-8', errors='replace') as f:
+            trace.extend(entry for entry in parse_log(f) if entry.endpoint in wanted)
+    # Stable: requests logged in the same second keep their log order
+    trace.sort(key=lambda entry: entry.at)
+    return trace
+
+
+def schedule(trace: list[TraceEntry], speedup: float) -> list[float]:
+    """
+    Send time of every entry in seconds after the start: the original spacing
+    divided by ``speedup``, or all at once for a speedup of 0. The log has
+    one-second resolution, so requests of the same second are spread evenly
+    across it.
+    """
+    if not speedup or not trace:
+        return [0.0] * len(trace)
+    first = trace[0].at
+    offsets = []
+    start = 0
+    while start < len(trace):
+        end = start
+        while end < len(trace) and trace[end].at == trace[start].at:
+            end += 1
+        for position in range(start, end):
+            offsets.append((trace[start].at - first + (position - start) / (end - start)) / speedup)
+        start = end
+    return offsets
+
+
+def percentile(sorted_values: list[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+class Session(Protocol):
+    """Sends requests from one worker thread"""
+
+    def get(self, path: str) -> int: ...
+
+    def close(self) -> None: ...
+
+
+class Target(Protocol):
+    def session(self) -> Session: ...
+
+
+class HTTPSession:
+    """
+    One keep-alive connection to a running instance (or a new connection per
+    request without ``keep_alive``); redirects are not followed
+    """
+
+    def __init__(self, scheme: str, netloc: str, timeout: float, keep_alive: bool = True) -> None:
+        connection_class = http.client.HTTPSConnection if scheme == 'https' else http.client.HTTPConnection
+        self.connection = connection_class(netloc, timeout=timeout)
+        self.keep_alive = keep_alive
+
+    def get(self, path: str) -> int:
+        if not self.keep_alive:
+            try:
+                return self._get(path)
+            finally:
+                self.connection.close()
+        try:
+            return self._get(path)
+        except (http.client.RemoteDisconnected, BrokenPipeError, ConnectionResetError):
+            # The server closed an idle keep-alive connection: reconnect once
+            self.connection.close()
+            return self._get(path)
+
+    def _get(self, path: str) -> int:
+        self.connection.request('GET', path, headers={'User-Agent': USER_AGENT})
+        response = self.connection.getresponse()
+        response.read()
+        return response.status
+
+    def close(self) -> None:
+        self.connection.close()
+
+
+class HTTPTarget:
+    """A running instance, e.g. http://127.0.0.1:8000"""
+
+    def __init__(self, base_url: str, timeout: float = 10.0, keep_alive: bool = True) -> None:
+        parts = urlsplit(base_url)
+        if parts.scheme not in ('http', 'https') or not parts.netloc:
+            raise ValueError(f'Not an http(s) URL: {base_url}')
+        self.scheme = parts.scheme
+        self.netloc = parts.netloc
+        self.timeout = timeout
+        self.keep_alive = keep_alive
+
+    def session(self) -> HTTPSession:
+        return HTTPSession(self.scheme, self.netloc, self.timeout, self.keep_alive)
+
+
+class EndpointStats:
+    """Latencies (seconds), statuses and errors of one endpoint"""
+
+    def __init__(self) -> None:
+        self.latencies: list[float] = []
+        self.statuses: Counter[int] = Counter()
+        self.errors: list[str] = []
+
+    def merge(self, other: EndpointStats) -> None:
+        self.latencies.extend(other.latencies)
+        self.statuses.update(other.statuses)
+        self.errors.extend(other.errors)
+
+    def as_dict(self, elapsed: float) -> dict[str, Any]:
+        latencies = sorted(self.latencies)
+        return {
+            'requests': len(latencies),
+            'per_second': round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+            **{
+                f'{name}_ms': round(percentile(latencies, fraction) * 1000, 3)
+                for name, fraction in (('p50', 0.5), ('p95', 0.95), ('p99', 0.99), ('max', 1.0))
+            },
+            'statuses': {str(status): count for status, count in sorted(self.statuses.items())},
+            'errors': len(self.errors),
+        }
+
+
+class ReplayResult:
+    """Per-endpoint statistics of a replay, and how far sends fell behind the schedule"""
+
+    def __init__(self) -> None:
+        self.endpoints: dict[str, EndpointStats] = {}
+        self.lags: list[float] = []
+        self.elapsed = 0.0
+
+    def stats(self, endpoint: str) -> EndpointStats:
+        return self.endpoints.setdefault(endpoint, EndpointStats())
+
+    def merge(self, other: ReplayResult) -> None:
+        for endpoint, stats in other.endpoints.items():
+            self.stats(endpoint).merge(stats)
+        self.lags.extend(other.lags)
+
+    def total(self) -> EndpointStats:
+        total = EndpointStats()
+        for stats in self.endpoints.values():
+            total.merge(stats)
+        return total
+
+    def as_dict(self) -> dict[str, Any]:
+        lags = sorted(self.lags)
+        return {
+            'elapsed_s': round(self.elapsed, 3),
+            'endpoints': {endpoint: stats.as_dict(self.elapsed) for endpoint, stats in sorted(self.endpoints.items())},
+            'total': self.total().as_dict(self.elapsed),
+            'lag_p99_ms': round(percentile(lags, 0.99) * 1000, 3),
+        }
+
+
+def replay(trace: list[TraceEntry], target: Target, concurrency: int = 8, speedup: float = 0.0) -> ReplayResult:
+    """Send every entry of the trace to the target with ``concurrency`` workers"""
+    offsets = schedule(trace, speedup)
+    next_position = iter(range(len(trace)))
+    position_lock = threading.Lock()
+    per_worker = [ReplayResult() for _ in range(max(1, min(concurrency, len(trace))))]
+    start = time.perf_counter()
+
+    def worker(result: ReplayResult) -> None:
+        session = target.session()
+        try:
+            while True:
+                with position_lock:
+                    position = next(next_position, None)
+                if position is None:
+                    return
+                entry = trace[position]
+                delay = start + offsets[position] - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                sent = time.perf_counter()
+                result.lags.append(max(0.0, sent - start - offsets[position]))
+                stats = result.stats(entry.endpoint)
+                try:
+                    status = session.get(entry.path)
+                except Exception as e:
+                    stats.errors.append(f'{entry.path}: {e!r}')
+                    continue
+                stats.latencies.append(time.perf_counter() - sent)
+                stats.statuses[status] += 1
+        finally:
+            session.close()
+
+    threads = [threading.Thread(target=worker, args=(result,), name=f'bunnify-replay-{n}') for n, result in enumerate(per_worker)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    merged = ReplayResult()
+    for result in per_worker:
+        merged.merge(result)
+    merged.elapsed = time.perf_counter() - start
+    total = merged.total()
+    logger.info(
+        f"Replayed {len(total.latencies)} requests in {merged.elapsed:.2f}s: "
+        f"concurrency={len(per_worker)}, speedup={speedup:g}, errors={len(total.errors)}"
+    )
+    return merged
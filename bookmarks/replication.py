@@ -0,0 +1,144 @@
+"""
+Replica side of snapshot replication.
+
+A replica polls the primary's ``/api/snapshot/`` endpoint with its own
+generation as both ``since`` and ``If-None-Match``: an unchanged primary answers
+with a bodiless 304, a changed one with the delta since that generation (or the
+full snapshot if it no longer remembers it). Changes are applied in one
+transaction and published through the snapshot file, like a local reload.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import urllib.error
+import urllib.parse
+import urllib.request
+from typing import TYPE_CHECKING, Any
+
+from .loader import apply_changes, publish_snapshot, sync_bookmarks
+from .reloads import ReloadTimer, count, phase
+from .snapshot import get_snapshot
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+    # fetch(url, headers) -> (status, body)
+    Fetcher = Callable[[str, dict[str, str]], tuple[int, bytes]]
+
+# Get logger for this module
+logger = logging.getLogger(__name__)
+
+
+class ReplicationError(Exception):
+    """The primary could not be reached or sent an unusable response"""
+
+
+def http_fetch(url: str, headers: dict[str, str], timeout: float = 5.0) -> tuple[int, bytes]:
+    """GET a URL, returning (status, body); a 304 is a normal result"""
+    request = urllib.request.Request(url, headers=headers)
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            return response.status, response.read()
+    except urllib.error.HTTPError as e:
+        if e.code == 304:
+            return 304, b''
+        raise ReplicationError(f"Primary returned HTTP {e.code} for {url}") from e
+    except (urllib.error.URLError, OSError) as e:
+        raise ReplicationError(f"Cannot reach primary at {url}: {e}") from e
+
+
+def _check_entries(entries: Any, field: str, url: str) -> None:
+    if not isinstance(entries, dict):
+        raise ReplicationError(f"Snapshot response from {url} has a non-object {field!r}")
+    for key, entry in entries.items():
+        if not isinstance(entry, dict) or not isinstance(entry.get('url'), str) or not isinstance(entry.get('description'), str):
+            raise ReplicationError(f"Snapshot response from {url} has an invalid bookmark {key!r} in {field!r}")
+
+
+def check_payload(payload: Any, url: str) -> None:
+    """Raise ReplicationError unless the payload is a full snapshot or a delta of the expected shape"""
+    if not isinstance(payload, dict):
+        raise ReplicationError(f"Snapshot response from {url} is not a JSON object")
+    if not isinstance(payload.get('generation'), str):
+        raise ReplicationError(f"Snapshot response from {url} has no generation")
+    for field in ('digest', 'revision'):
+        if payload.get(field) is not None and not isinstance(payload[field], str):
+            raise ReplicationError(f"Snapshot response from {url} has a non-string {field!r}")
+    if 'bookmarks' in payload:
+        _check_entries(payload['bookmarks'], 'bookmarks', url)
+        return
+    if not isinstance(payload.get('base'), str):
+        raise ReplicationError(f"Snapshot response from {url} has neither bookmarks nor a delta base")
+    _check_entries(payload.get('changed'), 'changed', url)
+    removed = payload.get('removed')
+    if not isinstance(removed, list) or not all(isinstance(key, str) for key in removed):
+        raise ReplicationError(f"Snapshot response from {url} has an invalid 'removed' list")
+
+
+class Replica:
+    """
+    Keeps the local bookmarks in sync with a primary node
+    """
+
+    def __init__(self, primary_url: str, fetch: Fetcher | None = None) -> None:
+        self.snapshot_url = urllib.parse.urljoin(primary_url.rstrip('/') + '/', 'api/snapshot/')
+        self.fetch = fetch or http_fetch
+
+    def _get(self, since: str | None) -> tuple[int, dict[str, Any]]:
+        url = self.snapshot_url
+        headers = {'Accept': 'application/json'}
+        if since:
+            url += '?' + urllib.parse.urlencode({'since': since})
+            headers['If-None-Match'] = f'"{since}"'
+        with phase('fetch'):
+            status, body = self.fetch(url, headers)
+        if status == 304:
+            return status, {}
+        count('response_bytes', len(body))
+        try:
+            with phase('parse'):
+                payload = json.loads(body)
+        except ValueError as e:
+            raise ReplicationError(f"Invalid snapshot response from {url}: {e}") from e
+        check_payload(payload, url)
+        return status, payload
+
+    def sync_once(self) -> str:
+        """
+        Pull and apply the primary's changes.
+        Returns 'unchanged', 'delta' or 'full' depending on what was applied.
+        """
+        # An unchanged poll is not a reload: its timer is never finished, so not recorded
+        with ReloadTimer('replica') as timer:
+            local_generation = get_snapshot().generation
+            status, payload = self._get(local_generation)
+            if status == 304:
+                return 'unchanged'
+
+            # The replica records the primary's source revision (e.g. its git commit) as a label
+            digest = payload.get('digest') or payload['generation']
+            revision = payload.get('revision')
+            if 'bookmarks' in payload:
+                sync_bookmarks(payload['bookmarks'], revision=revision)
+                kind = 'full'
+            elif payload.get('base') == local_generation:
+                apply_changes(payload['changed'], payload['removed'], revision=revision)
+                kind = 'delta'
+            else:
+                raise ReplicationError(f"Delta base {payload.get('base')} does not match local generation {local_generation}")
+
+            snapshot = publish_snapshot()
+            if snapshot.digest != digest:
+                # Local data drifted (e.g. a local edit); converge with a full copy
+                logger.warning(f"Content mismatch after {kind} sync: {snapshot.digest} != {digest}")
+                status, payload = self._get(None)
+                if 'bookmarks' not in payload:
+                    raise ReplicationError(f"Primary answered a full snapshot request without bookmarks ({status})")
+                digest = payload.get('digest') or payload['generation']
+                sync_bookmarks(payload['bookmarks'], revision=payload.get('revision'))
+                publish_snapshot()
+                kind = 'full'
+            timer.finish()
+            logger.info(f"Replicated bookmarks ({kind}): generation={payload['generation']}")
+            return kind
@@ -0,0 +1,318 @@
+"""
+Query resolution rules shared by every redirect path.
+
+This module turns "key param1 param2 ..." queries into target URLs. It is pure
+Python with no Django imports so the same rules can run inside the views, the
+fast-path dispatcher and lightweight command-line tools.
+"""
+from __future__ import annotations
+
+import re
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any, Protocol
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Mapping
+
+# Placeholders in bookmark URLs look like #{pr_id} or #{repo}
+PLACEHOLDER_PATTERN = re.compile(r'#\{(\w+)\}')
+
+# Special keys that show the bookmark list instead of redirecting
+HELP_KEYS = ('h', 'help')
+HELP_URL = '/list/'
+
+# Browsers block navigation to these URLs from web pages for security,
+# so they are displayed with copy-paste instructions instead of redirected to
+BROWSER_PROTOCOLS = ('chrome://', 'about://', 'file://')
+
+
+class BookmarkLike(Protocol):
+    """Anything with the fields needed to expand a bookmark URL"""
+    key: str
+    url: str
+    defaults: Any
+
+
+class CompiledBookmark:
+    """
+    Immutable, precompiled bookmark used by in-memory lookups.
+
+    A plain slotted class rather than a dataclass: the dataclasses module pulls in
+    inspect, which would double the startup time of `manage.py resolve`.
+    """
+    __slots__ = ('key', 'description', 'url', 'defaults', 'placeholders', 'cache_max_age')
+
+    def __init__(
+        self,
+        key: str,
+        description: str,
+        url: str,
+        defaults: dict[str, str],
+        placeholders: tuple[str, ...],
+        cache_max_age: int | None = None,
+    ) -> None:
+        self.key = key
+        self.description = description
+        self.url = url
+        self.defaults = defaults
+        self.placeholders = placeholders
+        self.cache_max_age = cache_max_age
+
+    @classmethod
+    def compile(
+        cls,
+        key: str,
+        description: str,
+        url: str,
+        defaults: Mapping[str, str] | None = None,
+        cache_max_age: int | None = None,
+    ) -> CompiledBookmark:
+        return cls(key, description, url, dict(defaults or {}), url_placeholders(url), cache_max_age)
+
+    def fields(self) -> tuple[Any, ...]:
+        """The source fields, for comparisons and content hashing"""
+        return (self.key, self.description, self.url, self.defaults, self.cache_max_age)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, CompiledBookmark):
+            return NotImplemented
+        return self.fields() == other.fields()
+
+    def __repr__(self) -> str:
+        return f"CompiledBookmark(key={self.key!r}, url={self.url!r})"
+
+
+class ResolveError(Exception):
+    """
+    A query that cannot be turned into a URL; ``message`` is shown to the user
+    """
+    code = 'error'
+    status = 400
+
+    def __init__(self, message: str) -> None:
+        super().__init__(message)
+        self.message = message
+
+
+class EmptyQuery(ResolveError):
+    code = 'empty_query'
+    status = 404
+
+
+class UnknownKey(ResolveError):
+    code = 'unknown_key'
+    status = 404
+
+    def __init__(self, key: str) -> None:
+        super().__init__(f"Bookmark '{key}' not found")
+        self.key = key
+
+
+class MissingParameter(ResolveError):
+    code = 'missing_parameter'
+    status = 400
+
+    def __init__(self, message: str, missing: list[str]) -> None:
+        super().__init__(message)
+        self.missing = missing
+
+
+@lru_cache(maxsize=4096)
+def url_placeholders(url: str) -> tuple[str, ...]:
+    """Find all placeholders in a bookmark URL (e.g., #{pr_id}, #{repo})"""
+    return tuple(PLACEHOLDER_PATTERN.findall(url))
+
+
+def split_query(query: str) -> tuple[str, str]:
+    """Split a query into its key and the rest of the string (the parameters)"""
+    parts = query.split(None, 1)
+    key = parts[0] if parts else ''
+    param_string = parts[1] if len(parts) > 1 else ''
+    return key, param_string
+
+
+def is_browser_url(url: str) -> bool:
+    """Check if this is a special protocol URL (chrome://, about://, etc.)"""
+    return url.startswith(BROWSER_PROTOCOLS)
+
+
+def redirect_max_age(bookmark: CompiledBookmark, default_max_age: int) -> int:
+    """
+    Browser cache lifetime (seconds) for a redirect to this bookmark; 0 means uncached.
+
+    Only fixed targets are cacheable: parameterized bookmarks and special browser
+    URLs are never cached. A per-bookmark "cache" value overrides the default.
+    """
+    if bookmark.placeholders or is_browser_url(bookmark.url):
+        return 0
+    if bookmark.cache_max_age is not None:
+        return bookmark.cache_max_age
+    return default_max_age
+
+
+def positional_placeholders(bookmark: BookmarkLike) -> list[str]:
+    """
+    Placeholders in the order whitespace-separated search parameters fill them:
+    required parameters first, then optional (defaulted) ones
+    """
+    defaults = bookmark.defaults or {}
+    placeholders = url_placeholders(bookmark.url)
+    return [p for p in placeholders if p not in defaults] + [p for p in placeholders if p in defaults]
+
+
+def typed_placeholders(bookmark: BookmarkLike, param_string: str) -> list[str]:
+    """Placeholders ``map_parameters`` fills from the query itself rather than from defaults"""
+    placeholders = positional_placeholders(bookmark)
+    if len(placeholders) == 1:
+        return placeholders if param_string else []
+    return placeholders[:len(param_string.split())]
+
+
+def map_parameters(bookmark: BookmarkLike, param_string: str) -> dict[str, str]:
+    """
+    Map the parameters of a search query to the placeholders of the bookmark URL.
+
+    For bookmarks with a single parameter, the whole param_string is the value.
+    For bookmarks with multiple parameters, values are split by whitespace and
+    mapped to required parameters first, then to optional (defaulted) ones.
+    """
+    key = bookmark.key
+    defaults = bookmark.defaults or {}
+    placeholders = url_placeholders(bookmark.url)
+
+    if not placeholders:
+        return {}
+
+    # Build parameter mapping
+    param_mapping = {}
+
+    if len(placeholders) == 1:
+        # Single parameter - use entire param_string
+        if param_string or placeholders[0] in defaults:
+            param_mapping[placeholders[0]] = param_string if param_string else defaults[placeholders[0]]
+        else:
+            raise MissingParameter(
+                f"Bookmark '{key}' requires a parameter.\n"
+                f"Usage: {key} <value>",
+                missing=[placeholders[0]],
+            )
+    else:
+        # Multiple parameters - split by whitespace
+        param_values = param_string.split() if param_string else []
+
+        # Separate required and optional parameters
+        required_params = [p for p in placeholders if p not in defaults]
+        optional_params = [p for p in placeholders if p in defaults]
+
+        # Map values: required params first, then optional params
+        value_index = 0
+        for placeholder in required_params:
+            if value_index < len(param_values):
+                param_mapping[placeholder] = param_values[value_index]
+                value_index += 1
+            else:
+                raise MissingParameter(
+                    f"Bookmark '{key}' requires parameter(s): {', '.join(required_params)}\n"
+                    f"Usage: {key} {' '.join(f'<{p}>' for p in required_params)}"
+                    + (f" [{'  '.join(optional_params)}]" if optional_params else ""),
+                    missing=required_params[required_params.index(placeholder):],
+                )
+
+        # Map remaining values to optional params, or use defaults
+        for placeholder in optional_params:
+            if value_index < len(param_values):
+                param_mapping[placeholder] = param_values[value_index]
+                value_index += 1
+            else:
+                param_mapping[placeholder] = defaults[placeholder]
+
+    return param_mapping
+
+
+def map_named_parameters(bookmark: BookmarkLike, params: Mapping[str, str]) -> dict[str, str]:
+    """
+    Map named parameters (e.g. from a /<key>/?name=value query string) to the
+    placeholders of the bookmark URL. Every placeholder is required.
+    """
+    param_mapping = {}
+    for placeholder in url_placeholders(bookmark.url):
+        param_value = params.get(placeholder, '')
+        if not param_value:
+            raise MissingParameter(
+                f"Missing required parameter: {placeholder}\n"
+                f"Usage: /{bookmark.key}/?{placeholder}=value",
+                missing=[placeholder],
+            )
+        param_mapping[placeholder] = param_value
+    return param_mapping
+
+
+def substitute(url: str, param_mapping: Mapping[str, str]) -> str:
+    """Replace the placeholders of a URL with their values"""
+    for placeholder, value in param_mapping.items():
+        url = url.replace(f'#{{{placeholder}}}', value)
+    return url
+
+
+def expand_url(bookmark: BookmarkLike, param_string: str) -> str:
+    """Substitute the parameters of a search query into the bookmark URL"""
+    return substitute(bookmark.url, map_parameters(bookmark, param_string))
+
+
+def expand_url_from_params(bookmark: BookmarkLike, params: Mapping[str, str]) -> str:
+    """Substitute named parameters into the bookmark URL"""
+    return substitute(bookmark.url, map_named_parameters(bookmark, params))
+
+
+def find_bookmark(
+    query: str,
+    lookup: Callable[[str], BookmarkLike | None],
+    fallback_key: str | None = None,
+) -> tuple[BookmarkLike, str]:
+    """
+    Find the bookmark for a (non-empty) search query and the parameter string to expand it with.
+
+    Unknown keys go to the fallback bookmark, if one is configured, with the whole
+    query as its parameter (e.g. "django queryset docs" becomes a Google search).
+    Raises UnknownKey otherwise.
+    """
+    key, param_string = split_query(query)
+    bookmark = lookup(key)
+    if bookmark is not None:
+        return bookmark, param_string
+    if fallback_key:
+        fallback = lookup(fallback_key)
+        if fallback is not None:
+            return fallback, query
+    raise UnknownKey(key)
+
+
+def resolve_query(
+    query: str,
+    lookup: Callable[[str], BookmarkLike | None],
+    fallback_key: str | None = None,
+) -> str:
+    """
+    Resolve a full search query ("key param1 param2 ...") to its target URL,
+    following the same rules as the /search/ endpoint.
+
+    ``lookup`` returns the bookmark for a key, or None if it does not exist.
+    Raises a ResolveError subclass if the query cannot be resolved.
+    """
+    query = query.strip()
+    if not query:
+        raise EmptyQuery("No search query provided")
+    if split_query(query)[0] in HELP_KEYS:
+        return HELP_URL
+    bookmark, param_string = find_bookmark(query, lookup, fallback_key)
+    return expand_url(bookmark, param_string)
+
+
+def error_details(error: ResolveError) -> dict[str, Any]:
+    """Machine-readable form of a resolution error"""
+    details: dict[str, Any] = {'code': error.code, 'message': error.message}
+    if isinstance(error, UnknownKey):
+        details['key'] = error.key
+    elif isinstance(error, MissingParameter):
+        details['missing'] = error.missing
+    return details
@@ -0,0 +1,184 @@
+"""
+Bounded background queue for Copilot review jobs.
+
+Each ``/review-pr/`` request submits a job instead of owning a subprocess: at most
+BUNNIFY_REVIEW_WORKERS ``get_copilot_review.sh`` processes run at once, up to
+BUNNIFY_REVIEW_MAX_QUEUED more jobs wait for a worker, and further submissions are
+rejected. A job's output lines are buffered server-side, so any number of clients
+can attach to its progress from the start or from a cursor, and a closed browser
+tab no longer abandons a running script.
+"""
+from __future__ import annotations
+
+import logging
+import subprocess
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+
+from django.conf import settings
+
+# Get logger for this module
+logger = logging.getLogger(__name__)
+
+# Job states
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+# Maximum number of output lines buffered per job
+MAX_JOB_LINES = 5000
+
+# Finished jobs kept for late (re)connections
+MAX_FINISHED_JOBS = 50
+
+
+class QueueFull(Exception):
+    """Every worker is busy and the waiting list is full"""
+
+
+class ReviewJob:
+    """
+    One review request: its state and buffered output lines
+    """
+
+    def __init__(self, pr_number: str, repo: str) -> None:
+        self.id = uuid.uuid4().hex[:12]
+        self.pr_number = pr_number
+        self.repo = repo
+        self.state = QUEUED
+        self.returncode: int | None = None
+        self.created = time.time()
+        self.lines: list[str] = []
+        self._changed = threading.Condition()
+
+    @property
+    def finished(self) -> bool:
+        return self.state in (DONE, FAILED)
+
+    def append(self, line: str) -> None:
+        with self._changed:
+            if len(self.lines) < MAX_JOB_LINES:
+                self.lines.append(line)
+            elif len(self.lines) == MAX_JOB_LINES:
+                self.lines.append('… output truncated')
+            self._changed.notify_all()
+
+    def set_state(self, state: str) -> None:
+        with self._changed:
+            self.state = state
+            self._changed.notify_all()
+
+    def read(self, cursor: int = 0, timeout: float | None = None) -> tuple[list[str], str]:
+        """
+        Lines from ``cursor`` on and the job state. With a timeout, waits up to
+        that long for new lines or a state change if there is nothing new yet.
+        """
+        with self._changed:
+            if timeout and cursor >= len(self.lines) and not self.finished:
+                state = self.state
+                self._changed.wait_for(lambda: cursor < len(self.lines) or self.state != state, timeout)
+            return self.lines[cursor:], self.state
+
+    def run(self, script: str, timeout: float) -> None:
+        """Run the review script, buffering its output (called by a worker)"""
+        self.set_state(RUNNING)
+        logger.info(f"Starting review job {self.id}: PR #{self.pr_number} in {self.repo}")
+        try:
+            process = subprocess.Popen(
+                [script, self.pr_number, self.repo],
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                text=True,
+                bufsize=1,
+            )
+        except OSError as e:
+            logger.error(f"Cannot start review job {self.id}: {e}")
+            self.append(f'❌ Cannot start review script: {e}')
+            self.set_state(FAILED)
+            return
+
+        # The script has its own wait limit; this only guards against hangs
+        killer = threading.Timer(timeout, process.kill)
+        killer.daemon = True
+        killer.start()
+        try:
+            assert process.stdout is not None
+            for line in process.stdout:
+                self.append(line.rstrip('\n'))
+            self.returncode = process.wait()
+        finally:
+            killer.cancel()
+        logger.info(f"Review job {self.id} finished with exit code {self.returncode}")
+        self.set_state(DONE if self.returncode == 0 else FAILED)
+
+
+class ReviewQueue:
+    """
+    Fixed pool of worker threads fed from a bounded waiting list
+    """
+
+    def __init__(self, workers: int, max_queued: int) -> None:
+        self.workers = workers
+        self.max_queued = max_queued
+        self._lock = threading.Lock()
+        self._pending_changed = threading.Condition(self._lock)
+        self._pending: deque[ReviewJob] = deque()
+        self._jobs: OrderedDict[str, ReviewJob] = OrderedDict()
+        self._threads: list[threading.Thread] = []
+
+    def submit(self, pr_number: str, repo: str) -> ReviewJob:
+        """
+        Queue a review, or return the unfinished job already reviewing this PR.
+        Raises QueueFull when no more jobs can wait.
+        """
+        with self._lock:
+            for job in self._jobs.values():
+                if job.pr_number == pr_number and job.repo == repo and not job.finished:
+                    return job
+            if len(self._pending) >= self.max_queued:
+                raise QueueFull(f"{len(self._pending)} reviews are already waiting")
+            job = ReviewJob(pr_number, repo)
+            self._jobs[job.id] = job
+            self._pending.append(job)
+            self._evict_finished()
+            if len(self._threads) < self.workers:
+                thread = threading.Thread(target=self._work, name=f'bunnify-review-{len(self._threads)}', daemon=True)
+                self._threads.append(thread)
+                thread.start()
+            self._pending_changed.notify()
+        logger.info(f"Queued review job {job.id}: PR #{pr_number} in {repo}")
+        return job
+
+    def get(self, job_id: str) -> ReviewJob | None:
+        return self._jobs.get(job_id)
+
+    def position(self, job: ReviewJob) -> int | None:
+        """1-based position in the waiting list, or None if not waiting"""
+        with self._lock:
+            for position, pending in enumerate(self._pending, start=1):
+                if pending is job:
+                    return position
+        return None
+
+    def _evict_finished(self) -> None:
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished]
+        for job_id in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self._jobs[job_id]
+
+    def _work(self) -> None:
+        while True:
+            with self._lock:
+                self._pending_changed.wait_for(lambda: self._pending)
+                job = self._pending.popleft()
+            try:
+                job.run(str(settings.BUNNIFY_REVIEW_SCRIPT), settings.BUNNIFY_REVIEW_TIMEOUT)
+            except Exception as e:
+                logger.error(f"Review job {job.id} crashed: {e}", exc_info=True)
+                job.append(f'❌ Error: {e}')
+                job.set_state(FAILED)
+
+
+review_queue = ReviewQueue(settings.BUNNIFY_REVIEW_WORKERS, settings.BUNNIFY_REVIEW_MAX_QUEUED)
@@ -0,0 +1,236 @@
+"""
+Cache shared by every worker process on the host.
+
+``SQLiteCache`` is a Django cache backend that keeps its entries in one SQLite
+file (WAL mode, so readers never wait for a writer), with no external service.
+The file is bounded in bytes: once the entries exceed ``MAX_BYTES`` the oldest
+stored ones are evicted. Cache errors are logged and treated as misses, so a
+locked or broken cache file never fails a request.
+
+Expensive view results go through ``generation_cached``, keyed by the bookmark
+generation they were computed from and the code that computed them
+(``code_version``). A generation is a content hash, so a result is valid for
+as long as its generation and the deployed code are current, and the first
+worker to compute it serves all the others. Entries of replaced generations or
+releases are never read again and age out through eviction.
+"""
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, TypeVar
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+# Get logger for this module
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS entries ('
+    'key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL, expires REAL, stored REAL NOT NULL)',
+    'CREATE INDEX IF NOT EXISTS entries_stored ON entries (stored)',
+)
+
+# An entry that has not expired at :now
+LIVE = '(expires IS NULL OR expires > :now)'
+
+UPDATE = 'value = excluded.value, size = excluded.size, expires = excluded.expires, stored = excluded.stored'
+
+
+class SQLiteCache(BaseCache):
+    """
+    Django cache backend on a SQLite file shared by all processes:
+
+        CACHES = {'default': {
+            'BACKEND': 'bookmarks.sharedcache.SQLiteCache',
+            'LOCATION': '/path/to/cache.sqlite3',
+            'OPTIONS': {'MAX_BYTES': 64 * 1024 * 1024},
+        }}
+    """
+
+    def __init__(self, location: str, params: dict[str, Any]) -> None:
+        super().__init__(params)
+        self.path = Path(location)
+        self.max_bytes = int(params.get('OPTIONS', {}).get('MAX_BYTES', 64 * 1024 * 1024))
+        # One connection per thread, reopened in a forked worker
+        self._local = threading.local()
+
+    def validate_key(self, key: str) -> None:
+        """Any string is a valid SQLite key (no memcached length or character limits)"""
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or self._local.pid != os.getpid():
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            for statement in SCHEMA:
+                connection.execute(statement)
+            self._local.connection, self._local.pid = connection, os.getpid()
+        return connection
+
+    def _execute(self, sql: str, parameters: dict[str, Any] | tuple[Any, ...] = ()) -> sqlite3.Cursor | None:
+        try:
+            return self._connection().execute(sql, parameters)
+        except sqlite3.Error as e:
+            logger.warning(f"Shared cache {self.path} unavailable: {e}")
+            return None
+
+    def get(self, key: str, default: Any = None, version: int | None = None) -> Any:
+        key = self.make_and_validate_key(key, version=version)
+        cursor = self._execute(f'SELECT value FROM entries WHERE key = :key AND {LIVE}', {'key': key, 'now': time.time()})
+        row = cursor.fetchone() if cursor is not None else None
+        if row is None:
+            return default
+        try:
+            return pickle.loads(row[0])
+        except Exception as e:
+            logger.warning(f"Unreadable shared cache entry {key}: {e}")
+            return default
+
+    def _store(self, key: str, value: Any, timeout: Any, only_if_missing: bool) -> bool:
+        data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        if len(data) > self.max_bytes:
+            logger.debug(f"Not caching {key}: {len(data)} bytes exceed MAX_BYTES")
+            return False
+        now = time.time()
+        # add() only replaces an entry that has expired
+        conflict = f'DO UPDATE SET {UPDATE} WHERE entries.expires IS NOT NULL AND entries.expires <= :now' \
+            if only_if_missing else f'DO UPDATE SET {UPDATE}'
+        cursor = self._execute(
+            'INSERT INTO entries (key, value, size, expires, stored) VALUES (:key, :value, :size, :expires, :now) '
+            f'ON CONFLICT (key) {conflict}',
+            {'key': key, 'value': data, 'size': len(data), 'expires': self.get_backend_timeout(timeout), 'now': now},
+        )
+        if cursor is None or cursor.rowcount == 0:
+            return False
+        self.evict(now)
+        return True
+
+    def set(self, key: str, value: Any, timeout: Any = DEFAULT_TIMEOUT, version: int | None = None) -> None:
+        self._store(self.make_and_validate_key(key, version=version), value, timeout, only_if_missing=False)
+
+    def add(self, key: str, value: Any, timeout: Any = DEFAULT_TIMEOUT, version: int | None = None) -> bool:
+        return self._store(self.make_and_validate_key(key, version=version), value, timeout, only_if_missing=True)
+
+    def touch(self, key: str, timeout: Any = DEFAULT_TIMEOUT, version: int | None = None) -> bool:
+        key = self.make_and_validate_key(key, version=version)
+        cursor = self._execute(
+            f'UPDATE entries SET expires = :expires WHERE key = :key AND {LIVE}',
+            {'key': key, 'expires': self.get_backend_timeout(timeout), 'now': time.time()},
+        )
+        return cursor is not None and cursor.rowcount > 0
+
+    def delete(self, key: str, version: int | None = None) -> bool:
+        key = self.make_and_validate_key(key, version=version)
+        cursor = self._execute('DELETE FROM entries WHERE key = :key', {'key': key})
+        return cursor is not None and cursor.rowcount > 0
+
+    def has_key(self, key: str, version: int | None = None) -> bool:
+        key = self.make_and_validate_key(key, version=version)
+        cursor = self._execute(f'SELECT 1 FROM entries WHERE key = :key AND {LIVE}', {'key': key, 'now': time.time()})
+        return cursor is not None and cursor.fetchone() is not None
+
+    def clear(self) -> None:
+        self._execute('DELETE FROM entries')
+
+    def evict(self, now: float | None = None) -> None:
+        """Drop expired entries, then the oldest stored ones until the rest fit in MAX_BYTES"""
+        cursor = self._execute('SELECT total(size) FROM entries')
+        if cursor is None or cursor.fetchone()[0] <= self.max_bytes:
+            return
+        self._execute(
+            'DELETE FROM entries WHERE (expires IS NOT NULL AND expires <= :now) OR key IN ('
+            f' SELECT key FROM (SELECT key, sum(size) OVER (ORDER BY stored DESC, key) AS kept FROM entries WHERE {LIVE})'
+            ' WHERE kept > :max_bytes)',
+            {'now': time.time() if now is None else now, 'max_bytes': self.max_bytes},
+        )
+
+    def stats(self) -> dict[str, Any]:
+        cursor = self._execute('SELECT count(*), total(size) FROM entries')
+        entries, size = cursor.fetchone() if cursor is not None else (0, 0)
+        return {'location': str(self.path), 'entries': entries, 'bytes': int(size), 'max_bytes': self.max_bytes}
+
+
+class SharedCacheStats:
+    """Hits and misses of generation_cached per result name, in this process"""
+
+    def __init__(self) -> None:
+        self.hits: dict[str, int] = {}
+        self.misses: dict[str, int] = {}
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            name: {'hits': self.hits.get(name, 0), 'misses': self.misses.get(name, 0)}
+            for name in sorted({*self.hits, *self.misses})
+        }
+
+
+stats = SharedCacheStats()
+
+
+@lru_cache(maxsize=1)
+def code_version() -> str:
+    """
+    BUNNIFY_RELEASE, or a hash of the bookmarks app's modules and templates, so
+    a deploy that changes how results are rendered starts with fresh keys
+    """
+    if settings.BUNNIFY_RELEASE:
+        return settings.BUNNIFY_RELEASE
+    package = Path(__file__).resolve().parent
+    digest = hashlib.sha256()
+    for path in sorted([*package.glob('*.py'), *package.glob('templates/**/*.html')]):
+        digest.update(path.relative_to(package).as_posix().encode())
+        digest.update(path.read_bytes())
+    return digest.hexdigest()[:12]
+
+
+# Latest result per name in this process, so the current generation costs no cache read
+_latest: dict[str, tuple[str, Any]] = {}
+
+
+def generation_cached(name: str, generation: str, build: Callable[[], T]) -> T:
+    """
+    The result ``name`` for a bookmark generation: from the shared cache if
+    any worker computed it already, otherwise ``build()``, stored for the others
+    """
+    latest = _latest.get(name)
+    if latest is not None and latest[0] == generation:
+        stats.hits[name] = stats.hits.get(name, 0) + 1
+        return latest[1]
+    key = f'bunnify:{code_version()}:{name}:{generation}'
+    value = cache.get(key)
+    if value is not None:
+        stats.hits[name] = stats.hits.get(name, 0) + 1
+    else:
+        stats.misses[name] = stats.misses.get(name, 0) + 1
+        value = build()
+        # Valid for as long as the generation is current; size-bounded eviction removes it later
+        cache.set(key, value, timeout=None)
+    _latest[name] = (generation, value)
+    return value
+
+
+def metrics() -> dict[str, Any]:
+    """Shared cache statistics for /api/metrics/"""
+    backend = caches['default']
+    return {
+        'backend': type(backend).__name__,
+        **(backend.stats() if isinstance(backend, SQLiteCache) else {}),
+        'results': stats.as_dict(),
+    }
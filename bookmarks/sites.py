@@ -0,0 +1,240 @@
+"""
+Favicons and page titles of bookmark hosts.
+
+Bookmarks are grouped by origin (scheme://host[:port]) and every origin is
+fetched once, concurrently: its front page for the ``<title>`` and the icons it
+declares, then the first icon that is an image of a bounded size, falling back
+to ``/favicon.ico``. Like the link checker, this module has no Django imports;
+``fetch_sites`` stores the results and ``/api/sites/`` serves them to the pages
+as one map of data URIs.
+"""
+from __future__ import annotations
+
+import base64
+import http.client
+import logging
+import re
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from html.parser import HTMLParser
+from typing import TYPE_CHECKING, Any
+from urllib.parse import urljoin, urlsplit
+
+from .resolver import is_browser_url
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+
+# Get logger for this module
+logger = logging.getLogger(__name__)
+
+USER_AGENT = 'bunnify-site-fetch/1.0'
+
+# Bytes of a front page read while looking for its title and icons
+MAX_PAGE_BYTES = 256 * 1024
+
+# Longest title kept, in characters
+MAX_TITLE_LENGTH = 200
+
+# Image types recognised by their first bytes, for servers that send no usable Content-Type
+IMAGE_SIGNATURES = [
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'\x00\x00\x01\x00', 'image/x-icon'),
+    (b'GIF8', 'image/gif'),
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'RIFF', 'image/webp'),
+]
+
+# An image MIME type that is safe to put in a data URI (and fits SiteIcon.icon_type)
+IMAGE_TYPE = re.compile(r'^image/[a-z0-9.+-]{1,44}$')
+
+
+def site_origin(url: str) -> str | None:
+    """
+    The origin a bookmark URL belongs to, e.g. https://github.com for
+    https://github.com/#{repo}. None for browser URLs and hosts with placeholders.
+    """
+    if is_browser_url(url):
+        return None
+    parts = urlsplit(url)
+    if parts.scheme not in ('http', 'https') or '{' in parts.netloc:
+        return None
+    try:
+        host, port = parts.hostname, parts.port
+    except ValueError:
+        return None
+    if not host:
+        return None
+    if port is None or port == (443 if parts.scheme == 'https' else 80):
+        return f'{parts.scheme}://{host}'
+    return f'{parts.scheme}://{host}:{port}'
+
+
+class SiteResult:
+    """
+    Title and icon of one origin; ``error`` says why either is missing
+    """
+    __slots__ = ('origin', 'title', 'icon', 'icon_type', 'error', 'elapsed')
+
+    def __init__(
+        self,
+        origin: str,
+        title: str = '',
+        icon: bytes = b'',
+        icon_type: str = '',
+        error: str = '',
+        elapsed: float = 0.0,
+    ) -> None:
+        self.origin = origin
+        self.title = title
+        self.icon = icon
+        self.icon_type = icon_type
+        self.error = error
+        self.elapsed = elapsed
+
+    def __repr__(self) -> str:
+        return f"SiteResult(origin={self.origin!r}, title={self.title!r}, icon={len(self.icon)} bytes, error={self.error!r})"
+
+
+def data_uri(icon: bytes, icon_type: str) -> str | None:
+    if not icon or not IMAGE_TYPE.match(icon_type):
+        return None
+    return f'data:{icon_type};base64,{base64.b64encode(icon).decode()}'
+
+
+class PageParser(HTMLParser):
+    """Collects the first <title> and the <link rel="icon"> hrefs of a page"""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.title: str | None = None
+        self.icons: list[str] = []
+        self._in_title = False
+        self._title_parts: list[str] = []
+
+    def handle_starttag(self, tag: str, attrs: list[tuple[str, str | None]]) -> None:
+        if tag == 'title' and self.title is None:
+            self._in_title = True
+        elif tag == 'link':
+            values = dict(attrs)
+            rel = (values.get('rel') or '').lower().split()
+            href = values.get('href')
+            if href and ('icon' in rel or 'apple-touch-icon' in rel):
+                self.icons.append(href)
+
+    def handle_data(self, data: str) -> None:
+        if self._in_title:
+            self._title_parts.append(data)
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag == 'title' and self._in_title:
+            self._in_title = False
+            self.title = ' '.join(''.join(self._title_parts).split())[:MAX_TITLE_LENGTH]
+
+
+def image_type(content_type: str, body: bytes) -> str | None:
+    """The image MIME type of an icon response, or None if it is not an image"""
+    declared = content_type.split(';')[0].strip().lower()
+    if IMAGE_TYPE.match(declared):
+        return declared
+    for signature, mime in IMAGE_SIGNATURES:
+        if body.startswith(signature):
+            return mime
+    if body.lstrip()[:5].lower() == b'<svg ':
+        return 'image/svg+xml'
+    return None
+
+
+class SiteFetcher:
+    """
+    Fetches the titles and icons of many origins, ``concurrency`` at a time
+    """
+
+    def __init__(self, concurrency: int = 16, timeout: float = 10.0, max_icon_bytes: int = 32 * 1024) -> None:
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.max_icon_bytes = max_icon_bytes
+
+    def get(self, url: str, limit: int) -> tuple[str, str, bytes]:
+        """Final URL, Content-Type and at most ``limit + 1`` bytes of the body of a GET"""
+        request = urllib.request.Request(url, headers={'User-Agent': USER_AGENT, 'Accept': '*/*'})
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            return response.geturl(), response.headers.get('Content-Type', ''), response.read(limit + 1)
+
+    def page(self, result: SiteResult) -> list[str]:
+        """Read the front page's title into ``result``; return the icon URLs it declares"""
+        try:
+            url, content_type, body = self.get(result.origin + '/', MAX_PAGE_BYTES)
+        except (OSError, ValueError, http.client.HTTPException) as e:
+            result.error = f'page: {getattr(e, "reason", None) or e}'
+            return []
+        charset = 'utf-8'
+        for parameter in content_type.split(';')[1:]:
+            name, _, value = parameter.strip().partition('=')
+            if name.lower() == 'charset' and value:
+                charset = value.strip('"\'')
+        parser = PageParser()
+        try:
+            parser.feed(body[:MAX_PAGE_BYTES].decode(charset, errors='replace'))
+        except LookupError:
+            parser.feed(body[:MAX_PAGE_BYTES].decode('utf-8', errors='replace'))
+        result.title = parser.title or ''
+        return [urljoin(url, href) for href in parser.icons if not href.startswith('data:')]
+
+    def icon(self, result: SiteResult, candidates: list[str]) -> None:
+        """Store the first candidate that is an image of at most max_icon_bytes"""
+        errors = []
+        for url in dict.fromkeys(candidates):
+            try:
+                _, content_type, body = self.get(url, self.max_icon_bytes)
+            except (OSError, ValueError, http.client.HTTPException) as e:
+                errors.append(f'{url}: {getattr(e, "reason", None) or e}')
+                continue
+            if len(body) > self.max_icon_bytes:
+                errors.append(f'{url}: larger than {self.max_icon_bytes} bytes')
+                continue
+            mime = image_type(content_type, body)
+            if mime is None or not body:
+                errors.append(f'{url}: not an image')
+                continue
+            result.icon, result.icon_type = body, mime
+            return
+        if errors:
+            result.error = '; '.join(filter(None, [result.error, *errors]))
+
+    def fetch(self, origin: str) -> SiteResult:
+        result = SiteResult(origin)
+        start = time.perf_counter()
+        icons = self.page(result)
+        self.icon(result, [*icons, origin + '/favicon.ico'])
+        result.elapsed = time.perf_counter() - start
+        if result.error:
+            logger.debug(f"Site {origin}: {result.error}")
+        return result
+
+    def fetch_all(self, origins: Iterable[str]) -> dict[str, SiteResult]:
+        unique = list(dict.fromkeys(origins))
+        if not unique:
+            return {}
+        with ThreadPoolExecutor(max_workers=min(self.concurrency, len(unique))) as executor:
+            return {result.origin: result for result in executor.map(self.fetch, unique)}
+
+
+def fetch_sites(
+    origins: Iterable[str],
+    concurrency: int = 16,
+    timeout: float = 10.0,
+    max_icon_bytes: int = 32 * 1024,
+) -> dict[str, SiteResult]:
+    """Fetch the title and icon of every origin (duplicates once) and return the results by origin"""
+    return SiteFetcher(concurrency, timeout, max_icon_bytes).fetch_all(origins)
+
+
+def site_map(sites: Iterable[Any]) -> dict[str, dict[str, str | None]]:
+    """{origin: {'title': ..., 'icon': data URI or None}} of stored sites"""
+    return {
+        site.origin: {'title': site.title, 'icon': data_uri(bytes(site.icon), site.icon_type)}
+        for site in sites
+        if site.title or site.icon
+    }
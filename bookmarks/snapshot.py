@@ -0,0 +1,345 @@
+"""
+In-memory, per-generation snapshot of the bookmark table.
+
+The snapshot is rebuilt lazily from the database whenever the bookmark set
+changes: in-process through model signals, and across processes (e.g. the
+``watch_bookmarks`` watcher) through the snapshot file that ``load_bookmarks``
+writes after every reload. Checking for changes costs one ``stat()`` call.
+
+Personal namespaces are layered over the shared snapshot: a NamespaceSnapshot
+holds only the namespace's own bookmarks and falls back to the shared ones, and
+has its own snapshot file, so personal and shared reloads never rebuild each other.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any
+
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Bookmark, BookmarkRevision
+from .reloads import server_phase
+from .resolver import CompiledBookmark
+
+# Get logger for this module
+logger = logging.getLogger(__name__)
+
+# Valid namespace names; also used in snapshot file names
+NAMESPACE_PATTERN = re.compile(r'[a-zA-Z0-9_-]{1,100}')
+
+
+class BookmarkSnapshot:
+    """
+    Immutable view of every bookmark, keyed by bookmark key.
+
+    The generation is always the content hash (``digest``), so any edit starts
+    a new one. ``revision`` only labels the source the bookmarks were last
+    loaded from, e.g. a git commit SHA; edits made since keep the label.
+    """
+    __slots__ = ('generation', 'digest', 'revision', 'bookmarks')
+
+    def __init__(self, bookmarks: dict[str, CompiledBookmark], revision: str | None = None) -> None:
+        self.bookmarks = bookmarks
+        self.digest = self.compute_generation(bookmarks)
+        self.generation = self.digest
+        self.revision = revision
+
+    @staticmethod
+    def compute_generation(bookmarks: dict[str, CompiledBookmark]) -> str:
+        """Content hash of the bookmark set; identical data gives an identical generation"""
+        content = json.dumps(
+            [b.fields() for b in sorted(bookmarks.values(), key=lambda b: b.key)],
+            sort_keys=True,
+        )
+        return hashlib.sha256(content.encode()).hexdigest()[:16]
+
+    @staticmethod
+    def compile_rows(namespace: str = '') -> dict[str, CompiledBookmark]:
+        """Compiled bookmarks of one namespace ('' for the shared bookmarks)"""
+        rows = (
+            Bookmark.objects.filter(namespace=namespace)
+            .order_by('key')
+            .values_list('key', 'description', 'url', 'defaults', 'cache_max_age')
+        )
+        return {
+            key: CompiledBookmark.compile(key, description, url, defaults, cache_max_age)
+            for key, description, url, defaults, cache_max_age in rows
+        }
+
+    @staticmethod
+    def source_revision(namespace: str = '') -> str | None:
+        """The recorded source revision of a namespace's bookmarks, if any"""
+        return BookmarkRevision.objects.filter(namespace=namespace).values_list('revision', flat=True).first()
+
+    @classmethod
+    def from_database(cls) -> BookmarkSnapshot:
+        return cls(cls.compile_rows(), cls.source_revision())
+
+    def get(self, key: str) -> CompiledBookmark | None:
+        return self.bookmarks.get(key)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.bookmarks
+
+    def __len__(self) -> int:
+        return len(self.bookmarks)
+
+    @staticmethod
+    def entry(bookmark: CompiledBookmark) -> dict[str, Any]:
+        """Serializable form of one bookmark, in the same shape as bunnify.json"""
+        return {
+            'description': bookmark.description,
+            'url': bookmark.url,
+            'defaults': bookmark.defaults,
+            'cache': bookmark.cache_max_age,
+        }
+
+    def to_dict(self) -> dict[str, Any]:
+        """Serializable form, in the same shape as bunnify.json"""
+        return {
+            'generation': self.generation,
+            'digest': self.digest,
+            'revision': self.revision,
+            'bookmarks': {b.key: self.entry(b) for b in self.bookmarks.values()},
+        }
+
+    def diff(self, base: BookmarkSnapshot) -> tuple[dict[str, dict[str, Any]], list[str]]:
+        """
+        Changes from ``base`` to this snapshot: (created or updated entries, removed keys)
+        """
+        changed = {
+            key: self.entry(bookmark)
+            for key, bookmark in self.bookmarks.items()
+            if base.bookmarks.get(key) != bookmark
+        }
+        removed = [key for key in base.bookmarks if key not in self.bookmarks]
+        return changed, removed
+
+
+class NamespaceSnapshot:
+    """
+    Personal bookmarks of one namespace layered over the shared snapshot.
+
+    Only the personal bookmarks are stored, so memory grows with personal
+    overrides, not with users times bookmarks.
+    """
+    __slots__ = ('namespace', 'base', 'overrides', 'revision', 'generation')
+
+    def __init__(
+        self,
+        namespace: str,
+        base: BookmarkSnapshot,
+        overrides: dict[str, CompiledBookmark],
+        revision: str | None = None,
+    ) -> None:
+        self.namespace = namespace
+        self.base = base
+        self.overrides = overrides
+        self.revision = revision
+        personal = BookmarkSnapshot.compute_generation(overrides)
+        self.generation = hashlib.sha256(f'{base.generation}:{namespace}:{personal}'.encode()).hexdigest()[:16]
+
+    @classmethod
+    def from_database(cls, namespace: str, base: BookmarkSnapshot) -> NamespaceSnapshot:
+        return cls(
+            namespace,
+            base,
+            BookmarkSnapshot.compile_rows(namespace),
+            BookmarkSnapshot.source_revision(namespace),
+        )
+
+    def rebase(self, base: BookmarkSnapshot) -> NamespaceSnapshot:
+        """The same personal bookmarks over a new shared snapshot, without touching the database"""
+        return NamespaceSnapshot(self.namespace, base, self.overrides, self.revision)
+
+    def get(self, key: str) -> CompiledBookmark | None:
+        bookmark = self.overrides.get(key)
+        return bookmark if bookmark is not None else self.base.get(key)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.overrides or key in self.base
+
+    def __len__(self) -> int:
+        return len(self.base) + sum(1 for key in self.overrides if key not in self.base)
+
+    def to_dict(self) -> dict[str, Any]:
+        """Serializable form of the personal bookmarks, in the same shape as bunnify.json"""
+        return {
+            'namespace': self.namespace,
+            'generation': self.generation,
+            'revision': self.revision,
+            'bookmarks': {b.key: BookmarkSnapshot.entry(b) for b in self.overrides.values()},
+        }
+
+
+_lock = threading.Lock()
+_snapshot: BookmarkSnapshot | None = None
+_snapshot_marker: tuple[int, int] | None = None
+# Bumped on every in-process invalidation so a rebuild racing with a write is not cached
+_version = 0
+# Recently served snapshots by generation, so replicas can be sent deltas
+_history: OrderedDict[str, BookmarkSnapshot] = OrderedDict()
+# Namespace snapshots with the snapshot file marker they were built at, least recently used first
+_namespaces: OrderedDict[str, tuple[NamespaceSnapshot, tuple[int, int] | None]] = OrderedDict()
+# Bumped on every in-process namespace invalidation, like _version
+_namespace_version = 0
+
+
+def snapshot_file(namespace: str = '') -> Path:
+    """Snapshot file of a namespace; the shared bookmarks use BUNNIFY_SNAPSHOT_FILE itself"""
+    path = Path(settings.BUNNIFY_SNAPSHOT_FILE)
+    if not namespace:
+        return path
+    return path.with_name(f'{path.stem}.{namespace}{path.suffix}')
+
+
+def _file_marker(namespace: str = '') -> tuple[int, int] | None:
+    """Identity of the current snapshot file (inode, mtime); changes on every reload"""
+    try:
+        st = os.stat(snapshot_file(namespace))
+    except OSError:
+        return None
+    return (st.st_ino, st.st_mtime_ns)
+
+
+def current_snapshot(namespace: str = '') -> BookmarkSnapshot | NamespaceSnapshot | None:
+    """Return the cached snapshot if it is still fresh, without touching the database"""
+    snapshot = _snapshot
+    if snapshot is None or _file_marker() != _snapshot_marker:
+        return None
+    if not namespace:
+        return snapshot
+    cached = _namespaces.get(namespace)
+    if cached is not None and cached[0].base is snapshot and _file_marker(namespace) == cached[1]:
+        return cached[0]
+    return None
+
+
+def get_snapshot() -> BookmarkSnapshot:
+    """Return a fresh snapshot, rebuilding it from the database if the bookmarks changed"""
+    global _snapshot, _snapshot_marker
+    snapshot = _snapshot
+    if snapshot is not None and _file_marker() == _snapshot_marker:
+        return snapshot
+    with _lock:
+        marker = _file_marker()
+        if _snapshot is not None and marker == _snapshot_marker:
+            return _snapshot
+        version = _version
+        start = time.perf_counter()
+        snapshot = BookmarkSnapshot.from_database()
+        elapsed = time.perf_counter() - start
+        server_phase('snapshot_rebuild', elapsed, len(snapshot))
+        logger.info(
+            f"Rebuilt bookmark snapshot: generation={snapshot.generation}, count={len(snapshot)}, ms={elapsed * 1000:.1f}"
+        )
+        if version == _version:
+            _snapshot, _snapshot_marker = snapshot, marker
+        _history[snapshot.generation] = snapshot
+        _history.move_to_end(snapshot.generation)
+        while len(_history) > settings.BUNNIFY_SNAPSHOT_HISTORY:
+            _history.popitem(last=False)
+        return snapshot
+
+
+def get_namespace_snapshot(namespace: str) -> NamespaceSnapshot:
+    """
+    Return a fresh snapshot of a namespace. Personal changes reload only the
+    personal bookmarks; shared changes only re-layer them over the new shared snapshot.
+    """
+    version = _namespace_version
+    base = get_snapshot()
+    marker = _file_marker(namespace)
+    cached = _namespaces.get(namespace)
+    if cached is not None and cached[1] == marker:
+        if cached[0].base is base:
+            with _lock:
+                if namespace in _namespaces:
+                    _namespaces.move_to_end(namespace)
+            return cached[0]
+        # Only the shared bookmarks changed: keep the personal ones
+        overlay = cached[0].rebase(base)
+    else:
+        start = time.perf_counter()
+        overlay = NamespaceSnapshot.from_database(namespace, base)
+        elapsed = time.perf_counter() - start
+        server_phase('namespace_rebuild', elapsed, len(overlay.overrides))
+        logger.info(
+            f"Rebuilt namespace snapshot: namespace={namespace}, overrides={len(overlay.overrides)}, ms={elapsed * 1000:.1f}"
+        )
+    with _lock:
+        if version != _namespace_version:
+            # Invalidated while building: serve it, but let the next request rebuild
+            return overlay
+        _namespaces[namespace] = (overlay, marker)
+        _namespaces.move_to_end(namespace)
+        while len(_namespaces) > settings.BUNNIFY_NAMESPACE_CACHE_SIZE:
+            _namespaces.popitem(last=False)
+    return overlay
+
+
+def snapshot_for(namespace: str) -> BookmarkSnapshot | NamespaceSnapshot:
+    """The snapshot that requests in a namespace resolve against ('' for the shared bookmarks)"""
+    return get_namespace_snapshot(namespace) if namespace else get_snapshot()
+
+
+def snapshot_for_generation(generation: str) -> BookmarkSnapshot | None:
+    """A recently served snapshot, if this process still remembers the generation"""
+    return _history.get(generation)
+
+
+def invalidate() -> None:
+    """Drop the cached snapshot; the next lookup rebuilds it"""
+    global _snapshot, _version
+    _version += 1
+    _snapshot = None
+
+
+def invalidate_namespace(namespace: str) -> None:
+    """Drop the cached snapshot of one namespace; the shared snapshot is kept"""
+    global _namespace_version
+    _namespace_version += 1
+    _namespaces.pop(namespace, None)
+
+
+@receiver(post_save, sender=Bookmark)
+@receiver(post_delete, sender=Bookmark)
+def _bookmark_changed(sender: type[Bookmark], instance: Bookmark, **kwargs: Any) -> None:
+    if instance.namespace:
+        invalidate_namespace(instance.namespace)
+    else:
+        invalidate()
+
+
+def write_snapshot_file(snapshot: BookmarkSnapshot | NamespaceSnapshot, path: Path | None = None) -> Path:
+    """
+    Atomically write the snapshot file, signalling every server process to rebuild
+    """
+    namespace = snapshot.namespace if isinstance(snapshot, NamespaceSnapshot) else ''
+    target = Path(path or snapshot_file(namespace))
+    target.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=target.parent, prefix=f'.{target.name}.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(snapshot.to_dict(), f, sort_keys=True)
+        os.replace(tmp_name, target)
+    except BaseException:
+        Path(tmp_name).unlink(missing_ok=True)
+        raise
+    if namespace:
+        invalidate_namespace(namespace)
+    else:
+        invalidate()
+    logger.info(f"Wrote bookmark snapshot file: {target}, generation={snapshot.generation}")
+    return target
@@ -0,0 +1,328 @@
+"""
+Precomputed OpenSearch suggestions.
+
+Most omnibox traffic is one- or two-character prefixes, so for every bookmark
+generation the ranked suggestions of every 1-2 character prefix are computed
+once and stored as pre-serialized JSON. Longer prefixes are computed from the
+in-memory snapshot and kept in a bounded LRU keyed by (generation, prefix),
+in front of the cache shared by all workers.
+
+Once a known key is followed by a space, the suggestions become previously used
+values of the parameter being typed (see bookmarks/history.py).
+
+A personal namespace gets its own small index of its personal bookmarks, merged
+into the shared ranking per prefix; the shared index is never rebuilt for it.
+"""
+from __future__ import annotations
+
+import heapq
+import json
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+from itertools import islice
+from typing import TYPE_CHECKING, Any
+
+from django.conf import settings
+
+from .history import suggest_values
+from .reloads import server_phase
+from .resolver import ResolveError, expand_url, positional_placeholders
+from .sharedcache import generation_cached
+from .snapshot import get_namespace_snapshot, get_snapshot, snapshot_for
+
+if TYPE_CHECKING:
+    from .resolver import CompiledBookmark
+    from .snapshot import BookmarkSnapshot, NamespaceSnapshot
+
+# Get logger for this module
+logger = logging.getLogger(__name__)
+
+# Maximum number of bookmark suggestions per response
+MAX_SUGGESTIONS = 10
+
+# Prefixes up to this length are answered from the precomputed table
+TABLE_PREFIX_LENGTH = 2
+
+# Special commands offered alongside bookmarks: (command, description, path)
+SPECIAL_COMMANDS = [('h', 'Show all bookmarks', '/list/')]
+
+BASE_URL = 'http://127.0.0.1:8000'
+
+# A key followed by whitespace and the (possibly empty) parameters being typed
+PARAMETER_QUERY = re.compile(r'(\S+)\s+(.*)', re.DOTALL)
+
+
+def _matches(bookmark: CompiledBookmark, search_key: str) -> bool:
+    """Key starts with search_key or description contains it (case-insensitive)"""
+    return bookmark.key.lower().startswith(search_key) or search_key in bookmark.description.lower()
+
+
+def _serialize(search_key: str, bookmarks: list[CompiledBookmark], namespace: str = '') -> bytes:
+    """
+    Serialize everything after the query echo of the OpenSearch response:
+    [query, [completions], [descriptions], [urls]]
+    """
+    suggestions = []
+    descriptions = []
+    urls = []
+
+    # Add special commands first
+    if 'help'.startswith(search_key) or 'h'.startswith(search_key):
+        for cmd, desc, path in SPECIAL_COMMANDS:
+            suggestions.append(cmd)
+            descriptions.append(desc)
+            urls.append(f"{BASE_URL}{path}")
+
+    # Add matching bookmarks
+    for bookmark in bookmarks:
+        suggestions.append(bookmark.key)
+        descriptions.append(bookmark.description or f"Redirect to {bookmark.url}")
+        # Generate a preview URL
+        urls.append(f"{BASE_URL}/{bookmark.key}/{_namespace_query(namespace)}")
+
+    return json.dumps([suggestions, descriptions, urls])[1:].encode()
+
+
+def _namespace_query(namespace: str) -> str:
+    return f'?ns={namespace}' if namespace else ''
+
+
+class SuggestionIndex:
+    """
+    Ranked suggestions of every 1-2 character prefix of one bookmark generation
+    """
+
+    def __init__(self, snapshot: BookmarkSnapshot) -> None:
+        self.generation = snapshot.generation
+        # Bookmarks in key order, which is the ranking
+        self.bookmarks = sorted(snapshot.bookmarks.values(), key=lambda b: b.key)
+
+        matches: dict[str, list[CompiledBookmark]] = {}
+        for bookmark in self.bookmarks:
+            key = bookmark.key.lower()
+            description = bookmark.description.lower()
+            grams = {key[:n] for n in range(1, TABLE_PREFIX_LENGTH + 1) if len(key) >= n}
+            for n in range(1, TABLE_PREFIX_LENGTH + 1):
+                grams.update(description[i:i + n] for i in range(len(description) - n + 1))
+            for gram in grams:
+                ranked = matches.setdefault(gram, [])
+                if len(ranked) < MAX_SUGGESTIONS:
+                    ranked.append(bookmark)
+        self.matches = matches
+        self.table = {gram: _serialize(gram, ranked) for gram, ranked in matches.items()}
+
+    def ranked(self, search_key: str, limit: int = MAX_SUGGESTIONS) -> list[CompiledBookmark]:
+        """The first ``limit`` matching bookmarks, from the table when it holds enough of them"""
+        if len(search_key) <= TABLE_PREFIX_LENGTH:
+            ranked = self.matches.get(search_key, [])
+            if limit <= MAX_SUGGESTIONS or len(ranked) < MAX_SUGGESTIONS:
+                return ranked[:limit]
+        ranked = []
+        for bookmark in self.bookmarks:
+            if _matches(bookmark, search_key):
+                ranked.append(bookmark)
+                if len(ranked) == limit:
+                    break
+        return ranked
+
+    def compute(self, search_key: str) -> bytes:
+        """Scan every bookmark for a prefix (used for prefixes not in the table)"""
+        return _serialize(search_key, self.ranked(search_key))
+
+
+class NamespaceSuggestions:
+    """
+    Suggestions of a namespace: its personal bookmarks merged into the shared
+    ranking, shadowing shared bookmarks with the same key. Holds only the
+    personal bookmarks; the shared index is reused as is.
+    """
+
+    def __init__(self, snapshot: NamespaceSnapshot, shared: SuggestionIndex) -> None:
+        self.namespace = snapshot.namespace
+        self.generation = snapshot.generation
+        self.shared = shared
+        self.personal = sorted(snapshot.overrides.values(), key=lambda b: b.key)
+        self.shadowed = {bookmark.key for bookmark in self.personal if bookmark.key in snapshot.base}
+
+    def compute(self, search_key: str) -> bytes:
+        personal = [bookmark for bookmark in self.personal if _matches(bookmark, search_key)]
+        # Ask for enough shared matches to fill the list after dropping shadowed ones
+        shared = [
+            bookmark
+            for bookmark in self.shared.ranked(search_key, MAX_SUGGESTIONS + len(self.shadowed))
+            if bookmark.key not in self.shadowed
+        ]
+        ranked = list(islice(heapq.merge(personal, shared, key=lambda b: b.key), MAX_SUGGESTIONS))
+        return _serialize(search_key, ranked, self.namespace)
+
+
+class SuggestionStats:
+    """Counters exposed through /api/metrics/ for tuning the LRU size"""
+
+    def __init__(self) -> None:
+        self.table_hits = 0
+        self.cache_hits = 0
+        self.misses = 0
+
+    def as_dict(self) -> dict[str, Any]:
+        total = self.table_hits + self.cache_hits + self.misses
+        return {
+            'table_hits': self.table_hits,
+            'cache_hits': self.cache_hits,
+            'misses': self.misses,
+            'hit_rate': round((self.table_hits + self.cache_hits) / total, 4) if total else None,
+        }
+
+
+_lock = threading.Lock()
+_index: SuggestionIndex | None = None
+_namespace_indexes: OrderedDict[str, NamespaceSuggestions] = OrderedDict()
+_cache: OrderedDict[tuple[str, str], bytes] = OrderedDict()
+stats = SuggestionStats()
+
+
+def get_index() -> SuggestionIndex:
+    """Return the suggestion index of the current generation, building it on reload"""
+    global _index
+    snapshot = get_snapshot()
+    index = _index
+    if index is not None and index.generation == snapshot.generation:
+        return index
+    with _lock:
+        if _index is None or _index.generation != snapshot.generation:
+            start = time.perf_counter()
+            _index = SuggestionIndex(snapshot)
+            elapsed = time.perf_counter() - start
+            server_phase('suggestion_index', elapsed, len(_index.table))
+            logger.info(
+                f"Built suggestion index: generation={_index.generation}, prefixes={len(_index.table)}, ms={elapsed * 1000:.1f}"
+            )
+        return _index
+
+
+def get_namespace_index(namespace: str) -> NamespaceSuggestions:
+    """Return the suggestions of a namespace, rebuilt when its personal or the shared bookmarks change"""
+    snapshot = get_namespace_snapshot(namespace)
+    shared = get_index()
+    index = _namespace_indexes.get(namespace)
+    if index is not None and index.generation == snapshot.generation and index.shared is shared:
+        return index
+    index = NamespaceSuggestions(snapshot, shared)
+    with _lock:
+        _namespace_indexes[namespace] = index
+        _namespace_indexes.move_to_end(namespace)
+        while len(_namespace_indexes) > settings.BUNNIFY_NAMESPACE_CACHE_SIZE:
+            _namespace_indexes.popitem(last=False)
+    logger.info(f"Built namespace suggestion index: namespace={namespace}, personal={len(index.personal)}")
+    return index
+
+
+def suggestion_tail(search_key: str, namespace: str = '') -> bytes:
+    """
+    Pre-serialized OpenSearch suggestions for a lowercase search key,
+    without the leading query echo
+    """
+    index: SuggestionIndex | NamespaceSuggestions
+    index = get_namespace_index(namespace) if namespace else get_index()
+    if isinstance(index, SuggestionIndex) and len(search_key) <= TABLE_PREFIX_LENGTH:
+        tail = index.table.get(search_key)
+        if tail is not None:
+            stats.table_hits += 1
+            return tail
+
+    cache_key = (index.generation, search_key)
+    with _lock:
+        tail = _cache.get(cache_key)
+        if tail is not None:
+            _cache.move_to_end(cache_key)
+            stats.cache_hits += 1
+            return tail
+
+    # Another worker may have computed it for this generation already
+    tail = generation_cached('suggestions', f'{index.generation}:{search_key}', lambda: index.compute(search_key))
+    with _lock:
+        stats.misses += 1
+        _cache[cache_key] = tail
+        while len(_cache) > settings.BUNNIFY_SUGGESTION_CACHE_SIZE:
+            _cache.popitem(last=False)
+    return tail
+
+
+def suggestion_response(query: str, search_key: str, namespace: str = '') -> bytes:
+    """Complete OpenSearch suggestions response body: [query, [completions], [descriptions], [urls]]"""
+    return b'[' + json.dumps(query).encode() + b', ' + suggestion_tail(search_key, namespace)
+
+
+def metrics() -> dict[str, Any]:
+    """Cache statistics for /api/metrics/"""
+    index = _index
+    return {
+        **stats.as_dict(),
+        'generation': index.generation if index else None,
+        'table_size': len(index.table) if index else 0,
+        'cache_size': len(_cache),
+        'namespaces': len(_namespace_indexes),
+        'cache_capacity': settings.BUNNIFY_SUGGESTION_CACHE_SIZE,
+    }
+
+
+def parameter_completions(
+    text: str,
+    namespace: str = '',
+    limit: int = MAX_SUGGESTIONS,
+) -> tuple[CompiledBookmark, str, list[str], list[str]] | None:
+    """
+    Previously used values of the parameter being typed in ``text`` (the raw
+    query, e.g. "pr 12345 sho"): (bookmark, placeholder, parameters already
+    typed, values), or None if ``text`` is not "<known key> <parameters>"
+    """
+    match = PARAMETER_QUERY.match(text.lstrip())
+    if match is None:
+        return None
+    key, param_string = match.groups()
+    bookmark = snapshot_for(namespace).get(key)
+    if bookmark is None:
+        return None
+    placeholders = positional_placeholders(bookmark)
+    if not placeholders:
+        return None
+
+    if len(placeholders) == 1:
+        # A single parameter takes the whole rest of the query, spaces included
+        done, prefix = [], param_string
+    else:
+        done = param_string.split()
+        prefix = '' if not param_string or param_string[-1].isspace() else done.pop()
+        if len(done) >= len(placeholders):
+            return None
+    placeholder = placeholders[len(done)]
+    return bookmark, placeholder, done, suggest_values(namespace, key, placeholder, prefix, limit)
+
+
+def parameter_response(query: str, text: str, namespace: str = '') -> bytes | None:
+    """
+    OpenSearch response completing the parameter being typed in ``text`` (the raw
+    query, e.g. "pr 12345 sho") from history, or None if there is nothing to offer
+    """
+    completions = parameter_completions(text, namespace)
+    if completions is None or not completions[3]:
+        return None
+    bookmark, placeholder, done, values = completions
+    key = bookmark.key
+
+    suggestions = []
+    descriptions = []
+    urls = []
+    for value in values:
+        params = ' '.join([*done, value])
+        suggestions.append(f'{key} {params}')
+        descriptions.append(f'{bookmark.description} ({placeholder})')
+        try:
+            urls.append(expand_url(bookmark, params))
+        except ResolveError:
+            # Later required parameters are still missing
+            urls.append(f"{BASE_URL}/{key}/{_namespace_query(namespace)}")
+    return json.dumps([query, suggestions, descriptions, urls]).encode()
@@ -0,0 +1,48 @@
+"""
+Test runner that keeps the test suite away from the real shared cache.
+
+The default CACHES point at BASE_DIR/bunnify.cache.sqlite3, which the running
+server uses too. For the whole run the cache is a SQLite file in a temporary
+directory instead, and BUNNIFY_CACHE_FILE points there as well, so management
+commands the tests start in subprocesses use it too.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import tempfile
+from pathlib import Path
+from typing import Any
+
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+# Get logger for this module
+logger = logging.getLogger(__name__)
+
+
+class BunnifyTestRunner(DiscoverRunner):
+    """DiscoverRunner with a throwaway shared cache file"""
+
+    def setup_test_environment(self, **kwargs: Any) -> None:
+        super().setup_test_environment(**kwargs)
+        self._cache_dir = tempfile.TemporaryDirectory(prefix='bunnify-test-cache-')
+        cache_file = Path(self._cache_dir.name) / 'cache.sqlite3'
+        self._cache_env = os.environ.get('BUNNIFY_CACHE_FILE')
+        os.environ['BUNNIFY_CACHE_FILE'] = str(cache_file)
+        self._cache_override = override_settings(
+            BUNNIFY_CACHE_FILE=cache_file,
+            CACHES={'default': {**settings.CACHES['default'], 'LOCATION': str(cache_file)}},
+        )
+        self._cache_override.enable()
+        logger.debug(f"Test run uses the shared cache file {cache_file}")
+
+    def teardown_test_environment(self, **kwargs: Any) -> None:
+        self._cache_override.disable()
+        if self._cache_env is None:
+            os.environ.pop('BUNNIFY_CACHE_FILE', None)
+        else:
+            os.environ['BUNNIFY_CACHE_FILE'] = self._cache_env
+        self._cache_dir.cleanup()
+        super().teardown_test_environment(**kwargs)
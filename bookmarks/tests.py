@@ -1,7 +1,58 @@
-from django.test import Client, TestCase
+import asyncio
+import json
+import os
+import queue
+import re
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import StringIO
+from pathlib import Path
+from unittest.mock import patch
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.core.wsgi import get_wsgi_application
+from django.db import models
+from django.test import (
+    Client,
+    RequestFactory,
+    SimpleTestCase,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
 from django.urls import reverse
+from django.utils import timezone
 
-from .models import Bookmark
+from . import history as history_module
+from . import (
+    listing,
+    loader,
+    reloads,
+    replay,
+    reviews,
+    sharedcache,
+    sites,
+    snapshot,
+    suggestions,
+)
+from .aliases import ChainResolver
+from .daemon import bind_socket
+from .fastpath import FastPathASGI, FastPathWSGI
+from .gitsource import GitSource
+from .links import check_urls
+from .management.commands.watch_bookmarks import Command as WatchCommand
+from .models import Bookmark, BookmarkRevision, SiteIcon
+from .replication import Replica, ReplicationError
+from .resolver import CompiledBookmark
+from .validation import check_file
 
 
 class SmokeTests(TestCase):
@@ -134,3 +185,2079 @@ class SmokeTests(TestCase):
             response['Location'],
             'https://github.com/Shopify/shopify-build/pull/12345'
         )
+
+
+class SQLiteWalStressTests(SimpleTestCase):
+    """Readers must never block on a reload writer in the WAL storage mode"""
+    
+    def connect(self, path: Path, timeout: float) -> sqlite3.Connection:
+        """Open a connection configured like the server's (same PRAGMAs)"""
+        conn = sqlite3.connect(path, timeout=timeout, isolation_level=None, check_same_thread=False)
+        for pragma in settings.SQLITE_PRAGMAS:
+            conn.execute(pragma)
+        return conn
+    
+    def test_readers_never_see_lock_errors_during_reload_loop(self):
+        """Continuous full-table reloads cause no lock errors or missing keys for readers"""
+        if not settings.SQLITE_WAL:
+            self.skipTest('WAL storage mode disabled')
+        
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            db_path = Path(tmp_dir) / 'stress.sqlite3'
+            keys = [f'key{i}' for i in range(500)]
+            writer = self.connect(db_path, timeout=20)
+            writer.execute('CREATE TABLE bookmark (key TEXT PRIMARY KEY, url TEXT)')
+            writer.executemany('INSERT INTO bookmark VALUES (?, ?)', [(k, f'https://example.com/{k}') for k in keys])
+            
+            stop = threading.Event()
+            errors: list[Exception] = []
+            misses: list[str] = []
+            latencies: list[float] = []
+            reloads = 0
+            
+            def reload_loop() -> None:
+                # Same shape as load_bookmarks: delete everything and re-insert in one transaction
+                nonlocal reloads
+                while not stop.is_set():
+                    writer.execute('BEGIN IMMEDIATE')
+                    writer.execute('DELETE FROM bookmark')
+                    writer.executemany('INSERT INTO bookmark VALUES (?, ?)', [(k, f'https://example.com/{k}') for k in keys])
+                    writer.execute('COMMIT')
+                    reloads += 1
+            
+            def read_loop(offset: int) -> None:
+                # A zero busy timeout turns any reader/writer contention into an immediate error
+                reader = self.connect(db_path, timeout=0)
+                i = offset
+                while not stop.is_set():
+                    key = keys[i % len(keys)]
+                    start = time.perf_counter()
+                    try:
+                        row = reader.execute('SELECT url FROM bookmark WHERE key = ?', (key,)).fetchone()
+                    except sqlite3.OperationalError as e:
+                        errors.append(e)
+                        continue
+                    latencies.append(time.perf_counter() - start)
+                    if row is None:
+                        misses.append(key)
+                    i += 7
+                reader.close()
+            
+            threads = [threading.Thread(target=reload_loop)]
+            threads += [threading.Thread(target=read_loop, args=(n,)) for n in range(4)]
+            for thread in threads:
+                thread.start()
+            time.sleep(1.0)
+            stop.set()
+            for thread in threads:
+                thread.join()
+            writer.close()
+        
+        self.assertGreater(reloads, 0)
+        self.assertGreater(len(latencies), 0)
+        self.assertEqual(errors, [])
+        self.assertEqual(misses, [])
+        # No read ever waited for a reload to finish
+        latencies.sort()
+        self.assertLess(latencies[int(len(latencies) * 0.99)], 0.05)
+
+
+class FastPathTests(TestCase):
+    """The fast-path dispatcher must answer redirects exactly like the Django views"""
+    
+    def setUp(self):
+        snapshot.invalidate()
+        Bookmark.objects.create(
+            key='g',
+            description='Google Search',
+            url='https://www.google.com/search?q=#{search_terms}'
+        )
+        Bookmark.objects.create(key='gh', description='GitHub', url='https://github.com')
+        Bookmark.objects.create(
+            key='pr',
+            description='Pull Request',
+            url='https://github.com/#{repo}/pull/#{pr_number}',
+            defaults={'repo': 'default-org/default-repo'}
+        )
+        Bookmark.objects.create(key='ext', description='Extensions', url='chrome://extensions')
+        self.fallthrough = []
+        
+        def django_app(environ, start_response):
+            self.fallthrough.append(environ['PATH_INFO'])
+            return get_wsgi_application()(environ, start_response)
+        
+        self.app = FastPathWSGI(django_app)
+    
+    def call(self, path, data=None, method='get'):
+        """Call the WSGI dispatcher and return (status, headers, body)"""
+        environ = getattr(RequestFactory(), method)(path, data or {}).environ
+        captured = {}
+        
+        def start_response(status, headers):
+            captured['status'] = int(status.split()[0])
+            captured['headers'] = dict(headers)
+        
+        body = b''.join(self.app(environ, start_response))
+        return captured['status'], captured['headers'], body
+    
+    def test_search_matches_django_view(self):
+        """Fast-path /search/ responses are identical to the view's"""
+        for query in ['gh', 'g django tutorial', 'pr 12345', 'pr 1 org/repo', 'pr', 'nonexistent', 'h', '']:
+            with self.subTest(query=query):
+                status, headers, body = self.call('/search/', {'q': query})
+                expected = self.client.get('/search/', {'q': query})
+                self.assertEqual(status, expected.status_code)
+                self.assertEqual(headers.get('Location'), expected.headers.get('Location'))
+                self.assertEqual(body, expected.content)
+        self.assertEqual(self.fallthrough, [])
+    
+    def test_direct_redirect_matches_django_view(self):
+        """Fast-path /<key>/ responses are identical to the view's"""
+        for path, data in [('/gh/', {}), ('/g/', {'search_terms': 'django'}), ('/g/', {}), ('/missing/', {})]:
+            with self.subTest(path=path, data=data):
+                status, headers, body = self.call(path, data)
+                expected = self.client.get(path, data)
+                self.assertEqual(status, expected.status_code)
+                self.assertEqual(headers.get('Location'), expected.headers.get('Location'))
+                self.assertEqual(body, expected.content)
+        self.assertEqual(self.fallthrough, [])
+    
+    def test_other_routes_fall_through_to_django(self):
+        """Pages, non-GET requests and special browser URLs are left to Django"""
+        self.assertEqual(self.call('/list/')[0], 200)
+        self.assertEqual(self.call('/search/', {'q': 'gh'}, method='head')[0], 405)
+        status, _, body = self.call('/search/', {'q': 'ext'})
+        self.assertEqual(status, 200)
+        self.assertIn(b'chrome://extensions', body)
+        self.assertEqual(self.fallthrough, ['/list/', '/search/', '/search/'])
+    
+    def test_snapshot_follows_database_changes(self):
+        """Saving a bookmark invalidates the in-memory snapshot"""
+        self.assertEqual(self.call('/search/', {'q': 'new'})[0], 404)
+        Bookmark.objects.create(key='new', description='New', url='https://new.example.com')
+        status, headers, _ = self.call('/search/', {'q': 'new'})
+        self.assertEqual(status, 302)
+        self.assertEqual(headers['Location'], 'https://new.example.com')
+    
+    def test_asgi_dispatcher(self):
+        """The ASGI dispatcher answers redirects without calling Django"""
+        snapshot.get_snapshot()
+        sent = []
+        
+        async def django_app(scope, receive, send):
+            raise AssertionError('fast path should not fall through')
+        
+        async def send(message):
+            sent.append(message)
+        
+        scope = {'type': 'http', 'method': 'GET', 'path': '/search/', 'query_string': b'q=pr+42'}
+        asyncio.run(FastPathASGI(django_app)(scope, None, send))
+        self.assertEqual(sent[0]['status'], 302)
+        self.assertIn((b'location', b'https://github.com/default-org/default-repo/pull/42'), sent[0]['headers'])
+    
+    def test_load_bookmarks_publishes_snapshot_file(self):
+        """load_bookmarks writes the snapshot file that signals running servers"""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            bookmarks_file = Path(tmp_dir) / 'bunnify.json'
+            bookmarks_file.write_text(json.dumps({'c': {'description': 'Calendar', 'url': 'https://calendar.google.com'}}))
+            snapshot_file = Path(tmp_dir) / 'snapshot.json'
+            with override_settings(BUNNIFY_SNAPSHOT_FILE=snapshot_file):
+                call_command('load_bookmarks', file=str(bookmarks_file), verbosity=0, stdout=open(Path(tmp_dir) / 'out', 'w'))
+                data = json.loads(snapshot_file.read_text())
+                self.assertEqual(list(data['bookmarks']), ['c'])
+                self.assertEqual(data['generation'], snapshot.get_snapshot().generation)
+                status, headers, _ = self.call('/search/', {'q': 'c'})
+        self.assertEqual(status, 302)
+        self.assertEqual(headers['Location'], 'https://calendar.google.com')
+
+
+class ResolveBatchTests(TestCase):
+    """Tests for the POST /api/resolve/ batch API"""
+    
+    def setUp(self):
+        snapshot.invalidate()
+        Bookmark.objects.create(key='gh', description='GitHub', url='https://github.com')
+        Bookmark.objects.create(
+            key='pr',
+            description='Pull Request',
+            url='https://github.com/#{repo}/pull/#{pr_number}',
+            defaults={'repo': 'default-org/default-repo'}
+        )
+    
+    def post(self, payload):
+        response = self.client.post('/api/resolve/', json.dumps(payload), content_type='application/json')
+        body = b''.join(response.streaming_content) if response.streaming else response.content
+        return response.status_code, json.loads(body)
+    
+    def test_resolves_queries_with_structured_errors(self):
+        """Each query gets a URL or a structured error, in order"""
+        status, data = self.post({'queries': ['pr 12345', 'pr 1 org/repo', 'gh', 'h', 'pr', 'nope', '']})
+        self.assertEqual(status, 200)
+        self.assertEqual(data['generation'], snapshot.get_snapshot().generation)
+        results = data['results']
+        self.assertEqual(results[0]['url'], 'https://github.com/default-org/default-repo/pull/12345')
+        self.assertEqual(results[1]['url'], 'https://github.com/org/repo/pull/1')
+        self.assertEqual(results[2]['url'], 'https://github.com')
+        self.assertEqual(results[3]['url'], '/list/')
+        self.assertEqual(results[4]['error']['code'], 'missing_parameter')
+        self.assertEqual(results[4]['error']['missing'], ['pr_number'])
+        self.assertEqual(results[5]['error'], {'code': 'unknown_key', 'message': "Bookmark 'nope' not found", 'key': 'nope'})
+        self.assertEqual(results[6]['error']['code'], 'empty_query')
+    
+    def test_large_batch_is_streamed_in_chunks(self):
+        """Large batches produce a valid JSON document with every result"""
+        queries = [f'pr {n}' for n in range(250)]
+        status, data = self.post(queries)
+        self.assertEqual(status, 200)
+        self.assertEqual([r['query'] for r in data['results']], queries)
+    
+    def test_matches_search_redirect(self):
+        """Batch results match the Location of the /search/ redirect"""
+        for query in ['pr 7', 'pr 7 a/b', 'gh']:
+            location = self.client.get('/search/', {'q': query})['Location']
+            self.assertEqual(self.post([query])[1]['results'][0]['url'], location)
+    
+    def test_invalid_payload(self):
+        """Malformed bodies are rejected with 400"""
+        self.assertEqual(self.post({'queries': 'pr 1'})[0], 400)
+        response = self.client.post('/api/resolve/', 'not json', content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+
+class ResolveCommandTests(TestCase):
+    """Tests for the offline `manage.py resolve` command"""
+    
+    def setUp(self):
+        snapshot.invalidate()
+        Bookmark.objects.create(key='gh', description='GitHub', url='https://github.com')
+        Bookmark.objects.create(
+            key='pr',
+            description='Pull Request',
+            url='https://github.com/#{repo}/pull/#{pr_number}',
+            defaults={'repo': 'default-org/default-repo'}
+        )
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.snapshot_file = Path(self.tmp_dir.name) / 'snapshot.json'
+        snapshot.write_snapshot_file(snapshot.get_snapshot(), self.snapshot_file)
+    
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+    
+    def run_manage(self, *args, stdin=''):
+        """Run manage.py in a subprocess, recording module imports"""
+        env = dict(os.environ, BUNNIFY_SNAPSHOT_FILE=str(self.snapshot_file))
+        return subprocess.run(
+            [sys.executable, '-X', 'importtime', 'manage.py', *args],
+            cwd=settings.BASE_DIR, env=env, input=stdin, capture_output=True, text=True
+        )
+    
+    def test_output_matches_search_redirect(self):
+        """Resolved URLs are the Location of the /search/ redirect"""
+        queries = ['pr 12345', 'pr 12345 org/repo', 'gh']
+        result = self.run_manage('resolve', *queries)
+        self.assertEqual(result.returncode, 0)
+        expected = [self.client.get('/search/', {'q': q})['Location'] for q in queries]
+        self.assertEqual(result.stdout.splitlines(), expected)
+    
+    def test_stdin_queries_and_errors_stay_aligned(self):
+        """Queries from stdin resolve in one process; failures leave an empty line"""
+        result = self.run_manage('resolve', stdin='gh\nnope\npr 1\n')
+        self.assertEqual(result.returncode, 1)
+        self.assertEqual(result.stdout.splitlines(), ['https://github.com', '', 'https://github.com/default-org/default-repo/pull/1'])
+        self.assertIn("nope: Bookmark 'nope' not found", result.stderr)
+    
+    def test_fast_startup_does_not_import_django(self):
+        """With a snapshot file, resolve never imports Django"""
+        result = self.run_manage('resolve', 'gh')
+        imported = [line.rsplit('|', 1)[-1].strip() for line in result.stderr.splitlines() if line.startswith('import time:')]
+        self.assertIn('bookmarks.resolver', imported)
+        self.assertFalse([name for name in imported if name.startswith('django')])
+    
+    def test_falls_back_to_database(self):
+        """Without a snapshot file the Django command resolves from the database"""
+        out = StringIO()
+        call_command('resolve', 'pr 9', stdout=out)
+        self.assertEqual(out.getvalue(), 'https://github.com/default-org/default-repo/pull/9\n')
+
+
+class FallbackSearchTests(TestCase):
+    """Unknown keys are rejected from the snapshot or sent to the fallback bookmark"""
+    
+    def setUp(self):
+        snapshot.invalidate()
+        Bookmark.objects.create(
+            key='g',
+            description='Google Search',
+            url='https://www.google.com/search?q=#{search_terms}'
+        )
+        Bookmark.objects.create(key='gh', description='GitHub', url='https://github.com')
+    
+    def test_unknown_key_does_not_query_database(self):
+        """Once the snapshot is built, unknown keys cost no database queries"""
+        snapshot.get_snapshot()
+        with self.assertNumQueries(0):
+            response = self.client.get('/search/', {'q': 'django queryset docs'})
+        self.assertEqual(response.status_code, 404)
+        self.assertContains(response, "Bookmark 'django' not found", status_code=404)
+    
+    @override_settings(BUNNIFY_FALLBACK_KEY='g')
+    def test_unknown_key_uses_fallback_bookmark(self):
+        """The fallback bookmark receives the whole query"""
+        response = self.client.get('/search/', {'q': 'django queryset docs'})
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(response['Location'], 'https://www.google.com/search?q=django queryset docs')
+        # Known keys are unaffected
+        self.assertEqual(self.client.get('/search/', {'q': 'gh'})['Location'], 'https://github.com')
+    
+    @override_settings(BUNNIFY_FALLBACK_KEY='missing')
+    def test_missing_fallback_bookmark_returns_404(self):
+        """A fallback key that is not a bookmark keeps the 404"""
+        response = self.client.get('/search/', {'q': 'django docs'})
+        self.assertEqual(response.status_code, 404)
+    
+    @override_settings(BUNNIFY_FALLBACK_KEY='g')
+    def test_batch_api_and_fast_path_use_fallback(self):
+        """The batch API and the fast-path dispatcher apply the same fallback"""
+        response = self.client.post('/api/resolve/', json.dumps(['django docs']), content_type='application/json')
+        data = json.loads(b''.join(response.streaming_content))
+        self.assertEqual(data['results'][0]['url'], 'https://www.google.com/search?q=django docs')
+        
+        captured = {}
+        app = FastPathWSGI(lambda environ, start_response: [])
+        environ = RequestFactory().get('/search/', {'q': 'django docs'}).environ
+        app(environ, lambda status, headers: captured.update(headers))
+        self.assertEqual(captured['Location'], 'https://www.google.com/search?q=django docs')
+
+
+@override_settings(BUNNIFY_REDIRECT_MAX_AGE=3600)
+class CacheableRedirectTests(TestCase):
+    """Redirects to fixed targets are browser-cacheable, tied to the bookmark generation"""
+    
+    def setUp(self):
+        snapshot.invalidate()
+        Bookmark.objects.create(key='gh', description='GitHub', url='https://github.com')
+        Bookmark.objects.create(key='c', description='Calendar', url='https://calendar.google.com', cache_max_age=60)
+        Bookmark.objects.create(key='nc', description='Not cached', url='https://example.com', cache_max_age=0)
+        Bookmark.objects.create(
+            key='g',
+            description='Google Search',
+            url='https://www.google.com/search?q=#{search_terms}'
+        )
+        Bookmark.objects.create(key='ext', description='Extensions', url='chrome://extensions')
+    
+    def test_parameterless_redirect_is_cacheable(self):
+        """Fixed targets get Cache-Control and the generation as ETag"""
+        response = self.client.get('/search/', {'q': 'gh'})
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(response['Cache-Control'], 'private, max-age=3600')
+        self.assertEqual(response['ETag'], f'"{snapshot.get_snapshot().generation}"')
+        self.assertEqual(self.client.get('/gh/')['Cache-Control'], 'private, max-age=3600')
+    
+    def test_per_bookmark_lifetime(self):
+        """A bookmark's "cache" value overrides the default, 0 disables caching"""
+        self.assertEqual(self.client.get('/search/', {'q': 'c'})['Cache-Control'], 'private, max-age=60')
+        self.assertNotIn('Cache-Control', self.client.get('/search/', {'q': 'nc'}))
+    
+    def test_parameterized_and_browser_urls_are_not_cached(self):
+        """Parameterized and special-protocol bookmarks are excluded"""
+        self.assertNotIn('Cache-Control', self.client.get('/search/', {'q': 'g django'}))
+        self.assertNotIn('ETag', self.client.get('/search/', {'q': 'ext'}))
+    
+    def test_revalidation_follows_generation(self):
+        """A matching ETag gets a 304 until the bookmark set changes"""
+        etag = self.client.get('/search/', {'q': 'gh'})['ETag']
+        response = self.client.get('/search/', {'q': 'gh'}, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+        Bookmark.objects.create(key='new', description='New', url='https://new.example.com')
+        response = self.client.get('/search/', {'q': 'gh'}, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 302)
+        self.assertNotEqual(response['ETag'], etag)
+    
+    def test_fast_path_sends_same_cache_headers(self):
+        """The fast-path dispatcher applies the same caching rules"""
+        expected = self.client.get('/search/', {'q': 'gh'})
+        captured = {}
+        app = FastPathWSGI(lambda environ, start_response: [])
+        
+        def start_response(status, headers):
+            captured['status'] = status
+            captured.update(headers)
+        
+        app(RequestFactory().get('/search/', {'q': 'gh'}).environ, start_response)
+        self.assertEqual(captured['Cache-Control'], expected['Cache-Control'])
+        self.assertEqual(captured['ETag'], expected['ETag'])
+        environ = RequestFactory().get('/search/', {'q': 'gh'}, headers={'If-None-Match': expected['ETag']}).environ
+        app(environ, start_response)
+        self.assertEqual(captured['status'], '304 Not Modified')
+
+
+class SuggestionIndexTests(TestCase):
+    """Precomputed and cached suggestions match a direct database query"""
+    
+    def setUp(self):
+        snapshot.invalidate()
+        for n in range(30):
+            Bookmark.objects.create(key=f'k{n:02d}', description=f'Bookmark number {n}', url=f'https://example.com/{n}')
+        Bookmark.objects.create(key='gh', description='GitHub', url='https://github.com')
+        Bookmark.objects.create(key='Go', description='', url='https://go.dev')
+    
+    def expected(self, query):
+        """The suggestions computed straight from the database"""
+        search_key = query.split()[0]
+        bookmarks = Bookmark.objects.filter(
+            models.Q(key__istartswith=search_key) | models.Q(description__icontains=search_key)
+        )[:10]
+        specials = ['h'] if 'help'.startswith(search_key) or 'h'.startswith(search_key) else []
+        return specials + [b.key for b in bookmarks], [b.description or f'Redirect to {b.url}' for b in bookmarks]
+    
+    def test_matches_database_query(self):
+        """Short (table) and long (LRU) prefixes return the same ranked results"""
+        for query in ['k', 'k1', 'k2x', 'b', 'nu', 'number 2', 'g', 'go', 'h', 'he', 'zz', 'github']:
+            with self.subTest(query=query):
+                data = self.client.get('/api/suggestions/', {'q': query}).json()
+                keys, descriptions = self.expected(query)
+                self.assertEqual(data[0], query)
+                self.assertEqual(data[1], keys)
+                self.assertEqual(data[2][len(keys) - len(descriptions):], descriptions)
+    
+    def test_hit_rate_is_exposed(self):
+        """Table hits, LRU hits and misses are counted in /api/metrics/"""
+        before = self.client.get('/api/metrics/').json()['suggestions']
+        self.client.get('/api/suggestions/', {'q': 'k'})
+        self.client.get('/api/suggestions/', {'q': 'number'})
+        self.client.get('/api/suggestions/', {'q': 'number'})
+        after = self.client.get('/api/metrics/').json()['suggestions']
+        self.assertEqual(after['table_hits'] - before['table_hits'], 1)
+        self.assertEqual(after['cache_hits'] - before['cache_hits'], 1)
+        self.assertEqual(after['misses'] - before['misses'], 1)
+        self.assertEqual(after['generation'], snapshot.get_snapshot().generation)
+    
+    def test_new_generation_rebuilds_index(self):
+        """Adding a bookmark is reflected in precomputed prefixes"""
+        self.assertNotIn('xy', self.client.get('/api/suggestions/', {'q': 'x'}).json()[1])
+        Bookmark.objects.create(key='xy', description='New', url='https://xy.example.com')
+        self.assertIn('xy', self.client.get('/api/suggestions/', {'q': 'x'}).json()[1])
+
+
+class SnapshotReplicationTests(TestCase):
+    """Tests for the primary /api/snapshot/ endpoint and the replica"""
+    
+    def setUp(self):
+        snapshot.invalidate()
+        Bookmark.objects.create(key='gh', description='GitHub', url='https://github.com')
+        Bookmark.objects.create(key='c', description='Calendar', url='https://calendar.google.com')
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.settings_override = override_settings(BUNNIFY_SNAPSHOT_FILE=Path(self.tmp_dir.name) / 'snapshot.json')
+        self.settings_override.enable()
+    
+    def tearDown(self):
+        self.settings_override.disable()
+        self.tmp_dir.cleanup()
+    
+    def fetch(self, url, headers):
+        """Fetch from the primary through the test client"""
+        self.fetched.append(url)
+        response = self.client.get(url, headers=headers)
+        return response.status_code, response.content
+    
+    def test_conditional_get_and_delta(self):
+        """Up-to-date callers get a 304; known generations get a delta"""
+        base = self.client.get('/api/snapshot/').json()
+        self.assertEqual(set(base['bookmarks']), {'gh', 'c'})
+        etag = f'"{base["generation"]}"'
+        self.assertEqual(self.client.get('/api/snapshot/', headers={'If-None-Match': etag}).status_code, 304)
+        
+        Bookmark.objects.filter(key='c').delete()
+        Bookmark.objects.create(key='new', description='New', url='https://new.example.com')
+        delta = self.client.get('/api/snapshot/', {'since': base['generation']}).json()
+        self.assertEqual(delta['base'], base['generation'])
+        self.assertEqual(list(delta['changed']), ['new'])
+        self.assertEqual(delta['removed'], ['c'])
+        # Unknown generations get the full snapshot
+        self.assertIn('bookmarks', self.client.get('/api/snapshot/', {'since': 'unknown'}).json())
+    
+    def test_replica_converges_with_primary(self):
+        """A replica applies deltas and full snapshots and ends on the primary's generation"""
+        self.fetched = []
+        replica = Replica('http://primary:8000', fetch=self.fetch)
+        self.assertEqual(replica.sync_once(), 'unchanged')
+        
+        # The primary changes: the replica (same database here) is sent a delta from its generation
+        primary = self.client.get('/api/snapshot/').json()
+        Bookmark.objects.create(key='new', description='New', url='https://new.example.com')
+        new_primary = snapshot.get_snapshot()
+        snapshot.invalidate()
+        Bookmark.objects.filter(key='new').delete()
+        self.assertEqual(snapshot.get_snapshot().generation, primary['generation'])
+        
+        payload = json.dumps(new_primary.diff(snapshot.get_snapshot())[0])
+        delta = {'generation': new_primary.generation, 'base': primary['generation'],
+                 'changed': json.loads(payload), 'removed': []}
+        replica.fetch = lambda url, headers: (200, json.dumps(delta).encode())
+        self.assertEqual(replica.sync_once(), 'delta')
+        self.assertEqual(snapshot.get_snapshot().generation, new_primary.generation)
+        self.assertTrue(Bookmark.objects.filter(key='new').exists())
+        self.assertTrue(json.loads(settings.BUNNIFY_SNAPSHOT_FILE.read_text())['bookmarks']['new'])
+        
+        # A full snapshot replaces everything
+        full = {'generation': 'ignored', 'bookmarks': {'x': {'description': 'X', 'url': 'https://x.example.com'}}}
+        full['generation'] = snapshot.BookmarkSnapshot({'x': CompiledBookmark.compile('x', 'X', 'https://x.example.com')}).generation
+        replica.fetch = lambda url, headers: (200, json.dumps(full).encode())
+        self.assertEqual(replica.sync_once(), 'full')
+        self.assertEqual(list(Bookmark.objects.values_list('key', flat=True)), ['x'])
+    
+    def test_malformed_payload_is_a_replication_error(self):
+        """Well-formed JSON of the wrong shape raises ReplicationError instead of KeyError/TypeError"""
+        generation = snapshot.get_snapshot().generation
+        replica = Replica('http://primary:8000')
+        for payload in ([], {}, {'generation': 1, 'bookmarks': {}},
+                        {'generation': 'g', 'bookmarks': ['a']},
+                        {'generation': 'g', 'bookmarks': {'a': {'description': 'A'}}},
+                        {'generation': 'g', 'base': generation},
+                        {'generation': 'g', 'base': generation, 'changed': {}, 'removed': 'a'}):
+            replica.fetch = lambda url, headers, payload=payload: (200, json.dumps(payload).encode())
+            with self.subTest(payload=payload), self.assertRaises(ReplicationError):
+                replica.sync_once()
+        
+        # The drift-recovery refetch is checked too
+        full = {'generation': 'other', 'bookmarks': {}}
+        responses = iter([full, {'generation': 'other', 'base': generation, 'changed': {}, 'removed': []}])
+        replica.fetch = lambda url, headers: (200, json.dumps(next(responses)).encode())
+        with self.assertRaises(ReplicationError):
+            replica.sync_once()
+    
+    def test_replica_uses_etag_and_since(self):
+        """Replica requests carry the local generation as since and If-None-Match"""
+        requests = []
+        replica = Replica('http://primary:8000/', fetch=lambda url, headers: requests.append((url, headers)) or (304, b''))
+        replica.sync_once()
+        generation = snapshot.get_snapshot().generation
+        self.assertEqual(requests[0][0], f'http://primary:8000/api/snapshot/?since={generation}')
+        self.assertEqual(requests[0][1]['If-None-Match'], f'"{generation}"')
+
+
+class ServerTimingTests(TestCase):
+    """Tests for the opt-in Server-Timing header and sampled profiling"""
+    
+    def setUp(self):
+        snapshot.invalidate()
+        # Phases run only when a result is computed, not when the shared cache has it
+        cache.clear()
+        sharedcache._latest.clear()
+        Bookmark.objects.create(key='gh', description='GitHub', url='https://github.com/#{repo}')
+    
+    def test_disabled_by_default(self):
+        """Without configuration the middleware is not installed"""
+        response = self.client.get('/search/?q=gh django/django')
+        self.assertNotIn('Server-Timing', response)
+    
+    @override_settings(BUNNIFY_SERVER_TIMING=True)
+    def test_phase_breakdown(self):
+        """Each instrumented view reports its phases and the total"""
+        expected = {
+            '/search/?q=gh django/django': ['lookup', 'substitution', 'render', 'total'],
+            '/list/': ['lookup', 'substitution', 'render', 'total'],
+            '/cmd/': ['lookup', 'substitution', 'serialize', 'render', 'total'],
+            '/api/suggestions/?q=g': ['lookup', 'serialize', 'total'],
+        }
+        for path, phases in expected.items():
+            header = self.client.get(path)['Server-Timing']
+            self.assertEqual([entry.split(';')[0] for entry in header.split(', ')], phases, path)
+            self.assertRegex(header, r'total;dur=\d+\.\d{3}$')
+    
+    def test_sampled_and_header_triggered_dumps(self):
+        """1-in-N requests and X-Bunnify-Profile requests write cProfile and tracemalloc dumps"""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            with self.settings(BUNNIFY_PROFILE_SAMPLE_RATE=2, BUNNIFY_PROFILE_DIR=tmp_dir):
+                client = Client()
+                names = [client.get('/list/').get('X-Bunnify-Profile-Dump') for _ in range(4)]
+            self.assertEqual([name is not None for name in names], [False, True, False, True])
+            self.assertTrue(names[1].endswith('-list'))
+            
+            with self.settings(BUNNIFY_PROFILE_HEADER=True, BUNNIFY_PROFILE_DIR=tmp_dir):
+                client = Client()
+                self.assertNotIn('X-Bunnify-Profile-Dump', client.get('/list/'))
+                name = client.get('/list/', headers={'X-Bunnify-Profile': '1'})['X-Bunnify-Profile-Dump']
+            
+            import pstats
+            import tracemalloc
+            self.assertTrue(pstats.Stats(os.path.join(tmp_dir, f'{name}.prof')).total_calls > 0)
+            tracemalloc.Snapshot.load(os.path.join(tmp_dir, f'{name}.tracemalloc'))
+            self.assertEqual(len(os.listdir(tmp_dir)), 6)
+    
+    def test_fast_path_is_instrumented(self):
+        """The fast path sends Server-Timing itself, and hands requests to Django while profiling is enabled"""
+        def call(app, path, params, **headers):
+            captured = {}
+            app(RequestFactory().get(path, params, headers=headers).environ,
+                lambda status, response_headers: captured.update(response_headers, status=status))
+            return captured
+        
+        with self.settings(BUNNIFY_SERVER_TIMING=True):
+            app = FastPathWSGI(lambda environ, start_response: self.fail('handed to Django'))
+            response = call(app, '/search/', {'q': 'gh django/django'})
+        self.assertEqual(response['status'], '302 Found')
+        self.assertEqual([entry.split(';')[0] for entry in response['Server-Timing'].split(', ')],
+                         ['lookup', 'substitution', 'total'])
+        
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            with self.settings(BUNNIFY_PROFILE_HEADER=True, BUNNIFY_PROFILE_DIR=tmp_dir):
+                app = FastPathWSGI(get_wsgi_application())
+                self.assertNotIn('X-Bunnify-Profile-Dump', call(app, '/gh/', {'repo': 'a/b'}))
+                self.assertIn('X-Bunnify-Profile-Dump', call(app, '/gh/', {'repo': 'a/b'}, **{'X-Bunnify-Profile': '1'}))
+        
+        handed = []
+        
+        async def django_app(scope, receive, send):
+            handed.append(scope['path'])
+        
+        scope = {'type': 'http', 'method': 'GET', 'path': '/search/', 'query_string': b'q=gh+a/b', 'headers': []}
+        with self.settings(BUNNIFY_PROFILE_SAMPLE_RATE=10):
+            asyncio.run(FastPathASGI(django_app)(scope, None, None))
+        self.assertEqual(handed, ['/search/'])
+
+
+class ParameterHistoryTests(TestCase):
+    """Tests for parameter value completions from history"""
+    
+    def setUp(self):
+        snapshot.invalidate()
+        Bookmark.objects.create(
+            key='pr',
+            description='Pull request',
+            url='https://github.com/#{repo}/pull/#{pr_id}',
+            defaults={'repo': 'shop/world'}
+        )
+        Bookmark.objects.create(key='g', description='Google', url='https://www.google.com/search?q=#{query}')
+        self.history_patch = patch.object(history_module, 'history', history_module.ParameterHistory(100))
+        self.history_patch.start()
+        self.addCleanup(self.history_patch.stop)
+    
+    def suggest(self, text):
+        history_module.flush()
+        return self.client.get('/api/suggestions/', {'q': text}).json()
+    
+    def test_redirects_feed_ranked_completions(self):
+        """Values used by redirects are suggested for the parameter being typed, most used first"""
+        for query in ['pr 1 shop/web', 'pr 2 shop/world', 'pr 3 shop/web', 'pr 1 other/repo']:
+            self.client.get('/search/', {'q': query})
+        self.client.get('/pr/', {'pr_id': '4', 'repo': 'shop/api'})
+        
+        query, completions, descriptions, urls = self.suggest('pr ')
+        self.assertEqual(completions, ['pr 1', 'pr 4', 'pr 3', 'pr 2'])
+        self.assertEqual(descriptions[0], 'Pull request (pr_id)')
+        self.assertEqual(urls[0], 'https://github.com/shop/world/pull/1')
+        
+        _, completions, _, urls = self.suggest('pr 12 Shop/')
+        self.assertEqual(completions, ['pr 12 shop/web', 'pr 12 shop/api', 'pr 12 shop/world'])
+        self.assertEqual(urls[0], 'https://github.com/shop/web/pull/12')
+    
+    def test_single_parameter_and_command_history(self):
+        """Single-parameter values keep their spaces; palette commands are recorded too"""
+        self.client.post('/api/history/', {'command': 'g django queryset'})
+        self.client.get('/search/', {'q': 'g django admin'})
+        _, completions, _, _ = self.suggest('g django q')
+        self.assertEqual(completions, ['g django queryset'])
+    
+    def test_falls_back_to_key_suggestions(self):
+        """Without history, or for unknown keys, key suggestions are returned as before"""
+        self.assertEqual(self.suggest('pr ')[1], ['pr'])
+        self.assertEqual(self.suggest('zz 1')[1], [])
+    
+    @override_settings(BUNNIFY_FALLBACK_KEY='g')
+    def test_only_typed_values_are_recorded(self):
+        """Plain-text searches sent to the fallback and placeholder defaults never become completions"""
+        self.client.get('/search/', {'q': 'my private search'})
+        self.client.post('/api/history/', {'command': 'another private search'})
+        self.client.get('/search/', {'q': 'pr 7'})
+        self.client.get('/search/', {'q': 'g typed query'})
+        self.assertEqual(self.suggest('g ')[1], ['g typed query'])
+        self.assertEqual(self.suggest('pr ')[1], ['pr 7'])
+        self.assertEqual(history_module.suggest_values('', 'pr', 'repo'), [])  # The default was not recorded
+    
+    def test_full_queue_drops_values(self):
+        """Values are dropped and counted, never waited for, when the history thread falls behind"""
+        history_module.record('', 'g', {'query': 'started'})  # The history thread now waits on the real queue
+        history_module.flush()
+        full = queue.Queue(1)
+        full.put(('', 'g', {'query': 'queued'}))
+        with patch.object(history_module, '_queue', full):
+            before = history_module.metrics()['dropped']
+            history_module.record('', 'g', {'query': 'dropped'})
+            self.assertEqual(history_module.metrics()['dropped'], before + 1)
+            self.assertEqual(full.qsize(), 1)
+        self.assertEqual(self.client.get('/api/metrics/').json()['param_history']['dropped'], before + 1)
+    
+    def test_lru_eviction(self):
+        """The least recently used value is evicted when the index is full"""
+        index = history_module.ParameterHistory(2)
+        index.add('', 'g', {'query': 'a'})
+        index.add('', 'g', {'query': 'b'})
+        index.add('', 'g', {'query': 'a'})
+        index.add('', 'g', {'query': 'c'})
+        self.assertEqual(len(index), 2)
+        self.assertEqual(index.values('', 'g', 'query'), ['a', 'c'])
+    
+    def test_namespaces_are_isolated(self):
+        """Values used in one namespace are never suggested in another, nor in the shared one"""
+        snapshot.invalidate_namespace('alice')
+        snapshot.invalidate_namespace('bob')
+        self.addCleanup(snapshot.invalidate_namespace, 'alice')
+        self.addCleanup(snapshot.invalidate_namespace, 'bob')
+        self.client.get('/search/', {'q': 'g private alice query', 'ns': 'alice'})
+        self.client.get('/g/', {'query': 'alice direct', 'ns': 'alice'})
+        self.client.post('/api/history/?ns=alice', {'command': 'g alice palette'})
+        app = FastPathWSGI(get_wsgi_application())
+        environ = RequestFactory().get('/search/', {'q': 'pr 42 alice/secret', 'ns': 'alice'}).environ
+        app(environ, lambda status, headers: None)
+        self.client.get('/search/', {'q': 'g shared query'})
+        history_module.flush()
+        
+        alice = self.client.get('/api/suggestions/', {'q': 'g ', 'ns': 'alice'}).json()[1]
+        self.assertEqual(sorted(alice), ['g alice direct', 'g alice palette', 'g private alice query'])
+        self.assertEqual(self.suggest('g ')[1], ['g shared query'])
+        self.assertEqual(self.client.get('/api/suggestions/', {'q': 'g ', 'ns': 'bob'}).json()[1], ['g'])
+        self.assertEqual(self.suggest('pr ')[1], ['pr'])
+        self.assertEqual(self.client.get('/api/suggestions/', {'q': 'pr ', 'ns': 'alice'}).json()[1], ['pr 42'])
+
+
+class ReloadUnderLoadTests(TestCase):
+    """Reloads apply only differences and stay invisible to concurrent traffic"""
+    
+    def setUp(self):
+        snapshot.invalidate()
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.settings_override = override_settings(BUNNIFY_SNAPSHOT_FILE=Path(self.tmp_dir.name) / 'snapshot.json')
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+    
+    def load(self, data):
+        path = Path(self.tmp_dir.name) / 'bunnify.json'
+        path.write_text(json.dumps(data))
+        out = StringIO()
+        call_command('load_bookmarks', file=str(path), stdout=out)
+        return out.getvalue()
+    
+    def test_reload_writes_only_differences(self):
+        """Unchanged bookmarks keep their rows; changed, new and removed ones are applied"""
+        self.load({
+            'gh': {'description': 'GitHub', 'url': 'https://github.com'},
+            'c': {'description': 'Calendar', 'url': 'https://calendar.google.com'},
+        })
+        unchanged_pk = Bookmark.objects.get(key='gh').pk
+        output = self.load({
+            'gh': {'description': 'GitHub', 'url': 'https://github.com'},
+            'm': {'description': 'Mail', 'url': 'https://mail.google.com', 'cache': 60},
+        })
+        self.assertIn('2 bookmarks (1 created, 0 updated, 1 removed)', output)
+        self.assertEqual(Bookmark.objects.get(key='gh').pk, unchanged_pk)
+        self.assertEqual(list(Bookmark.objects.values_list('key', flat=True)), ['gh', 'm'])
+        
+        output = self.load({
+            'gh': {'description': 'GitHub', 'url': 'https://github.com/pulls'},
+            'm': {'description': 'Mail', 'url': 'https://mail.google.com', 'cache': 60},
+        })
+        self.assertIn('(0 created, 1 updated, 0 removed)', output)
+        self.assertEqual(snapshot.get_snapshot().get('gh').url, 'https://github.com/pulls')
+    
+    def test_soak_command(self):
+        """A short soak run reports zero spurious 404s, server errors and lock errors"""
+        result = subprocess.run(
+            [sys.executable, str(settings.BASE_DIR / 'manage.py'), 'soak_test',
+             '--bookmarks', '300', '--threads', '4', '--steady', '0.5', '--reload', '1.5'],
+            capture_output=True,
+            text=True,
+            timeout=120,
+        )
+        self.assertEqual(result.returncode, 0, result.stdout + result.stderr)
+        self.assertIn('Spurious 404s: 0', result.stdout)
+        self.assertIn('DB lock errors: 0', result.stdout)
+        self.assertIn('Reload timeouts: 0', result.stdout)
+        self.assertRegex(result.stdout, r'Reloads completed: [1-9]')
+        self.assertRegex(result.stdout, r'\nreload +\d+ ')
+
+
+class ProductionSettingsTests(SimpleTestCase):
+    """Tests for the BUNNIFY_ENV=production settings profile"""
+    
+    ENV = {'BUNNIFY_ENV': 'production', 'BUNNIFY_SECRET_KEY': 'test-secret-key', 'BUNNIFY_ALLOWED_HOSTS': '127.0.0.1'}
+    
+    def run_manage(self, *args, env=None):
+        result = subprocess.run(
+            [sys.executable, str(settings.BASE_DIR / 'manage.py'), *args],
+            capture_output=True,
+            text=True,
+            env=env or {**os.environ, **self.ENV},
+            timeout=120,
+        )
+        return result
+    
+    def manage_output(self, *args):
+        result = self.run_manage(*args)
+        self.assertEqual(result.returncode, 0, result.stderr)
+        return result.stdout
+    
+    def test_profile_settings(self):
+        """DEBUG is off, admin middleware is trimmed and templates are cached"""
+        output = self.manage_output('shell', '-c', (
+            'import json; from django.conf import settings; '
+            'print(json.dumps([settings.DEBUG, settings.MIDDLEWARE, settings.TEMPLATES[0]["OPTIONS"]["loaders"], '
+            'settings.CONN_MAX_AGE, "django.contrib.admin" in settings.INSTALLED_APPS]))'
+        ))
+        debug, middleware, loaders, conn_max_age, admin = json.loads(output.strip().splitlines()[-1])
+        self.assertFalse(debug)
+        self.assertNotIn('django.contrib.messages.middleware.MessageMiddleware', middleware)
+        self.assertNotIn('django.contrib.auth.middleware.AuthenticationMiddleware', middleware)
+        self.assertEqual(loaders[0][0], 'django.template.loaders.cached.Loader')
+        self.assertIsNone(conn_max_age)
+        self.assertFalse(admin)
+    
+    def test_views_work_under_production_profile(self):
+        """Every benchmarked view answers under the production profile"""
+        output = self.manage_output('benchmark_requests', '--json', '--requests', '3', '--bookmarks', '20')
+        report = json.loads(output.strip().splitlines()[-1])
+        self.assertEqual(report['profile'], 'production')
+        self.assertEqual(len(report['results']), 5)
+    
+    def test_requires_secret_key_and_allowed_hosts(self):
+        """The production profile refuses to start on the development secret key or any host"""
+        for missing in ('BUNNIFY_SECRET_KEY', 'BUNNIFY_ALLOWED_HOSTS'):
+            env = {name: value for name, value in {**os.environ, **self.ENV}.items() if name != missing}
+            result = self.run_manage('check', env=env)
+            self.assertNotEqual(result.returncode, 0)
+            self.assertIn('ImproperlyConfigured', result.stderr)
+            self.assertIn(missing, result.stderr)
+        # Development keeps its fallbacks
+        env = {name: value for name, value in os.environ.items() if name not in self.ENV}
+        self.assertEqual(self.run_manage('check', env=env).returncode, 0)
+
+
+class ReviewQueueTests(TestCase):
+    """Tests for the bounded Copilot review job queue"""
+    
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.release = Path(self.tmp_dir.name) / 'release'
+        script = Path(self.tmp_dir.name) / 'review.sh'
+        script.write_text(
+            '#!/bin/bash\n'
+            'echo "📝 Posting review request comment for $1 in $2..."\n'
+            f'while [ ! -f "{self.release}" ]; do sleep 0.02; done\n'
+            'echo "---COPILOT_REVIEW_START---"\n'
+            'echo "Looks <good>"\n'
+            'echo "---COPILOT_REVIEW_END---"\n'
+        )
+        script.chmod(0o755)
+        self.settings_override = override_settings(BUNNIFY_REVIEW_SCRIPT=script)
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+        self.queue = reviews.ReviewQueue(workers=1, max_queued=1)
+        queue_patch = patch('bookmarks.views.review_queue', self.queue)
+        queue_patch.start()
+        self.addCleanup(queue_patch.stop)
+        self.addCleanup(self.release.touch)
+    
+    def wait_for_state(self, job, state):
+        deadline = time.monotonic() + 10
+        while job.state != state and time.monotonic() < deadline:
+            job.read(len(job.lines), timeout=0.1)
+        self.assertEqual(job.state, state)
+    
+    def test_pool_and_waiting_list_are_bounded(self):
+        """One job runs, one waits, further PRs are rejected; the same PR shares its job"""
+        running = self.queue.submit('1', 'shop/world')
+        self.wait_for_state(running, reviews.RUNNING)
+        waiting = self.queue.submit('2', 'shop/world')
+        self.assertEqual(self.queue.position(waiting), 1)
+        self.assertIs(self.queue.submit('2', 'shop/world'), waiting)
+        with self.assertRaises(reviews.QueueFull):
+            self.queue.submit('3', 'shop/world')
+        response = self.client.get('/review-pr/', {'pr': '3'})
+        self.assertEqual(response.status_code, 503)
+        
+        self.release.touch()
+        self.wait_for_state(running, reviews.DONE)
+        self.wait_for_state(waiting, reviews.DONE)
+        self.assertEqual(running.lines[-2], 'Looks <good>')
+    
+    def test_clients_attach_from_start_or_cursor(self):
+        """The progress page and API replay buffered output to any client"""
+        response = self.client.get('/review-pr/', {'pr': '42', 'repo': 'shop/web'})
+        self.assertEqual(response.status_code, 302)
+        job_id = response['Location'].rstrip('/').rsplit('/', 1)[-1]
+        job = self.queue.get(job_id)
+        self.wait_for_state(job, reviews.RUNNING)
+        
+        status = self.client.get(f'/api/reviews/{job_id}/', {'wait': '5'}).json()
+        self.assertEqual(status['lines'], ['📝 Posting review request comment for 42 in shop/web...'])
+        self.assertEqual(status['cursor'], 1)
+        
+        self.release.touch()
+        self.wait_for_state(job, reviews.DONE)
+        status = self.client.get(f'/api/reviews/{job_id}/', {'cursor': '1'}).json()
+        self.assertEqual(status['state'], 'done')
+        self.assertEqual(status['lines'][1], 'Looks <good>')
+        
+        for _ in range(2):
+            page = b''.join(self.client.get(f'/review-pr/{job_id}/').streaming_content).decode()
+            self.assertIn('Posting review request comment for 42', page)
+            self.assertIn('"Looks \\u003cgood>"', page)
+            self.assertIn('Review complete', page)
+        page = b''.join(self.client.get(f'/review-pr/{job_id}/', {'cursor': '1'}).streaming_content).decode()
+        self.assertNotIn('Posting review request comment for 42', page)
+        self.assertEqual(self.client.get('/review-pr/unknown/').status_code, 404)
+
+
+class CheckBookmarksTests(TestCase):
+    """Tests for the read-only check_bookmarks command"""
+    
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.dir = Path(self.tmp_dir.name)
+    
+    def write(self, name, data):
+        path = self.dir / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(data if isinstance(data, str) else json.dumps(data))
+        return str(path)
+    
+    def check(self, *paths, workers=2):
+        out = StringIO()
+        try:
+            call_command('check_bookmarks', *paths, '--json', '--workers', str(workers), stdout=out)
+            failed = False
+        except CommandError:
+            failed = True
+        return failed, json.loads(out.getvalue())
+    
+    def test_valid_files_pass(self):
+        """Valid files pass, globs are expanded and the database is not touched"""
+        self.write('team_a/bunnify.json', {
+            'pr': {'description': 'PR', 'url': 'https://github.com/#{repo}/pull/#{id}', 'defaults': {'repo': 'a/b'}},
+            'about': {'description': 'Chrome', 'url': 'chrome://settings'},
+        })
+        self.write('team_b/bunnify.json', {'gh': {'description': 'GitHub', 'url': 'https://github.com', 'cache': 60}})
+        failed, report = self.check(str(self.dir / '**' / '*.json'))
+        self.assertFalse(failed)
+        self.assertEqual(report['summary']['files'], 2)
+        self.assertEqual(report['summary']['bookmarks'], 3)
+        self.assertTrue(report['summary']['ok'])
+        self.assertEqual(Bookmark.objects.count(), 0)
+    
+    def test_reports_every_kind_of_problem(self):
+        """Schema, reserved keys, defaults, malformed URLs, collisions and bad JSON are reported"""
+        first = self.write('a.json', {'gh': {'description': 'GitHub', 'url': 'https://github.com'}})
+        second = self.write('b.json', {
+            'gh': {'description': 'Also GitHub', 'url': 'https://github.com'},
+            'help': {'description': 'Help', 'url': 'https://example.com'},
+            'nohost': {'description': 'No scheme', 'url': 'github.com/#{repo}'},
+            'broken': {'description': 'Broken', 'url': 'https://github.com/#{repo'},
+            'd': {'description': 'Default', 'url': 'https://example.com/#{a}', 'defaults': {'b': 'x'}},
+            'n': {'description': 5, 'url': 'https://example.com'},
+        })
+        third = self.write('c.json', '{not json')
+        failed, report = self.check(first, second, third)
+        self.assertTrue(failed)
+        self.assertEqual(report['collisions'], {'gh': [first, second]})
+        codes = {(issue.get('key'), issue['code']) for issue in report['files'][1]['errors']}
+        self.assertEqual(codes, {
+            ('gh', 'key_collision'),
+            ('help', 'reserved_key'),
+            ('nohost', 'malformed_url'),
+            ('broken', 'malformed_url'),
+            ('d', 'unknown_default'),
+            ('n', 'schema'),
+        })
+        self.assertEqual(report['files'][2]['errors'][0]['code'], 'invalid_json')
+    
+    def test_serial_and_parallel_reports_match(self):
+        """The process pool gives the same report as checking files one by one"""
+        paths = [self.write(f'f{n}.json', {f'k{n}': {'description': 'x', 'url': 'ftp://example.com'}}) for n in range(4)]
+        serial = self.check(*paths, workers=1)[1]
+        parallel = self.check(*paths, workers=4)[1]
+        self.assertEqual(serial['files'], parallel['files'])
+        self.assertEqual(serial['summary']['errors'], 4)
+
+
+class StubLinkHandler(BaseHTTPRequestHandler):
+    """Local HTTP server standing in for bookmark targets in link check tests"""
+    protocol_version = 'HTTP/1.1'
+    
+    def setup(self):
+        super().setup()
+        with self.server.stats_lock:
+            self.server.connections += 1
+    
+    def respond(self, send_body):
+        with self.server.stats_lock:
+            self.server.in_flight += 1
+            self.server.max_in_flight = max(self.server.max_in_flight, self.server.in_flight)
+        try:
+            path = self.path.split('?')[0]
+            if path == '/slow':
+                time.sleep(1)
+            else:
+                time.sleep(0.01)
+            status = {'/gone': 404, '/moved': 301}.get(path, 200)
+            if path == '/nohead' and not send_body:
+                status = 405
+            body = b'ok' if send_body else b''
+            self.send_response(status)
+            self.send_header('Content-Length', str(2 if send_body else 0))
+            self.end_headers()
+            self.wfile.write(body)
+        finally:
+            with self.server.stats_lock:
+                self.server.in_flight -= 1
+    
+    def do_HEAD(self):
+        self.respond(send_body=False)
+    
+    def do_GET(self):
+        self.respond(send_body=True)
+    
+    def log_message(self, format, *args):
+        pass
+
+
+class StubLinkServer(ThreadingHTTPServer):
+    daemon_threads = True
+    
+    def handle_error(self, request, client_address):
+        pass  # The timeout test abandons slow responses on purpose
+
+
+class LinkCheckTests(TestCase):
+    """Tests for the concurrent link checker and check_links"""
+    
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = StubLinkServer(('127.0.0.1', 0), StubLinkHandler)
+        cls.server.stats_lock = threading.Lock()
+        cls.base = f'http://127.0.0.1:{cls.server.server_address[1]}'
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+    
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+    
+    def setUp(self):
+        self.server.connections = self.server.in_flight = self.server.max_in_flight = 0
+    
+    def test_statuses_timeouts_and_head_fallback(self):
+        """HEAD is retried with GET, redirects are alive, timeouts and refused connections are dead"""
+        closed = socket.socket()
+        closed.bind(('127.0.0.1', 0))
+        refused = f'http://127.0.0.1:{closed.getsockname()[1]}/'
+        closed.close()
+        paths = ['/ok', '/gone', '/nohead', '/moved', '/slow']
+        results = check_urls([self.base + path for path in paths] + [refused], timeout=0.5)
+        
+        self.assertEqual([results[self.base + path].status for path in paths], [200, 404, 200, 301, None])
+        self.assertEqual([results[self.base + path].ok for path in paths], [True, False, True, True, False])
+        self.assertEqual(results[self.base + '/ok'].method, 'HEAD')
+        self.assertEqual(results[self.base + '/nohead'].method, 'GET')
+        self.assertIn('timed out', results[self.base + '/slow'].error)
+        self.assertFalse(results[refused].ok)
+        self.assertTrue(results[refused].error)
+    
+    def test_per_host_limit_and_connection_reuse(self):
+        """Requests to one host never exceed the per-host limit and reuse keep-alive connections"""
+        urls = [f'{self.base}/ok?n={n}' for n in range(60)]
+        results = check_urls(urls, per_host=3)
+        self.assertTrue(all(result.ok for result in results.values()))
+        self.assertLessEqual(self.server.max_in_flight, 3)
+        self.assertLessEqual(self.server.connections, 6)
+    
+    def test_check_links_command_caches_results_and_list_shows_them(self):
+        """check_links stores results, reuses them within the TTL and /list/ marks dead links"""
+        Bookmark.objects.create(key='alive', description='Alive', url=f'{self.base}/ok')
+        Bookmark.objects.create(key='dead', description='Dead', url=f'{self.base}/#{{page}}', defaults={'page': 'gone'})
+        Bookmark.objects.create(key='param', description='Needs a parameter', url=f'{self.base}/#{{page}}')
+        Bookmark.objects.create(key='chrome', description='Settings', url='chrome://settings')
+        
+        out = StringIO()
+        call_command('check_links', '--json', stdout=out)
+        report = json.loads(out.getvalue())
+        self.assertEqual(report['skipped'], ['chrome', 'param'])
+        self.assertEqual(report['summary']['checked'], 2)
+        self.assertEqual([(link['key'], link['status']) for link in report['links']], [('alive', 200), ('dead', 404)])
+        
+        out = StringIO()
+        call_command('check_links', '--json', stdout=out)
+        report = json.loads(out.getvalue())
+        self.assertEqual(report['summary']['checked'], 0)
+        self.assertEqual(report['summary']['dead'], 1)
+        self.assertTrue(all(link['cached'] for link in report['links']))
+        
+        content = self.client.get(reverse('bookmarks:list')).content.decode()
+        self.assertEqual(content.count('link-status link-dead'), 1)
+        self.assertIn('✗ 404', content)
+        with override_settings(BUNNIFY_LINK_CHECK_TTL=0):
+            content = self.client.get(reverse('bookmarks:list')).content.decode()
+        self.assertNotIn('class="link-status', content)
+
+
+class AliasChainTests(TestCase):
+    """Tests for aliases and chained bookmarks flattened at load time"""
+    
+    BOOKMARKS = {
+        'pr': {
+            'description': 'Pull Request',
+            'url': 'https://github.com/#{repo}/pull/#{pr_number}',
+            'defaults': {'repo': 'org/main'},
+            'aliases': ['pull', 'p'],
+        },
+        'mypr': {'extends': 'pr', 'description': 'My Pull Request', 'defaults': {'repo': 'me/fork'}},
+        'oldpr': {'extends': 'pull', 'url': 'https://github.com/#{repo}/pulls/#{pr_number}'},
+        'gh': {'description': 'GitHub', 'url': 'https://github.com'},
+    }
+    
+    def load(self, data):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            bookmarks_file = Path(tmp_dir) / 'bunnify.json'
+            bookmarks_file.write_text(json.dumps(data))
+            out = StringIO()
+            with override_settings(BUNNIFY_SNAPSHOT_FILE=Path(tmp_dir) / 'snapshot.json'):
+                call_command('load_bookmarks', file=str(bookmarks_file), stdout=out)
+        return out.getvalue()
+    
+    def test_aliases_and_chains_load_as_concrete_bookmarks(self):
+        """Every alias and chained bookmark is stored flattened and redirects with one lookup"""
+        output = self.load(self.BOOKMARKS)
+        self.assertIn('Successfully loaded 6 bookmarks', output)
+        self.assertEqual(Bookmark.objects.get(key='p').url, Bookmark.objects.get(key='pr').url)
+        mypr = Bookmark.objects.get(key='mypr')
+        self.assertEqual((mypr.description, mypr.defaults), ('My Pull Request', {'repo': 'me/fork'}))
+        self.assertEqual(Bookmark.objects.get(key='oldpr').description, 'Pull Request')
+        
+        expected = {
+            'mypr 12': 'https://github.com/me/fork/pull/12',
+            'pull 12 a/b': 'https://github.com/a/b/pull/12',
+            'oldpr 12': 'https://github.com/org/main/pulls/12',
+        }
+        for query, url in expected.items():
+            response = self.client.get(reverse('bookmarks:search'), {'q': query})
+            self.assertEqual(response['Location'], url)
+    
+    def test_cycles_unknown_references_and_collisions_are_rejected(self):
+        """Invalid chains are errors in load_bookmarks and check_bookmarks, and nothing is loaded"""
+        invalid = {
+            'cycle': {'a': {'extends': 'b'}, 'b': {'extends': 'c'}, 'c': {'extends': 'a'}},
+            'unknown': {'a': {'extends': 'nope'}},
+            'collision': {'a': {'description': 'A', 'url': 'https://a.com', 'aliases': ['b']},
+                          'b': {'description': 'B', 'url': 'https://b.com'}},
+        }
+        for name, data in invalid.items():
+            with self.subTest(name):
+                output = self.load(data)
+                self.assertIn('Error:', output)
+                self.assertEqual(Bookmark.objects.count(), 0)
+        self.assertIn('a → b → c → a', self.load(invalid['cycle']))
+        
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = Path(tmp_dir) / 'bunnify.json'
+            path.write_text(json.dumps(invalid['cycle']))
+            self.assertEqual(check_file(str(path))['errors'][0]['code'], 'chain_cycle')
+    
+    def test_reload_recomputes_only_affected_chains(self):
+        """Changing an entry recomputes it and the bookmarks extending it, nothing else"""
+        resolver = ChainResolver()
+        first = resolver.resolve(self.BOOKMARKS)
+        self.assertEqual(resolver.recomputed, 4)
+        
+        edited = {**self.BOOKMARKS, 'pr': {**self.BOOKMARKS['pr'], 'defaults': {'repo': 'org/other'}}}
+        second = resolver.resolve(edited)
+        self.assertEqual(resolver.recomputed, 3)  # pr, mypr and oldpr
+        self.assertIs(second['gh'], first['gh'])
+        self.assertEqual(second['oldpr']['defaults'], {'repo': 'org/other'})
+        self.assertEqual(second['mypr']['defaults'], {'repo': 'me/fork'})
+        
+        resolver.resolve({**edited, 'gh': {'description': 'GitHub', 'url': 'https://github.com/'}})
+        self.assertEqual(resolver.recomputed, 1)
+
+
+class NamespaceTests(TestCase):
+    """Tests for per-user namespaces layered over the shared bookmarks"""
+    
+    def setUp(self):
+        snapshot.invalidate()
+        snapshot.invalidate_namespace('alice')
+        Bookmark.objects.create(
+            key='pr',
+            description='Pull Request',
+            url='https://github.com/#{repo}/pull/#{pr_number}',
+            defaults={'repo': 'org/main'}
+        )
+        Bookmark.objects.create(key='gh', description='GitHub', url='https://github.com')
+        Bookmark.objects.create(
+            namespace='alice',
+            key='pr',
+            description='My pull request',
+            url='https://github.com/#{repo}/pull/#{pr_number}',
+            defaults={'repo': 'alice/fork'}
+        )
+        Bookmark.objects.create(namespace='alice', key='notes', description='Notes', url='https://notes.example.com')
+    
+    def test_personal_bookmarks_shadow_shared_ones(self):
+        """With ?ns= personal keys win over shared ones, in the views and the fast path"""
+        app = FastPathWSGI(get_wsgi_application())
+        expected = {
+            ('pr 7', ''): 'https://github.com/org/main/pull/7',
+            ('pr 7', 'alice'): 'https://github.com/alice/fork/pull/7',
+            ('gh', 'alice'): 'https://github.com',
+            ('notes', 'alice'): 'https://notes.example.com',
+            ('h', 'alice'): '/list/?ns=alice',
+        }
+        for (query, namespace), url in expected.items():
+            with self.subTest(query=query, namespace=namespace):
+                data = {'q': query, 'ns': namespace} if namespace else {'q': query}
+                self.assertEqual(self.client.get('/search/', data)['Location'], url)
+                captured = {}
+                app(RequestFactory().get('/search/', data).environ, lambda status, headers: captured.update(headers))
+                self.assertEqual(captured['Location'], url)
+        self.assertEqual(self.client.get('/search/', {'q': 'notes'}).status_code, 404)
+        self.assertEqual(self.client.get('/notes/', {'ns': 'alice'})['Location'], 'https://notes.example.com')
+        
+        content = self.client.get('/list/', {'ns': 'alice'}).content.decode()
+        self.assertIn('My pull request', content)
+        self.assertNotIn('>Pull Request<', content)
+        self.assertEqual(content.count('class="personal-badge"'), 2)
+        self.assertNotIn('Notes', self.client.get('/list/').content.decode())
+    
+    def test_command_palette_per_namespace(self):
+        """The palette lists a namespace's bookmarks and caches each namespace separately"""
+        shared = self.client.get('/cmd/').content.decode()
+        personal = self.client.get('/cmd/', {'ns': 'alice'}).content.decode()
+        self.assertNotIn('"key": "notes"', shared)
+        self.assertIn('"key": "notes"', personal)
+        self.assertIn('My pull request', personal)
+        self.assertNotIn('My pull request', shared)
+        self.assertIn("const namespace = 'alice';", personal)
+        self.assertNotIn('"key": "notes"', self.client.get('/cmd/').content.decode())
+    
+    def test_namespace_snapshots_are_invalidated_independently(self):
+        """A personal edit keeps the shared snapshot and index; a shared edit keeps the personal bookmarks"""
+        shared = snapshot.get_snapshot()
+        shared_index = suggestions.get_index()
+        personal = snapshot.get_namespace_snapshot('alice')
+        self.assertEqual(len(personal.overrides), 2)
+        
+        Bookmark.objects.create(namespace='alice', key='wiki', description='Wiki', url='https://wiki.example.com')
+        self.assertIs(snapshot.get_snapshot(), shared)
+        self.assertIs(suggestions.get_index(), shared_index)
+        self.assertEqual(snapshot.get_namespace_snapshot('alice').get('wiki').url, 'https://wiki.example.com')
+        
+        personal = snapshot.get_namespace_snapshot('alice')
+        Bookmark.objects.create(key='c', description='Calendar', url='https://calendar.google.com')
+        with self.assertNumQueries(2):  # The shared snapshot only: its bookmarks and source revision
+            rebased = snapshot.get_namespace_snapshot('alice')
+        self.assertIs(rebased.overrides, personal.overrides)
+        self.assertEqual(rebased.get('c').url, 'https://calendar.google.com')
+        self.assertNotEqual(rebased.generation, personal.generation)
+    
+    def test_suggestions_and_load_bookmarks_per_namespace(self):
+        """Suggestions merge personal bookmarks; load_bookmarks --namespace only touches that namespace"""
+        response = self.client.get('/api/suggestions/', {'q': 'p', 'ns': 'alice'})
+        self.assertEqual(json.loads(response.content)[1:3], [['pr'], ['My pull request']])
+        response = self.client.get('/api/suggestions/', {'q': 'p'})
+        self.assertEqual(json.loads(response.content)[2], ['Pull Request'])
+        
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            bookmarks_file = Path(tmp_dir) / 'alice.json'
+            bookmarks_file.write_text(json.dumps({
+                'pr': {'description': 'Pull request', 'url': 'https://github.com/#{repo}/pull/#{pr_number}'},
+                'mypr': {'extends': 'pr', 'defaults': {'repo': 'alice/x'}},
+            }))
+            snapshot_file = Path(tmp_dir) / 'snapshot.json'
+            with override_settings(BUNNIFY_SNAPSHOT_FILE=snapshot_file):
+                call_command('load_bookmarks', file=str(bookmarks_file), namespace='alice', stdout=StringIO())
+                self.assertTrue((Path(tmp_dir) / 'snapshot.alice.json').exists())
+                self.assertFalse(snapshot_file.exists())
+                response = self.client.get('/search/', {'q': 'mypr 3', 'ns': 'alice'})
+        self.assertEqual(response['Location'], 'https://github.com/alice/x/pull/3')
+        self.assertEqual(sorted(Bookmark.objects.filter(namespace='alice').values_list('key', flat=True)), ['mypr', 'pr'])
+        self.assertEqual(Bookmark.objects.filter(namespace='').count(), 2)
+    
+    def test_personal_files_cannot_extend_shared_bookmarks(self):
+        """A personal bookmark extending a shared key is rejected, so it can never keep stale shared fields"""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            bookmarks_file = Path(tmp_dir) / 'alice.json'
+            bookmarks_file.write_text(json.dumps({'mypr': {'extends': 'pr', 'defaults': {'repo': 'alice/x'}}}))
+            with override_settings(BUNNIFY_SNAPSHOT_FILE=Path(tmp_dir) / 'snapshot.json'):
+                output = StringIO()
+                call_command('load_bookmarks', file=str(bookmarks_file), namespace='alice', stdout=output)
+        self.assertIn("Personal bookmark 'mypr' extends 'pr'", output.getvalue())
+        self.assertEqual(sorted(Bookmark.objects.filter(namespace='alice').values_list('key', flat=True)), ['notes', 'pr'])
+        # Aliases and chains inside the personal file still flatten
+        entries = loader.flatten_entries({
+            'base': {'description': 'Base', 'url': 'https://base.example.com', 'aliases': ['b']},
+            'child': {'extends': 'b', 'description': 'Child'},
+        }, 'alice')
+        self.assertEqual(entries['child']['url'], 'https://base.example.com')
+        self.assertEqual(sorted(entries), ['b', 'base', 'child'])
+
+
+class ResolverSocketTests(TestCase):
+    """Tests for the Unix-socket resolver used by shell completions"""
+    
+    def setUp(self):
+        snapshot.invalidate()
+        snapshot.invalidate_namespace('alice')
+        Bookmark.objects.create(key='g', description='Google', url='https://www.google.com/search?q=#{query}')
+        Bookmark.objects.create(key='gh', description='GitHub', url='https://github.com')
+        Bookmark.objects.create(
+            key='pr',
+            description='Pull Request',
+            url='https://github.com/#{repo}/pull/#{pr_number}',
+            defaults={'repo': 'org/main'}
+        )
+        Bookmark.objects.create(namespace='alice', key='gist', description='Gists', url='https://gist.github.com')
+        self.history_patch = patch.object(history_module, 'history', history_module.ParameterHistory(100))
+        self.history_patch.start()
+        self.addCleanup(self.history_patch.stop)
+        # Build the snapshots here: the handler threads cannot see this test's transaction
+        snapshot.get_snapshot()
+        snapshot.get_namespace_snapshot('alice')
+        
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.path = Path(tmp_dir.name) / 'bunnify.sock'
+        self.server = bind_socket(self.path)
+        thread = threading.Thread(target=self.server.serve_forever, args=(0.05,), daemon=True)
+        thread.start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.connection.connect(str(self.path))
+        self.addCleanup(self.connection.close)
+        self.stream = self.connection.makefile('rwb', buffering=0)
+    
+    def request(self, line):
+        self.stream.write(f'{line}\n'.encode())
+        header = self.stream.readline().decode().rstrip('\n')
+        if not header.startswith('ok '):
+            return header
+        return [self.stream.readline().decode().rstrip('\n') for _ in range(int(header[3:]))]
+    
+    def test_resolve_and_complete(self):
+        """Keys, resolves and parameter values are answered on one connection, per namespace"""
+        self.assertEqual(self.request('keys g'), ['g\tGoogle', 'gh\tGitHub'])
+        self.assertEqual(self.request('keys x'), [])
+        self.assertEqual(self.request('resolve pr 7'), ['https://github.com/org/main/pull/7'])
+        self.assertEqual(self.request('resolve g hello world'), ['https://www.google.com/search?q=hello world'])
+        self.assertEqual(self.request('resolve h'), ['http://127.0.0.1:8000/list/'])
+        self.assertEqual(self.request('resolve gist'), "error unknown_key Bookmark 'gist' not found")
+        history_module.flush()
+        self.assertEqual(self.request('params pr '), ['7\tpr_number'])
+        self.assertEqual(self.request('params g hello'), ['hello world\tquery'])
+        
+        self.assertEqual(self.request('ns alice'), [])
+        self.assertEqual(self.request('keys g'), ['g\tGoogle', 'gh\tGitHub', 'gist\tGists'])
+        self.assertEqual(self.request('resolve gist'), ['https://gist.github.com'])
+        self.assertEqual(self.request('ping'), [snapshot.get_namespace_snapshot('alice').generation])
+        self.assertTrue(self.request('ns ../etc').startswith('error invalid_namespace '))
+        self.assertTrue(self.request('open pr').startswith('error bad_request '))
+    
+    def test_round_trips_are_sub_millisecond(self):
+        """Completions are answered from memory, well under a millisecond per round trip"""
+        self.request('keys p')
+        timings = []
+        for _ in range(500):
+            start = time.perf_counter()
+            self.request('keys p')
+            timings.append(time.perf_counter() - start)
+        timings.sort()
+        self.assertLess(timings[len(timings) // 2], 0.001)
+    
+    def test_socket_file_handling(self):
+        """A live socket is never taken over, a stale one is replaced, and only the owner can connect"""
+        self.assertEqual(self.path.stat().st_mode & 0o777, 0o600)
+        with self.assertRaises(OSError):
+            bind_socket(self.path)
+        
+        stale = self.path.with_name('stale.sock')
+        bind_socket(stale).server_close()  # Leaves the socket file behind, like a killed daemon
+        self.assertTrue(stale.is_socket())
+        server = bind_socket(stale)
+        server.server_close()
+        
+        regular = self.path.with_name('regular.sock')
+        regular.write_text('not a socket')
+        with self.assertRaises(OSError):
+            bind_socket(regular)
+        self.assertEqual(regular.read_text(), 'not a socket')
+
+
+class GitSourceTests(TestCase):
+    """Tests for following bunnify.json in a git repository"""
+    
+    def setUp(self):
+        snapshot.invalidate()
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.tmp = Path(tmp_dir.name)
+        self.repo = self.tmp / 'bookmarks'
+        self.git('init', '--quiet', '--initial-branch=main', str(self.repo), cwd=self.tmp)
+        settings_override = override_settings(BUNNIFY_SNAPSHOT_FILE=self.tmp / 'snapshot.json')
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.bookmarks = {
+            'gh': {'description': 'GitHub', 'url': 'https://github.com'},
+            'c': {'description': 'Calendar', 'url': 'https://calendar.google.com'},
+            'pr': {'description': 'Pull request', 'url': 'https://github.com/#{repo}/pull/#{pr_id}', 'aliases': ['pull']},
+        }
+    
+    def git(self, *args, cwd=None):
+        env = {**os.environ, 'GIT_AUTHOR_NAME': 'Test', 'GIT_AUTHOR_EMAIL': 'test@example.com',
+               'GIT_COMMITTER_NAME': 'Test', 'GIT_COMMITTER_EMAIL': 'test@example.com'}
+        result = subprocess.run(['git', *args], cwd=cwd or self.repo, env=env, capture_output=True, text=True, check=True)
+        return result.stdout.strip()
+    
+    def commit(self, name='bunnify.json', content=None):
+        (self.repo / name).write_text(content if content is not None else json.dumps(self.bookmarks))
+        self.git('add', name)
+        self.git('commit', '--quiet', '-m', f'Update {name}')
+        return self.git('rev-parse', 'HEAD')
+    
+    def test_only_changed_keys_are_applied(self):
+        """A new commit rewrites only the bookmarks its blob diff changed; the commit is the revision"""
+        first = self.commit()
+        watcher = WatchCommand(stdout=StringIO())
+        source = GitSource(self.repo)
+        self.assertTrue(watcher.reload_from_git(source))
+        self.assertEqual(snapshot.get_snapshot().revision, first)
+        self.assertEqual(snapshot.get_snapshot().generation, snapshot.get_snapshot().digest)
+        self.assertEqual(Bookmark.objects.count(), 4)  # pr and its alias pull
+        unchanged = Bookmark.objects.get(key='gh').pk
+        
+        self.bookmarks['pr']['url'] = 'https://github.com/#{repo}/pulls/#{pr_id}'
+        self.bookmarks['new'] = {'description': 'New', 'url': 'https://new.example.com'}
+        del self.bookmarks['c']
+        second = self.commit()
+        self.assertTrue(watcher.reload_from_git(source))
+        self.assertIn('(3 changed, 1 removed)', watcher.stdout.getvalue())  # pr, its alias pull, and new
+        self.assertEqual(Bookmark.objects.get(key='gh').pk, unchanged)
+        self.assertEqual(Bookmark.objects.get(key='pull').url, 'https://github.com/#{repo}/pulls/#{pr_id}')
+        self.assertFalse(Bookmark.objects.filter(key='c').exists())
+        self.assertEqual(snapshot.get_snapshot().revision, second)
+        self.assertEqual(self.client.get('/api/snapshot/').json()['revision'], second)
+        generation = snapshot.get_snapshot().generation
+        
+        # Commits that do not touch the bookmarks file change nothing
+        self.commit('README.md', 'docs')
+        self.assertFalse(watcher.reload_from_git(source))
+        self.assertEqual(snapshot.get_snapshot().revision, second)
+        self.assertEqual(snapshot.get_snapshot().generation, generation)
+    
+    def test_mirror_is_fetched_once(self):
+        """--once fetches a bare mirror and applies its latest commit"""
+        self.commit()
+        mirror = self.tmp / 'mirror.git'
+        self.git('clone', '--quiet', '--mirror', str(self.repo), str(mirror), cwd=self.tmp)
+        self.bookmarks['gh']['description'] = 'GitHub home'
+        head = self.commit()
+        
+        out = StringIO()
+        call_command('watch_bookmarks', git=str(mirror), once=True, stdout=out)
+        self.assertIn(f'Applied {head[:12]}', out.getvalue())
+        self.assertEqual(Bookmark.objects.get(key='gh').description, 'GitHub home')
+        self.assertEqual(BookmarkRevision.objects.get(namespace='').revision, head)
+        with self.assertRaises(CommandError):
+            call_command('watch_bookmarks', git=str(self.tmp / 'missing'), once=True, stdout=StringIO())
+    
+    def test_invalid_commit_keeps_bookmarks_and_file_loads_drop_the_revision(self):
+        """A broken commit is reported and skipped; loading a plain file returns to content generations"""
+        first = self.commit()
+        watcher = WatchCommand(stdout=StringIO())
+        source = GitSource(self.repo)
+        watcher.reload_from_git(source)
+        self.commit(content='{"broken": ')
+        self.assertFalse(watcher.reload_from_git(source))
+        self.assertIn('Invalid bookmarks', watcher.stdout.getvalue())
+        self.assertEqual(snapshot.get_snapshot().revision, first)
+        
+        self.bookmarks['gh']['url'] = 'https://github.com/fixed'
+        self.commit()
+        self.assertTrue(watcher.reload_from_git(source))
+        self.assertEqual(Bookmark.objects.get(key='gh').url, 'https://github.com/fixed')
+        
+        bookmarks_file = self.tmp / 'plain.json'
+        bookmarks_file.write_text(json.dumps({'gh': {'description': 'GitHub', 'url': 'https://github.com'}}))
+        call_command('load_bookmarks', file=str(bookmarks_file), stdout=StringIO())
+        self.assertIsNone(snapshot.get_snapshot().revision)
+        self.assertFalse(BookmarkRevision.objects.exists())
+    
+    def test_edits_after_a_git_load_start_a_new_generation(self):
+        """An edit outside git changes suggestions and ETags although the recorded commit stays the same"""
+        self.bookmarks['gh']['cache'] = 3600
+        head = self.commit()
+        call_command('watch_bookmarks', git=str(self.repo), once=True, stdout=StringIO())
+        self.assertEqual(snapshot.get_snapshot().revision, head)
+        before = self.client.get('/api/suggestions/', {'q': 'g'}).json()
+        etag = self.client.get('/search/', {'q': 'gh'})['ETag']
+        
+        bookmark = Bookmark.objects.get(key='gh')
+        bookmark.description = 'GitHub (edited)'
+        bookmark.url = 'https://github.com/edited'
+        bookmark.save()
+        
+        self.assertEqual(snapshot.get_snapshot().revision, head)
+        after = self.client.get('/api/suggestions/', {'q': 'g'}).json()
+        self.assertNotEqual(after, before)
+        self.assertEqual(after[2], ['GitHub (edited)'])
+        response = self.client.get('/search/', {'q': 'gh'}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 302)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response['Location'], 'https://github.com/edited')
+        # The fast path answers from the same generation
+        captured = {}
+        app = FastPathWSGI(lambda environ, start_response: [])
+        environ = RequestFactory().get('/gh/', HTTP_IF_NONE_MATCH=etag).environ
+        app(environ, lambda status, headers: captured.update(headers, status=status))
+        self.assertEqual(captured['status'], '302 Found')
+        self.assertEqual(captured['ETag'], response['ETag'])
+
+class ReloadInstrumentationTests(TestCase):
+    """Tests for the phase timings of bookmark reloads"""
+    
+    def setUp(self):
+        snapshot.invalidate()
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.tmp = Path(tmp_dir.name)
+        settings_override = override_settings(BUNNIFY_SNAPSHOT_FILE=self.tmp / 'snapshot.json')
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.bookmarks_file = self.tmp / 'bunnify.json'
+        self.bookmarks_file.write_text(json.dumps({
+            'gh': {'description': 'GitHub', 'url': 'https://github.com', 'aliases': ['github']},
+            'c': {'description': 'Calendar', 'url': 'https://calendar.google.com'},
+        }))
+    
+    def test_profile_prints_phase_breakdown(self):
+        """load_bookmarks --profile prints every phase of the reload with its share of the total"""
+        out = StringIO()
+        call_command('load_bookmarks', file=str(self.bookmarks_file), profile=True, stdout=out)
+        output = out.getvalue()
+        for name in ('read', 'parse', 'validate', 'flatten', 'diff', 'write', 'publish'):
+            self.assertRegex(output, rf'\n\s*{name}\s+\d+\.\d ms\s+\d+\.\d%')
+        self.assertIn('bookmarks', output)
+        self.assertEqual(reloads.last['counts']['changed_rows'], 3)  # gh, its alias github, and c
+    
+    def test_history_is_served_by_metrics_and_trimmed(self):
+        """Finished reloads land in the JSON Lines history, which /api/metrics/ serves and keeps bounded"""
+        call_command('load_bookmarks', file=str(self.bookmarks_file), stdout=StringIO())
+        self.assertEqual(self.client.get('/gh/').status_code, 302)
+        metrics = self.client.get('/api/metrics/').json()['reloads']
+        self.assertEqual(len(metrics['recent']), 1)
+        recent = metrics['recent'][0]
+        self.assertEqual(recent['source'], 'file')
+        self.assertEqual(recent['counts']['bookmarks'], 3)
+        self.assertEqual(list(recent['phases_ms'])[:3], ['read', 'parse', 'validate'])
+        self.assertGreaterEqual(metrics['server']['snapshot_rebuild']['count'], 1)
+        
+        with override_settings(BUNNIFY_RELOAD_HISTORY=2):
+            for _ in range(5):
+                call_command('load_bookmarks', file=str(self.bookmarks_file), stdout=StringIO())
+            self.assertLessEqual(len(reloads.history_file().read_text().splitlines()), 4)
+            self.assertEqual(len(reloads.recent_reloads()), 2)
+    
+    def test_rejected_reload_is_not_recorded(self):
+        """A file that fails validation leaves no history entry; phases outside a reload are no-ops"""
+        with reloads.phase('write'):
+            reloads.count('changed_rows', 1)
+        self.bookmarks_file.write_text(json.dumps({'gh': {'description': 'GitHub'}}))
+        out = StringIO()
+        call_command('load_bookmarks', file=str(self.bookmarks_file), profile=True, stdout=out)
+        self.assertIn('Schema validation failed', out.getvalue())
+        self.assertNotIn('Reload phases', out.getvalue())
+        self.assertEqual(reloads.recent_reloads(), [])
+
+
+class BookmarkListingTests(TestCase):
+    """Tests for the paginated /list/ page and /api/bookmarks/"""
+    
+    def setUp(self):
+        snapshot.invalidate()
+        cache.clear()
+        for key, description, url in [
+            ('a', 'Alpha', 'https://a.example.com'),
+            ('b', 'Bravo', 'https://b.example.com/#{ticket}'),
+            ('c', 'Charlie', 'https://c.example.com'),
+            ('d', 'Delta docs', 'https://d.example.com'),
+            ('e', 'Echo', 'https://e.example.com/search?q=#{query}'),
+        ]:
+            Bookmark.objects.create(key=key, description=description, url=url)
+    
+    def test_cursor_pages_cover_every_bookmark_once(self):
+        """Following ``next`` returns each bookmark exactly once, in key order"""
+        keys = []
+        after = ''
+        while after is not None:
+            data = self.client.get('/api/bookmarks/', {'limit': 2, 'after': after}).json()
+            self.assertLessEqual(len(data['bookmarks']), 2)
+            keys += [bookmark['key'] for bookmark in data['bookmarks']]
+            after = data['next']
+        self.assertEqual(keys, ['a', 'b', 'c', 'd', 'e'])
+        self.assertEqual(data['total'], 5)
+        self.assertEqual(self.client.get('/api/bookmarks/', {'limit': 'all'}).status_code, 400)
+    
+    def test_server_side_filter(self):
+        """Every word of q must appear in the key, description, a parameter name or the URL"""
+        def keys(**params):
+            return [bookmark['key'] for bookmark in self.client.get('/api/bookmarks/', params).json()['bookmarks']]
+        self.assertEqual(keys(q='delta'), ['d'])
+        self.assertEqual(keys(q='TICKET'), ['b'])
+        self.assertEqual(keys(q='example search'), ['e'])
+        self.assertEqual(keys(q='example', limit=1, after='b'), ['c'])
+        self.assertEqual(keys(q='nothing'), [])
+        
+        Bookmark.objects.create(key='c', description='My Charlie', url='https://mine.example.com', namespace='alice')
+        snapshot.invalidate()
+        data = self.client.get('/api/bookmarks/', {'q': 'charlie', 'ns': 'alice'}).json()
+        self.assertEqual([(b['description'], b['personal']) for b in data['bookmarks']], [('My Charlie', True)])
+    
+    def test_list_renders_one_page_in_a_cached_shell(self):
+        """/list/ renders only the first page; the shell is rendered once per generation"""
+        with override_settings(BUNNIFY_LIST_PAGE_SIZE=2), patch.object(listing, 'render_to_string', wraps=listing.render_to_string) as render:
+            for _ in range(3):
+                content = self.client.get('/list/').content.decode()
+            self.assertEqual(render.call_count, 1)
+            self.assertIn('All Bookmarks (5)', content)
+            self.assertEqual(content.count('class="bookmark-card"'), 2)
+            self.assertIn('Bravo', content)
+            self.assertNotIn('Charlie', content)
+            
+            Bookmark.objects.create(key='f', description='Foxtrot', url='https://f.example.com')
+            snapshot.invalidate()
+            self.assertContains(self.client.get('/list/'), 'All Bookmarks (6)')
+            self.assertEqual(render.call_count, 2)
+
+
+PNG_ICON = b'\x89PNG\r\n\x1a\n' + b'\x00' * 40
+ICO_ICON = b'\x00\x00\x01\x00' + b'\x01' * 60
+
+
+class StubSiteHandler(BaseHTTPRequestHandler):
+    """Local HTTP server standing in for bookmark hosts: 127.0.0.1 declares its icon, localhost does not"""
+    protocol_version = 'HTTP/1.1'
+    
+    def do_GET(self):
+        host = self.headers['Host'].split(':')[0]
+        with self.server.stats_lock:
+            self.server.requests.append((host, self.path))
+        if self.path == '/' and host == '127.0.0.1':
+            status, content_type = 200, 'text/html; charset=utf-8'
+            body = b'<html><head><title>\n  Stub &amp; Site </title><link rel="shortcut icon" href="/static/icon.png"></head></html>'
+        elif self.path == '/':
+            status, content_type, body = 200, 'text/html', b'<html><head><title>Local</title></head></html>'
+        elif self.path == '/static/icon.png':
+            status, content_type, body = 200, 'image/png', PNG_ICON
+        elif self.path == '/favicon.ico':
+            status, content_type, body = 200, 'application/octet-stream', ICO_ICON
+        else:
+            status, content_type, body = 404, 'text/plain', b'not found'
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def log_message(self, format, *args):
+        pass
+
+
+class SiteIconTests(TestCase):
+    """Tests for the site icon and title fetcher and /api/sites/"""
+    
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = StubLinkServer(('127.0.0.1', 0), StubSiteHandler)
+        cls.server.stats_lock = threading.Lock()
+        cls.port = cls.server.server_address[1]
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+    
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+    
+    def setUp(self):
+        self.server.requests = []
+        for key, url in [
+            ('a', f'http://127.0.0.1:{self.port}/a/#{{id}}'),
+            ('b', f'http://127.0.0.1:{self.port}/b'),
+            ('c', f'http://localhost:{self.port}/c'),
+            ('chrome', 'chrome://settings'),
+            ('any', 'https://#{host}/'),
+        ]:
+            Bookmark.objects.create(key=key, description=key, url=url)
+    
+    def test_each_host_is_fetched_once(self):
+        """Bookmarks of one host share one fetch; declared icons win over /favicon.ico"""
+        call_command('fetch_sites', stdout=StringIO())
+        pages = sorted(request for request in self.server.requests if request[1] == '/')
+        self.assertEqual(pages, [('127.0.0.1', '/'), ('localhost', '/')])
+        
+        stub = SiteIcon.objects.get(origin=f'http://127.0.0.1:{self.port}')
+        self.assertEqual((stub.title, bytes(stub.icon), stub.icon_type), ('Stub & Site', PNG_ICON, 'image/png'))
+        local = SiteIcon.objects.get(origin=f'http://localhost:{self.port}')
+        self.assertEqual((local.title, bytes(local.icon), local.icon_type), ('Local', ICO_ICON, 'image/x-icon'))
+        self.assertEqual(SiteIcon.objects.count(), 2)
+        
+        # Fresh results are reused until BUNNIFY_SITE_TTL passes
+        requests = len(self.server.requests)
+        call_command('fetch_sites', stdout=StringIO())
+        self.assertEqual(len(self.server.requests), requests)
+        with override_settings(BUNNIFY_SITE_TTL=0):
+            call_command('fetch_sites', stdout=StringIO())
+        self.assertGreater(len(self.server.requests), requests)
+    
+    def test_sites_map_is_one_revalidated_request(self):
+        """/api/sites/ maps origins to titles and data URIs; its ETag changes only with new results"""
+        call_command('fetch_sites', stdout=StringIO())
+        response = self.client.get('/api/sites/')
+        site = response.json()['sites'][f'http://127.0.0.1:{self.port}']
+        self.assertEqual(site['title'], 'Stub & Site')
+        self.assertTrue(site['icon'].startswith('data:image/png;base64,'))
+        etag = response['ETag']
+        self.assertEqual(self.client.get('/api/sites/', headers={'If-None-Match': etag}).status_code, 304)
+        
+        call_command('fetch_sites', force=True, stdout=StringIO())
+        self.assertEqual(self.client.get('/api/sites/', headers={'If-None-Match': etag}).status_code, 200)
+        self.assertContains(self.client.get('/list/'), "fetch('/api/sites/')")
+    
+    def test_size_bounds_and_removed_hosts(self):
+        """Oversized icons are skipped, icons beyond the cache budget evicted, unused hosts forgotten"""
+        with override_settings(BUNNIFY_SITE_ICON_MAX_BYTES=50):
+            call_command('fetch_sites', stdout=StringIO())
+        local = SiteIcon.objects.get(origin=f'http://localhost:{self.port}')
+        self.assertEqual(bytes(local.icon), b'')
+        self.assertIn('larger than 50 bytes', local.error)
+        self.assertEqual(local.title, 'Local')
+        
+        out = StringIO()
+        with override_settings(BUNNIFY_SITE_CACHE_MAX_BYTES=len(ICO_ICON)):
+            call_command('fetch_sites', force=True, stdout=out)
+        self.assertIn('1 icons evicted', out.getvalue())
+        self.assertEqual(sum(1 for site in SiteIcon.objects.all() if site.icon), 1)
+        
+        Bookmark.objects.filter(key='c').delete()
+        with override_settings(BUNNIFY_SITE_TTL=0):
+            call_command('fetch_sites', stdout=StringIO())
+        self.assertEqual(list(SiteIcon.objects.values_list('origin', flat=True)), [f'http://127.0.0.1:{self.port}'])
+    
+    def test_only_plain_image_types_reach_data_uris(self):
+        """Declared types other than image/<name> are dropped or sniffed, and stored ones are checked again"""
+        self.assertEqual(sites.image_type('image/svg+xml; charset=utf-8', b'<svg '), 'image/svg+xml')
+        self.assertEqual(sites.image_type('image/png"><script>alert(1)</script>', PNG_ICON), 'image/png')
+        self.assertIsNone(sites.image_type('image/png" onerror="alert(1)', b'not an image'))
+        self.assertIsNone(sites.image_type('image/', b'not an image'))
+        self.assertIsNone(sites.image_type('text/html', b'<html>'))
+        
+        SiteIcon.objects.create(
+            origin=f'http://127.0.0.1:{self.port}', title='Old', icon=PNG_ICON, icon_type='image/a"b', fetched_at=timezone.now()
+        )
+        site = self.client.get('/api/sites/').json()['sites'][f'http://127.0.0.1:{self.port}']
+        self.assertEqual(site, {'title': 'Old', 'icon': None})
+
+
+class ExportRedirectsTests(TestCase):
+    """Tests for the static redirect artifacts of export_redirects"""
+    
+    def setUp(self):
+        snapshot.invalidate()
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.tmp = Path(tmp_dir.name)
+        settings_override = override_settings(BUNNIFY_SNAPSHOT_FILE=self.tmp / 'snapshot.json')
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.bookmarks = {
+            'gh': {'description': 'GitHub', 'url': 'https://github.com/"quoted"&<b>'},
+            'c': {'description': 'Calendar', 'url': 'https://calendar.google.com'},
+            'g': {'description': 'Google', 'url': 'https://www.google.com/search?q=#{query}&hl=en', 'defaults': {'query': 'bunnify'}},
+            'repo': {'description': 'Repository', 'url': 'https://github.com/#{repo}'},
+            'pr': {'description': 'Pull request', 'url': 'https://github.com/#{repo}/pull/#{pr}'},
+            'flags': {'description': 'Flags', 'url': 'chrome://flags'},
+        }
+        self.bookmarks_file = self.tmp / 'bunnify.json'
+        self.bookmarks_file.write_text(json.dumps(self.bookmarks))
+        call_command('load_bookmarks', file=str(self.bookmarks_file), stdout=StringIO())
+    
+    def test_artifacts(self):
+        """Fixed redirects and query-string prefixes go to nginx; pages per fixed key; everything in JSON"""
+        out = StringIO()
+        call_command('export_redirects', output=str(self.tmp / 'out'), stdout=out)
+        self.assertIn('Exported 2 fixed redirects and 2 prefixes', out.getvalue())
+        
+        nginx = (self.tmp / 'out' / 'redirects.map').read_text()
+        self.assertIn('":/c/" "https://calendar.google.com";', nginx)
+        self.assertIn('"g" "https://www.google.com/search?q=bunnify&hl=en";', nginx)
+        self.assertIn('"g+" "https://www.google.com/search?q=$bunnify_value&hl=en";', nginx)
+        self.assertNotIn('quoted', nginx)  # The quote would end the map value
+        self.assertNotIn('"repo+"', nginx)  # A path value would stay URL-encoded
+        
+        # The query map's regexes split /search/?q= as the resolver does
+        patterns = re.findall(r'"~(.+)" "\$bunnify_key(\+?)";', nginx)
+        def classify(arg_q):
+            for pattern, suffix in patterns:
+                match = re.match(pattern.replace('(?<', '(?P<'), f':{arg_q}')
+                if match:
+                    return match['bunnify_key'] + suffix, match.groupdict().get('bunnify_value')
+            return None
+        self.assertEqual(classify('c'), ('c', None))
+        self.assertEqual(classify('g+'), ('g', None))
+        self.assertEqual(classify('g+django+tutorial'), ('g+', 'django+tutorial'))
+        self.assertEqual(classify('g%20%20c%2B%2B'), ('g+', 'c%2B%2B'))
+        self.assertIsNone(classify('+g+django'))
+        
+        data = json.loads((self.tmp / 'out' / 'redirects.json').read_text())
+        self.assertEqual(set(data['redirects']), {'c', 'gh'})
+        self.assertEqual(data['prefixes']['repo'], {'prefix': 'https://github.com/', 'suffix': '', 'default': None})
+        page = (self.tmp / 'out' / 'html' / 'gh' / 'index.html').read_text()
+        self.assertIn('content="0; url=https://github.com/&quot;quoted&quot;&amp;&lt;b&gt;"', page)
+        self.assertIn('location.replace("https://github.com/\\"quoted\\"&\\u003cb>")', page)
+        self.assertEqual(sorted(path.name for path in (self.tmp / 'out' / 'html').iterdir()), ['c', 'gh'])
+    
+    def test_reloads_regenerate_changed_artifacts(self):
+        """With BUNNIFY_EXPORT_DIR set, each reload rewrites what changed and removes stale pages"""
+        export_dir = self.tmp / 'export'
+        with override_settings(BUNNIFY_EXPORT_DIR=str(export_dir)):
+            call_command('load_bookmarks', file=str(self.bookmarks_file), stdout=StringIO())
+            self.assertIn('export', reloads.last['phases_ms'])
+            page = export_dir / 'html' / 'c' / 'index.html'
+            mtime = page.stat().st_mtime_ns
+            
+            del self.bookmarks['gh']
+            self.bookmarks['c']['url'] = 'https://calendar.example.com'
+            self.bookmarks['d'] = {'description': 'Docs', 'url': 'https://docs.example.com'}
+            self.bookmarks_file.write_text(json.dumps(self.bookmarks))
+            call_command('load_bookmarks', file=str(self.bookmarks_file), stdout=StringIO())
+        self.assertEqual(sorted(path.name for path in (export_dir / 'html').iterdir()), ['c', 'd'])
+        self.assertIn('calendar.example.com', page.read_text())
+        self.assertEqual(json.loads((export_dir / 'redirects.json').read_text())['generation'], snapshot.get_snapshot().generation)
+        
+        # Unchanged artifacts keep their mtime
+        mtime = page.stat().st_mtime_ns
+        with override_settings(BUNNIFY_EXPORT_DIR=str(export_dir)):
+            call_command('load_bookmarks', file=str(self.bookmarks_file), stdout=StringIO())
+        self.assertEqual(page.stat().st_mtime_ns, mtime)
+    
+    def test_output_and_formats(self):
+        """--format limits the artifacts; without an output directory the command fails"""
+        call_command('export_redirects', output=str(self.tmp / 'json'), formats=['json'], stdout=StringIO())
+        self.assertEqual([path.name for path in (self.tmp / 'json').iterdir()], ['redirects.json'])
+        with self.assertRaises(CommandError):
+            call_command('export_redirects', stdout=StringIO())
+
+
+REPLAY_LOG = """\
+[2026-10-01 12:00:00] [INFO] [PID:7] [bookmarks.fastpath:answer:123] Search redirect request: query='g it's 100% c++'
+[2026-10-01 12:00:00] [INFO] [PID:7] [bookmarks.fastpath:answer:160] Redirecting to: https://www.google.com/search?q=it's 100% c++
+[2026-10-01 12:00:00] [INFO] [PID:7] [bookmarks.fastpath:answer:133] Direct bookmark redirect request: key='gh'
+[2026-10-01 12:00:01] [INFO] [PID:7] [bookmarks.fastpath:answer:123] Search redirect request: query='flags'
+[2026-10-01 12:00:01] [INFO] [PID:8] [bookmarks.views:list_bookmarks:205] List bookmarks request
+[2026-10-01 12:00:01] [INFO] [PID:7] [bookmarks.views:search_redirect:99] Search redirect request: query='flags'
+[2026-10-01 12:00:03] [INFO] [PID:7] [bookmarks.views:search_redirect:99] Search redirect request: query='missing'
+[2026-10-01 12:00:03] [INFO] Command palette request
+not a log line
+"""
+
+
+class ReplayStubHandler(BaseHTTPRequestHandler):
+    """Answers every request with a redirect and records (connection, path)"""
+    protocol_version = 'HTTP/1.1'
+    
+    def do_GET(self):
+        with self.server.stats_lock:
+            self.server.requests.append((self.client_address[1], self.path))
+        self.send_response(302)
+        self.send_header('Location', 'https://example.com/')
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+    
+    def log_message(self, format, *args):
+        pass
+
+
+class LogReplayTests(TransactionTestCase):
+    """Tests for replaying the bunnify log (replay_log); the worker threads need committed data"""
+    
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.log = Path(tmp_dir.name) / 'bunnify.log'
+        self.log.write_text(REPLAY_LOG)
+    
+    def test_trace_from_log(self):
+        """Requests are parsed in order, fall-through duplicates dropped, and same-second requests spread out"""
+        trace = replay.read_trace([self.log])
+        self.assertEqual(
+            [(entry.endpoint, entry.path) for entry in trace],
+            [
+                ('search', "/search/?q=g+it%27s+100%25+c%2B%2B"),
+                ('redirect', '/gh/'),
+                ('search', '/search/?q=flags'),
+                ('list', '/list/'),
+                ('search', '/search/?q=missing'),
+                ('cmd', '/cmd/'),
+            ],
+        )
+        self.assertEqual(replay.schedule(trace, 2), [0.0, 0.25, 0.5, 0.75, 1.5, 1.75])
+        self.assertEqual(replay.schedule(trace, 0), [0.0] * 6)
+        self.assertEqual([entry.endpoint for entry in replay.read_trace([self.log], ['cmd', 'list'])], ['list', 'cmd'])
+    
+    def test_replay_in_process(self):
+        """Without --url the trace goes through the test client, with statistics per endpoint"""
+        Bookmark.objects.create(key='g', description='Google', url='https://www.google.com/search?q=#{query}')
+        Bookmark.objects.create(key='gh', description='GitHub', url='https://github.com')
+        Bookmark.objects.create(key='flags', description='Flags', url='chrome://flags')
+        snapshot.invalidate()
+        out = StringIO()
+        call_command('replay_log', log=[str(self.log)], concurrency=2, json=True, stdout=out)
+        result = json.loads(out.getvalue())
+        self.assertEqual(result['total']['requests'], 6)
+        self.assertEqual(result['total']['errors'], 0)
+        self.assertEqual(result['endpoints']['search']['statuses'], {'200': 1, '302': 1, '404': 1})
+        self.assertEqual(result['endpoints']['redirect']['statuses'], {'302': 1})
+        self.assertGreater(result['endpoints']['list']['p50_ms'], 0)
+        
+        with self.assertRaises(CommandError):
+            call_command('replay_log', log=[str(self.log)], endpoints=['cmd'], limit=0, url='ftp://example.com', stdout=StringIO())
+    
+    def test_replay_against_running_instance(self):
+        """--url sends the trace over keep-alive connections at the requested pace"""
+        server = StubLinkServer(('127.0.0.1', 0), ReplayStubHandler)
+        server.stats_lock = threading.Lock()
+        server.requests = []
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        
+        start = time.perf_counter()
+        out = StringIO()
+        call_command(
+            'replay_log', log=[str(self.log)], url=f'http://127.0.0.1:{server.server_address[1]}',
+            concurrency=1, speedup=4, stdout=out,
+        )
+        self.assertGreaterEqual(time.perf_counter() - start, 3.5 / 4)  # 12:00:00.5 to 12:00:03.5, 4x faster
+        self.assertEqual(len(server.requests), 6)
+        self.assertEqual(len({port for port, _ in server.requests}), 1)
+        self.assertEqual(server.requests[0][1], '/search/?q=g+it%27s+100%25+c%2B%2B')
+        self.assertRegex(out.getvalue(), r'search\s+3 ')
+        self.assertIn('Replay finished without errors', out.getvalue())
+
+
+class SharedCacheTests(TestCase):
+    """Tests for the SQLite cache shared by worker processes"""
+    
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.cache_file = Path(tmp_dir.name) / 'cache.sqlite3'
+        settings_override = override_settings(CACHES={'default': {
+            'BACKEND': 'bookmarks.sharedcache.SQLiteCache',
+            'LOCATION': str(self.cache_file),
+            'OPTIONS': {'MAX_BYTES': 4096},
+        }})
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        sharedcache._latest.clear()
+        self.addCleanup(sharedcache._latest.clear)
+    
+    def test_suite_never_uses_the_real_cache_file(self):
+        """The test runner points the cache, and subprocesses, at a temporary file"""
+        real = settings.BASE_DIR / 'bunnify.cache.sqlite3'
+        self.assertNotEqual(settings.BUNNIFY_CACHE_FILE, real)
+        self.assertEqual(os.environ['BUNNIFY_CACHE_FILE'], str(settings.BUNNIFY_CACHE_FILE))
+    
+    def test_backend(self):
+        """Django cache semantics, eviction of the oldest entries beyond MAX_BYTES, errors as misses"""
+        backend = sharedcache.SQLiteCache(str(self.cache_file), {'OPTIONS': {'MAX_BYTES': 4096}})
+        backend.set('a', {'value': 1})
+        self.assertEqual(backend.get('a'), {'value': 1})
+        self.assertFalse(backend.add('a', 2))
+        self.assertTrue(backend.add('b', 2, timeout=-1))  # Already expired
+        self.assertIsNone(backend.get('b'))
+        self.assertTrue(backend.add('b', 3))
+        self.assertTrue(backend.touch('b', timeout=None))
+        self.assertTrue(backend.delete('b'))
+        self.assertFalse(backend.has_key('b'))
+        
+        for n in range(6):
+            backend.set(f'big{n}', b'x' * 1000, timeout=None)
+        self.assertLessEqual(backend.stats()['bytes'], 4096)
+        self.assertIsNone(backend.get('a'))
+        self.assertIsNone(backend.get('big0'))
+        self.assertEqual(backend.get('big5'), b'x' * 1000)
+        backend.set('huge', b'x' * 5000)
+        self.assertIsNone(backend.get('huge'))
+        
+        broken = sharedcache.SQLiteCache(str(Path(self.cache_file.parent)), {})  # A directory, not a file
+        with self.assertLogs('bookmarks.sharedcache', 'WARNING'):
+            broken.set('a', 1)
+            self.assertEqual(broken.get('a', 'default'), 'default')
+    
+    def test_result_shared_across_processes(self):
+        """A result computed by one process is served to another without recomputing it"""
+        self.assertEqual(sharedcache.generation_cached('cmd', 'g1', lambda: '[1, 2]'), '[1, 2]')
+        self.assertEqual(sharedcache.generation_cached('cmd', 'g1', lambda: self.fail('recomputed')), '[1, 2]')
+        
+        code = (
+            "from bookmarks.sharedcache import generation_cached\n"
+            "def fail(): raise SystemExit('recomputed')\n"
+            "print(generation_cached('cmd', 'g1', fail))\n"
+            "print(generation_cached('cmd', 'g2', lambda: 'g2 built'))"
+        )
+        result = subprocess.run(
+            [sys.executable, str(settings.BASE_DIR / 'manage.py'), 'shell', '-c', code],
+            capture_output=True,
+            text=True,
+            env={**os.environ, 'BUNNIFY_CACHE_FILE': str(self.cache_file)},
+            timeout=120,
+        )
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertEqual(result.stdout.splitlines()[-2:], ['[1, 2]', 'g2 built'])
+        sharedcache._latest.clear()
+        self.assertEqual(sharedcache.generation_cached('cmd', 'g2', lambda: self.fail('recomputed')), 'g2 built')
+    
+    def test_results_keyed_by_release(self):
+        """A new release recomputes results of the current generation; the default release follows the code"""
+        sharedcache.code_version.cache_clear()
+        self.addCleanup(sharedcache.code_version.cache_clear)
+        self.assertRegex(sharedcache.code_version(), r'^[0-9a-f]{12}$')
+        with override_settings(BUNNIFY_RELEASE='r1'):
+            sharedcache.code_version.cache_clear()
+            self.assertEqual(sharedcache.generation_cached('list-shell', 'g1', lambda: 'old page'), 'old page')
+        sharedcache._latest.clear()
+        with override_settings(BUNNIFY_RELEASE='r2'):
+            sharedcache.code_version.cache_clear()
+            self.assertEqual(sharedcache.generation_cached('list-shell', 'g1', lambda: 'new page'), 'new page')
+    
+    def test_views_keyed_by_generation(self):
+        """/cmd/ and /api/status/ are computed once per generation and follow reloads"""
+        Bookmark.objects.create(key='gh', description='GitHub', url='https://github.com')
+        snapshot.invalidate()
+        before = sharedcache.stats.as_dict().get('status', {'hits': 0, 'misses': 0})
+        first = self.client.get('/api/status/').json()
+        self.assertEqual(self.client.get('/api/status/').json(), first)
+        after = self.client.get('/api/metrics/').json()['shared_cache']
+        self.assertEqual(after['backend'], 'SQLiteCache')
+        self.assertEqual(after['results']['status']['misses'], before['misses'] + 1)
+        self.assertEqual(after['results']['status']['hits'], before['hits'] + 1)
+        self.assertIn(b'"key": "gh"', self.client.get('/cmd/').content)
+        
+        Bookmark.objects.create(key='c', description='Calendar', url='https://calendar.google.com')
+        snapshot.invalidate()
+        self.assertEqual(self.client.get('/api/status/').json()['count'], first['count'] + 1)
+        self.assertIn(b'"key": "c"', self.client.get('/cmd/').content)
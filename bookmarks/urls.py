@@ -11,8 +11,15 @@ urlpatterns = [
     path('opensearch.xml', views.opensearch, name='opensearch'),
     path('search/', views.search_redirect, name='search'),
     path('api/status/', views.bookmark_status, name='status'),
+    path('api/bookmarks/', views.bookmarks_page, name='bookmarks'),
+    path('api/sites/', views.site_icons, name='sites'),
     path('api/suggestions/', views.search_suggestions, name='suggestions'),
     path('api/history/', views.command_history, name='history'),
+    path('api/resolve/', views.resolve_batch, name='resolve'),
+    path('api/metrics/', views.metrics, name='metrics'),
+    path('api/snapshot/', views.snapshot_replication, name='snapshot'),
+    path('api/reviews/<str:job_id>/', views.review_status, name='review_status'),
     path('review-pr/', views.request_copilot_review, name='review_pr'),
+    path('review-pr/<str:job_id>/', views.review_progress, name='review_progress'),
     path('<str:key>/', views.redirect_bookmark, name='redirect'),
 ]
@@ -0,0 +1,170 @@
+"""
+Read-only validation of bunnify.json bookmark files.
+
+Shared by ``load_bookmarks`` (schema and reserved keys) and ``check_bookmarks``,
+which validates many files across a process pool. Like the resolver, this
+module has no Django imports, so pool workers start quickly.
+"""
+from __future__ import annotations
+
+import json
+import re
+from pathlib import Path
+from typing import Any
+from urllib.parse import urlsplit
+
+from jsonschema import Draft7Validator
+
+from .aliases import AliasError, flatten_bookmarks
+from .resolver import BROWSER_PROTOCOLS, HELP_KEYS, PLACEHOLDER_PATTERN
+
+# JSON schema of a bookmarks file
+BOOKMARKS_SCHEMA = {
+    "type": "object",
+    "patternProperties": {
+        "^[a-zA-Z0-9_]+$": {
+            "type": "object",
+            "properties": {
+                "description": {"type": "string"},
+                "url": {"type": "string"},
+                "old-url": {"type": "string"},
+                "oldurl": {"type": "string"},
+                "defaults": {"type": "object", "additionalProperties": {"type": "string"}},
+                "cache": {"type": "integer", "minimum": 0},
+                "extends": {"type": "string", "pattern": "^[a-zA-Z0-9_]+$"},
+                "aliases": {
+                    "type": "array",
+                    "items": {"type": "string", "pattern": "^[a-zA-Z0-9_]+$"},
+                    "uniqueItems": True
+                }
+            },
+            # Chained bookmarks inherit the description and url of the bookmark they extend
+            "if": {"not": {"required": ["extends"]}},
+            "then": {"required": ["description", "url"]}
+        }
+    }
+}
+
+# Keys the schema validates; other keys are loaded without validation
+KEY_PATTERN = re.compile(r'^[a-zA-Z0-9_]+$')
+
+# Keys that show the bookmark list instead of redirecting
+RESERVED_KEYWORDS = list(HELP_KEYS)
+
+# Anything that starts like a placeholder; those not matching PLACEHOLDER_PATTERN are malformed
+PLACEHOLDER_START = re.compile(r'#\{[^}]*\}?')
+
+_validator = Draft7Validator(BOOKMARKS_SCHEMA)
+
+
+def schema_errors(data: Any) -> list[tuple[str | None, str]]:
+    """Every schema violation of a parsed bookmarks file, as (bookmark key, message)"""
+    errors = []
+    for error in sorted(_validator.iter_errors(data), key=lambda e: [str(part) for part in e.path]):
+        path = [str(part) for part in error.path]
+        location = '/'.join(path[1:])
+        errors.append((path[0] if path else None, f"{location}: {error.message}" if location else error.message))
+    return errors
+
+
+def _issue(code: str, message: str, key: str | None = None) -> dict[str, Any]:
+    issue: dict[str, Any] = {'code': code, 'message': message}
+    if key is not None:
+        issue['key'] = key
+    return issue
+
+
+def url_problem(url: str) -> str | None:
+    """Why a bookmark URL (with placeholders) is malformed, or None if it is fine"""
+    for match in PLACEHOLDER_START.finditer(url):
+        if not PLACEHOLDER_PATTERN.fullmatch(match.group()):
+            return f"malformed placeholder '{match.group()}'"
+    if url.startswith(BROWSER_PROTOCOLS):
+        return None
+    # Validate the URL as it would look with every placeholder filled in
+    try:
+        parts = urlsplit(PLACEHOLDER_PATTERN.sub('x', url))
+    except ValueError as e:
+        return str(e)
+    if parts.scheme not in ('http', 'https'):
+        return f"unsupported scheme '{parts.scheme}'" if parts.scheme else 'missing scheme'
+    if not parts.netloc:
+        return 'missing host'
+    if any(c.isspace() for c in url):
+        return 'contains whitespace'
+    return None
+
+
+def check_entry(key: str, entry: dict[str, Any]) -> tuple[list[dict[str, Any]], list[dict[str, Any]]]:
+    """(errors, warnings) of one schema-valid bookmark"""
+    errors = []
+    warnings = []
+    if key in RESERVED_KEYWORDS:
+        errors.append(_issue('reserved_key', f"'{key}' is reserved ({', '.join(RESERVED_KEYWORDS)})", key))
+
+    url = entry['url']
+    problem = url_problem(url)
+    if problem:
+        errors.append(_issue('malformed_url', f"url: {problem}", key))
+    old_url = entry.get('old-url') or entry.get('oldurl')
+    if old_url and url_problem(old_url):
+        warnings.append(_issue('malformed_url', f"old-url: {url_problem(old_url)}", key))
+
+    placeholders = PLACEHOLDER_PATTERN.findall(url)
+    defaults = entry.get('defaults') or {}
+    for name in defaults:
+        if name not in placeholders:
+            errors.append(_issue('unknown_default', f"default for '{name}', which is not a placeholder of the url", key))
+    if len(set(placeholders)) != len(placeholders):
+        warnings.append(_issue('repeated_placeholder', "url repeats a placeholder", key))
+    if 'cache' in entry and placeholders:
+        warnings.append(_issue('cache_ignored', "cache has no effect on parameterized bookmarks", key))
+    return errors, warnings
+
+
+def check_file(path: str) -> dict[str, Any]:
+    """
+    Validate one bookmarks file without touching the database.
+    Returns {"path", "keys", "errors", "warnings"}.
+    """
+    report: dict[str, Any] = {'path': path, 'keys': [], 'errors': [], 'warnings': []}
+    try:
+        data = json.loads(Path(path).read_text(encoding='utf-8'))
+    except OSError as e:
+        report['errors'].append(_issue('unreadable', f"Cannot read file: {e.strerror or e}"))
+        return report
+    except (json.JSONDecodeError, UnicodeDecodeError) as e:
+        report['errors'].append(_issue('invalid_json', f"Invalid JSON format: {e}"))
+        return report
+
+    report['errors'].extend(_issue('schema', message, key) for key, message in schema_errors(data))
+    if not isinstance(data, dict):
+        return report
+
+    # Check the bookmarks as they will be loaded, with aliases and chains flattened
+    entries = data
+    if not report['errors']:
+        try:
+            entries = flatten_bookmarks(data)
+        except AliasError as e:
+            report['errors'].append(_issue(e.code, e.message, e.key))
+
+    report['keys'] = list(entries)
+    for key, entry in entries.items():
+        if not KEY_PATTERN.match(key):
+            report['warnings'].append(_issue('unvalidated_key', "key is not [a-zA-Z0-9_]+, so the schema does not check it", key))
+        if not isinstance(entry, dict) or not isinstance(entry.get('url'), str):
+            continue  # Already reported by the schema or chain errors
+        errors, warnings = check_entry(key, entry)
+        report['errors'].extend(errors)
+        report['warnings'].extend(warnings)
+    return report
+
+
+def key_collisions(reports: list[dict[str, Any]]) -> dict[str, list[str]]:
+    """Keys defined by more than one file, with the files that define them"""
+    files_by_key: dict[str, list[str]] = {}
+    for report in reports:
+        for key in report['keys']:
+            files_by_key.setdefault(key, []).append(report['path'])
+    return {key: paths for key, paths in sorted(files_by_key.items()) if len(paths) > 1}
@@ -4,22 +4,61 @@ import hashlib
 import json
 import logging
 import re
+from pathlib import Path
 from typing import TYPE_CHECKING
 
-from django.core.cache import cache
-from django.db import models
+from django.conf import settings
+from django.db.models import Count, Max
 from django.http import (
     HttpResponse,
     HttpResponseNotFound,
+    HttpResponseNotModified,
     HttpResponseRedirect,
     JsonResponse,
     StreamingHttpResponse,
 )
 from django.shortcuts import redirect, render
+from django.template.loader import render_to_string
 from django.views.decorators.cache import never_cache
+from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 
-from .models import Bookmark
+from .history import metrics as history_metrics
+from .history import record as record_parameters
+from .history import record_query, record_search
+from .listing import MAX_PAGE_SIZE, get_listing
+from .models import Bookmark, SiteIcon
+from .profiling import timed
+from .reloads import metrics as reload_metrics
+from .resolver import (
+    HELP_KEYS,
+    HELP_URL,
+    CompiledBookmark,
+    MissingParameter,
+    ResolveError,
+    UnknownKey,
+    error_details,
+    find_bookmark,
+    is_browser_url,
+    map_named_parameters,
+    map_parameters,
+    redirect_max_age,
+    resolve_query,
+    split_query,
+    substitute,
+)
+from .reviews import FAILED, QUEUED, QueueFull, review_queue
+from .sharedcache import generation_cached
+from .sharedcache import metrics as shared_cache_metrics
+from .sites import site_map
+from .snapshot import (
+    NAMESPACE_PATTERN,
+    get_snapshot,
+    snapshot_for,
+    snapshot_for_generation,
+)
+from .suggestions import metrics as suggestion_metrics
+from .suggestions import parameter_response, suggestion_response
 
 if TYPE_CHECKING:
     from django.http import HttpRequest
@@ -27,6 +66,25 @@ if TYPE_CHECKING:
 # Get logger for this module
 logger = logging.getLogger(__name__)
 
+# Number of results serialized per streamed chunk by the batch resolve API
+RESOLVE_CHUNK_SIZE = 100
+
+
+def request_namespace(request: HttpRequest) -> str:
+    """The personal namespace of a request (?ns=<name>), or '' for the shared bookmarks"""
+    namespace = str(request.GET.get('ns', ''))
+    return namespace if NAMESPACE_PATTERN.fullmatch(namespace) else ''
+
+
+def listed_bookmarks(namespace: str) -> list[Bookmark]:
+    """Bookmark rows of a namespace for display, personal ones shadowing shared ones, sorted by key"""
+    shared = Bookmark.objects.filter(namespace='').order_by('key')
+    if not namespace:
+        return list(shared)
+    personal = {bookmark.key: bookmark for bookmark in Bookmark.objects.filter(namespace=namespace)}
+    bookmarks = [bookmark for bookmark in shared if bookmark.key not in personal] + list(personal.values())
+    return sorted(bookmarks, key=lambda bookmark: bookmark.key)
+
 
 @require_http_methods(["GET"])
 def search_redirect(request: HttpRequest) -> HttpResponse:
@@ -46,92 +104,40 @@ def search_redirect(request: HttpRequest) -> HttpResponse:
         logger.warning("Empty search query received")
         return HttpResponseNotFound(content="No search query provided")
     
-    # Split the query into parts
-    parts = query.split(None, 1)  # Split into key and rest
-    
-    if not parts:
-        return HttpResponseNotFound(content="Empty search query")
-    
-    key = parts[0]
+    # Split the query into key and rest
+    key, param_string = split_query(query)
+    namespace = request_namespace(request)
     
     # Special case: "h" or "help" - show all bookmarks
-    if key in ('h', 'help'):
+    if key in HELP_KEYS:
         logger.info(f"Redirecting to help/list page for key='{key}'")
-        return redirect('/list/')
-    
-    param_string = parts[1] if len(parts) > 1 else ''
+        return redirect(f'{HELP_URL}?ns={namespace}' if namespace else HELP_URL)
     
-    # Try to find the bookmark
+    # Look the key up in the per-generation snapshot: unknown keys (plain-text
+    # searches) are rejected or sent to the fallback bookmark with one dict
+    # lookup, without touching the database
     try:
-        bookmark = Bookmark.objects.get(key=key)
-        logger.info(f"Found bookmark: key='{key}', url='{bookmark.url}', params='{param_string}'")
-    except Bookmark.DoesNotExist:
+        with timed('lookup'):
+            snapshot = snapshot_for(namespace)
+            bookmark, param_string = find_bookmark(query, snapshot.get, settings.BUNNIFY_FALLBACK_KEY)
+    except UnknownKey as e:
         logger.warning(f"Bookmark not found: key='{key}'")
-        return HttpResponseNotFound(content=f"Bookmark '{key}' not found")
-    
-    url = bookmark.url
-    
-    # Find all placeholders in the URL (e.g., #{pr_id}, #{repo})
-    placeholders = re.findall(r'#\{(\w+)\}', url)
-    
-    if placeholders:
-        # Build parameter mapping
-        param_mapping = {}
-        
-        if len(placeholders) == 1:
-            # Single parameter - use entire param_string
-            if param_string or (bookmark.defaults and placeholders[0] in bookmark.defaults):
-                param_mapping[placeholders[0]] = param_string if param_string else bookmark.defaults[placeholders[0]]
-            else:
-                return HttpResponse(
-                    f"Bookmark '{key}' requires a parameter.\n"
-                    f"Usage: {key} <value>",
-                    status=400
-                )
-        else:
-            # Multiple parameters - split by whitespace  
-            param_values = param_string.split() if param_string else []
-            
-            # Separate required and optional parameters
-            required_params = [p for p in placeholders if p not in (bookmark.defaults or {})]
-            optional_params = [p for p in placeholders if p in (bookmark.defaults or {})]
-            
-            # Map values: required params first, then optional params
-            value_index = 0
-            for placeholder in required_params:
-                if value_index < len(param_values):
-                    param_mapping[placeholder] = param_values[value_index]
-                    value_index += 1
-                else:
-                    return HttpResponse(
-                        f"Bookmark '{key}' requires parameter(s): {', '.join(required_params)}\n"
-                        f"Usage: {key} {' '.join(f'<{p}>' for p in required_params)}"
-                        + (f" [{'  '.join(optional_params)}]" if optional_params else ""),
-                        status=400
-                    )
-            
-            # Map remaining values to optional params, or use defaults
-            for placeholder in optional_params:
-                if value_index < len(param_values):
-                    param_mapping[placeholder] = param_values[value_index]
-                    value_index += 1
-                else:
-                    param_mapping[placeholder] = bookmark.defaults[placeholder]
-        
-        # Replace all placeholders with their values
-        for placeholder, value in param_mapping.items():
-            url = url.replace(f'#{{{placeholder}}}', value)
-    
-    # Check if this is a special protocol (chrome://, about://, etc.)
-    # Browsers block navigation to these URLs from web pages for security
-    # So we display the URL with copy-paste instructions
-    if url.startswith(('chrome://', 'about://', 'file://')):
-        return render(request, 'bookmarks/browser_url.html', {'url': url})
+        return HttpResponseNotFound(content=e.message)
+    if bookmark.key != key:
+        logger.info(f"Unknown key '{key}', using fallback bookmark '{bookmark.key}' for query='{query}'")
+    else:
+        logger.info(f"Found bookmark: key='{key}', url='{bookmark.url}', params='{param_string}'")
     
-    # For normal HTTP(S) URLs, use a standard 302 redirect
-    response = HttpResponse(status=302)
-    response['Location'] = url
-    return response
+    try:
+        with timed('substitution'):
+            param_mapping = map_parameters(bookmark, param_string)
+            url = substitute(bookmark.url, param_mapping)
+    except MissingParameter as e:
+        return HttpResponse(e.message, status=e.status)
+    record_search(namespace, query, bookmark, param_string, param_mapping)
+    
+    with timed('render'):
+        return bookmark_response(request, url, bookmark, snapshot.generation)
 
 
 @require_http_methods(["GET"])
@@ -140,40 +146,52 @@ def redirect_bookmark(request: HttpRequest, key: str) -> HttpResponse:
     Redirect to the bookmark URL, handling parameter substitution
     """
     logger.info(f"Direct bookmark redirect request: key='{key}'")
-    try:
-        bookmark = Bookmark.objects.get(key=key)
-    except Bookmark.DoesNotExist:
+    namespace = request_namespace(request)
+    snapshot = snapshot_for(namespace)
+    bookmark = snapshot.get(key)
+    if bookmark is None:
         logger.warning(f"Bookmark not found for direct access: key='{key}'")
         return HttpResponseNotFound(content=f"Bookmark '{key}' not found")
     
-    url = bookmark.url
-    
-    # Find all placeholders in the URL (e.g., #{pr_id}, #{search_terms})
-    placeholders = re.findall(r'#\{(\w+)\}', url)
-    
-    if placeholders:
-        logger.debug(f"URL contains placeholders: {placeholders}")
-        # Get parameters from query string
-        for placeholder in placeholders:
-            param_value = request.GET.get(placeholder, '')
-            if not param_value:
-                logger.warning(f"Missing required parameter '{placeholder}' for bookmark '{key}'")
-                # Return a helpful error message
-                return HttpResponse(
-                    f"Missing required parameter: {placeholder}\n"
-                    f"Usage: /{key}/?{placeholder}=value",
-                    status=400
-                )
-            # Replace the placeholder with the actual value
-            url = url.replace(f'#{{{placeholder}}}', param_value)
+    # Get parameters for the URL placeholders from the query string
+    try:
+        param_mapping = map_named_parameters(bookmark, request.GET)
+    except MissingParameter as e:
+        logger.warning(f"Missing required parameter '{e.missing[0]}' for bookmark '{key}'")
+        # Return a helpful error message
+        return HttpResponse(e.message, status=e.status)
+    url = substitute(bookmark.url, param_mapping)
+    record_parameters(namespace, key, param_mapping)
     
     logger.info(f"Redirecting to: {url}")
+    return bookmark_response(request, url, bookmark, snapshot.generation)
+
+
+def bookmark_response(request: HttpRequest, url: str, bookmark: CompiledBookmark, generation: str) -> HttpResponse:
+    """
+    Build the response that sends the browser to a resolved bookmark URL
+    """
     # Check if this is a special protocol (chrome://, about://, etc.)
     # Browsers block navigation to these URLs from web pages for security
     # So we display the URL with copy-paste instructions
-    if url.startswith(('chrome://', 'about://', 'file://')):
+    if is_browser_url(url):
         return render(request, 'bookmarks/browser_url.html', {'url': url})
     
+    # Fixed targets may be cached by the browser, so repeat navigations skip the
+    # server. The ETag is the bookmark generation: once the cached redirect
+    # expires, the browser revalidates and gets a 304 until bookmarks change.
+    max_age = redirect_max_age(bookmark, settings.BUNNIFY_REDIRECT_MAX_AGE)
+    if max_age:
+        etag = f'"{generation}"'
+        if request.headers.get('If-None-Match') == etag:
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(status=302)
+            response['Location'] = url
+        response['Cache-Control'] = f'private, max-age={max_age}'
+        response['ETag'] = etag
+        return response
+    
     # For normal HTTP(S) URLs, use a standard 302 redirect
     response = HttpResponse(status=302)
     response['Location'] = url
@@ -184,23 +202,81 @@ def redirect_bookmark(request: HttpRequest, key: str) -> HttpResponse:
 @require_http_methods(["GET"])
 def list_bookmarks(request: HttpRequest) -> HttpResponse:
     """
-    List all available bookmarks, sorted lexicographically by key
+    List bookmarks sorted lexicographically by key: the first page, inside a
+    shell rendered once per generation; the page loads the rest on scroll
     """
     logger.info("List bookmarks request")
-    bookmarks = Bookmark.objects.all().order_by('key')
-    count = bookmarks.count()
-    logger.debug(f"Retrieved {count} bookmarks for listing")
-    
-    # Extract parameter names from URLs for display
-    bookmarks_with_params = []
-    for bookmark in bookmarks:
-        placeholders = re.findall(r'#\{(\w+)\}', bookmark.url)
-        bookmarks_with_params.append({
-            'bookmark': bookmark,
-            'params': placeholders
-        })
+    namespace = request_namespace(request)
+    with timed('lookup'):
+        listing = get_listing(namespace)
+        page, _ = listing.page(limit=settings.BUNNIFY_LIST_PAGE_SIZE)
+    logger.debug(f"Listing the first {len(page)} of {len(listing)} bookmarks")
+    
+    with timed('substitution'):
+        entries = listing.entries(page)
+    
+    with timed('render'):
+        head, tail = listing.shell(namespace)
+        cards = render_to_string('bookmarks/list_cards.html', {'bookmarks': entries})
+        return HttpResponse(head + cards + tail)
+
+
+@never_cache
+@require_http_methods(["GET"])
+def bookmarks_page(request: HttpRequest) -> JsonResponse:
+    """
+    A page of the bookmark list for lazy loading and server-side search
     
-    return render(request, 'bookmarks/list.html', {'bookmarks_with_params': bookmarks_with_params})
+    Query parameters: q (words that the key, description, parameters or URL
+    must all contain), after (the key the previous page ended at), limit, ns.
+    ``next`` is the ``after`` of the following page, null on the last one.
+    """
+    namespace = request_namespace(request)
+    try:
+        limit = min(max(int(request.GET.get('limit', settings.BUNNIFY_LIST_PAGE_SIZE)), 1), MAX_PAGE_SIZE)
+    except ValueError:
+        return JsonResponse({'error': 'limit must be a number'}, status=400)
+    with timed('lookup'):
+        listing = get_listing(namespace)
+        page, cursor = listing.page(str(request.GET.get('q', '')), str(request.GET.get('after', '')), limit)
+    with timed('substitution'):
+        entries = listing.entries(page)
+    with timed('serialize'):
+        for entry in entries:
+            link = entry['link']
+            if link is not None:
+                entry['link'] = {'ok': link.ok, 'status': link.status, 'error': link.error, 'checked_at': link.checked_at}
+        return JsonResponse({
+            'generation': listing.generation,
+            'total': len(listing),
+            'bookmarks': entries,
+            'next': cursor,
+        })
+
+
+@require_http_methods(["GET"])
+def site_icons(request: HttpRequest) -> HttpResponse:
+    """
+    Titles and icons (as data URIs) of all bookmark hosts by origin, in one
+    response for /list/ and /cmd/. The ETag changes when fetch_sites stores
+    new results, so a page load usually costs a bodiless 304.
+    """
+    state = SiteIcon.objects.aggregate(count=Count('id'), latest=Max('fetched_at'))
+    version = hashlib.sha256(f"{state['count']}:{state['latest']}".encode()).hexdigest()[:16]
+    etag = f'"{version}"'
+    if request.headers.get('If-None-Match') == etag:
+        response = HttpResponseNotModified()
+    else:
+        def serialize() -> bytes:
+            with timed('serialize'):
+                return json.dumps({'sites': site_map(SiteIcon.objects.all())}).encode()
+        
+        # Keyed by the version of the stored sites rather than a bookmark generation
+        response = HttpResponse(generation_cached('sites', version, serialize), content_type='application/json')
+    response['ETag'] = etag
+    # Cached by the browser, but revalidated on every page load
+    response['Cache-Control'] = 'no-cache'
+    return response
 
 
 @never_cache
@@ -210,24 +286,34 @@ def cmd_palette(request: HttpRequest) -> HttpResponse:
     Command palette with autocomplete for bookmarks
     """
     logger.info("Command palette request")
-    bookmarks = Bookmark.objects.all().order_by('key')
-    count = bookmarks.count()
-    logger.debug(f"Retrieved {count} bookmarks for command palette")
-    
-    # Prepare bookmark data with params for JavaScript
-    bookmarks_data = []
-    for bookmark in bookmarks:
-        placeholders = re.findall(r'#\{(\w+)\}', bookmark.url)
-        bookmarks_data.append({
-            'key': bookmark.key,
-            'description': bookmark.description,
-            'url': bookmark.url,
-            'params': placeholders
-        })
+    namespace = request_namespace(request)
     
-    return render(request, 'bookmarks/cmd.html', {
-        'bookmarks_json': json.dumps(bookmarks_data)
-    })
+    def palette_json() -> str:
+        with timed('lookup'):
+            bookmarks = listed_bookmarks(namespace)
+        logger.debug(f"Retrieved {len(bookmarks)} bookmarks for command palette")
+        
+        # Prepare bookmark data with params for JavaScript
+        bookmarks_data = []
+        with timed('substitution'):
+            for bookmark in bookmarks:
+                placeholders = re.findall(r'#\{(\w+)\}', bookmark.url)
+                bookmarks_data.append({
+                    'key': bookmark.key,
+                    'description': bookmark.description,
+                    'url': bookmark.url,
+                    'params': placeholders
+                })
+        with timed('serialize'):
+            return json.dumps(bookmarks_data)
+    
+    # Serialized once per namespace generation, by whichever worker serves the palette first
+    bookmarks_json = generation_cached('cmd', snapshot_for(namespace).generation, palette_json)
+    with timed('render'):
+        return render(request, 'bookmarks/cmd.html', {
+            'bookmarks_json': bookmarks_json,
+            'namespace': namespace,
+        })
 
 
 @require_http_methods(["GET"])
@@ -245,7 +331,12 @@ def opensearch(request: HttpRequest) -> HttpResponse:
     Serve OpenSearch description for browser integration
     """
     logger.debug("OpenSearch XML request")
-    return render(request, 'bookmarks/opensearch.xml', content_type='application/opensearchdescription+xml')
+    return render(
+        request,
+        'bookmarks/opensearch.xml',
+        {'namespace': request_namespace(request)},
+        content_type='application/opensearchdescription+xml',
+    )
 
 
 @never_cache
@@ -254,24 +345,26 @@ def bookmark_status(request: HttpRequest) -> JsonResponse:
     """
     Return current bookmark count and content hash for auto-refresh detection
     """
-    count = Bookmark.objects.count()
+    namespace = request_namespace(request)
     
-    # Generate a hash of all bookmark data to detect any changes
-    bookmarks = Bookmark.objects.all().values('key', 'url', 'description').order_by('key')
-    content = json.dumps(list(bookmarks), sort_keys=True)
-    content_hash = hashlib.sha256(content.encode()).hexdigest()
+    def status() -> dict[str, int | str]:
+        bookmarks = [
+            {'key': bookmark.key, 'url': bookmark.url, 'description': bookmark.description}
+            for bookmark in listed_bookmarks(namespace)
+        ]
+        # Generate a hash of all bookmark data to detect any changes
+        content = json.dumps(bookmarks, sort_keys=True)
+        return {'count': len(bookmarks), 'hash': hashlib.sha256(content.encode()).hexdigest()[:16]}
     
-    logger.debug(f"Bookmark status check: count={count}, hash={content_hash}")
+    payload = generation_cached('status', snapshot_for(namespace).generation, status)
+    logger.debug(f"Bookmark status check: count={payload['count']}, hash={payload['hash']}")
     
-    return JsonResponse({
-        'count': count,
-        'hash': content_hash[:16]
-    })
+    return JsonResponse(payload)
 
 
 @never_cache
 @require_http_methods(["GET"])
-def search_suggestions(request: HttpRequest) -> JsonResponse:
+def search_suggestions(request: HttpRequest) -> HttpResponse:
     """
     OpenSearch suggestions API - provides autocomplete suggestions for bookmarks
     Returns suggestions in OpenSearch format: [query, [suggestions], [descriptions], [urls]]
@@ -282,42 +375,132 @@ def search_suggestions(request: HttpRequest) -> JsonResponse:
     if not query:
         return JsonResponse([query, [], [], []], safe=False)
     
+    namespace = request_namespace(request)
+    
+    # After "key ", complete the parameter being typed from previously used values
+    with timed('lookup'):
+        body = parameter_response(query, str(query_param), namespace)
+    if body is not None:
+        logger.debug(f"Parameter suggestions for '{query}': {len(body)} bytes")
+        return HttpResponse(body, content_type='application/json')
+    
     # Split query into parts (key and params)
     parts = query.split(None, 1)
     search_key = parts[0] if parts else query
     
-    # Get matching bookmarks (key starts with search_key or description contains it)
-    bookmarks = Bookmark.objects.filter(
-        models.Q(key__istartswith=search_key) | 
-        models.Q(description__icontains=search_key)
-    )[:10]  # Limit to 10 suggestions
+    # Matching bookmarks (key starts with search_key or description contains it),
+    # ranked and serialized once per bookmark generation
+    with timed('serialize'):
+        body = suggestion_response(query, search_key, namespace)
+    logger.debug(f"Search suggestions for '{query}': {len(body)} bytes")
     
-    # Also include special commands
-    special_commands = []
-    if 'help'.startswith(search_key) or 'h'.startswith(search_key):
-        special_commands.append(('h', 'Show all bookmarks', '/list/'))
-    
-    suggestions = []
-    descriptions = []
-    urls = []
-    
-    # Add special commands first
-    for cmd, desc, url in special_commands:
-        suggestions.append(cmd)
-        descriptions.append(desc)
-        urls.append(f"http://127.0.0.1:8000{url}")
-    
-    # Add matching bookmarks
-    for bookmark in bookmarks:
-        suggestions.append(bookmark.key)
-        descriptions.append(bookmark.description or f"Redirect to {bookmark.url}")
-        # Generate a preview URL
-        urls.append(f"http://127.0.0.1:8000/{bookmark.key}/")
+    # OpenSearch format: [query, [completions], [descriptions], [urls]]
+    return HttpResponse(body, content_type='application/json')
+
+
+@never_cache
+@require_http_methods(["GET"])
+def snapshot_replication(request: HttpRequest) -> HttpResponse:
+    """
+    Snapshot replication API - lets replicas mirror this node's bookmarks
+    GET: Returns the full snapshot {"generation", "digest", "revision", "bookmarks"}
+    GET ?since=<generation>: Returns a delta {"generation", "digest", "revision", "base", "changed", "removed"}
+        when that generation is still known, otherwise the full snapshot
     
-    logger.debug(f"Search suggestions for '{query}': {len(suggestions)} results")
+    The ETag is the generation, so a replica that is up to date gets a bodiless 304.
+    """
+    snapshot = get_snapshot()
+    etag = f'"{snapshot.generation}"'
+    if request.headers.get('If-None-Match') == etag:
+        response = HttpResponseNotModified()
+        response['ETag'] = etag
+        return response
+    
+    since_param = request.GET.get('since', '')
+    base = snapshot_for_generation(str(since_param)) if since_param else None
+    if base is not None:
+        changed, removed = snapshot.diff(base)
+        payload = {
+            'generation': snapshot.generation,
+            'digest': snapshot.digest,
+            'revision': snapshot.revision,
+            'base': base.generation,
+            'changed': changed,
+            'removed': removed,
+        }
+        logger.info(f"Snapshot delta request: {base.generation} -> {snapshot.generation}, {len(changed)} changed, {len(removed)} removed")
+    else:
+        payload = snapshot.to_dict()
+        logger.info(f"Full snapshot request: generation={snapshot.generation}, since='{since_param}'")
+    
+    response = JsonResponse(payload)
+    response['ETag'] = etag
+    return response
+
+
+@never_cache
+@require_http_methods(["GET"])
+def metrics(request: HttpRequest) -> JsonResponse:
+    """
+    Runtime metrics for tuning: suggestion cache hit rates and sizes, shared
+    cache hits per result, parameter history size and dropped values, and the
+    phase timings of recent reloads and of this process's snapshot rebuilds
+    """
+    return JsonResponse({
+        'suggestions': suggestion_metrics(),
+        'shared_cache': shared_cache_metrics(),
+        'param_history': history_metrics(),
+        'reloads': reload_metrics(),
+    })
+
+
+@csrf_exempt
+@require_http_methods(["POST"])
+def resolve_batch(request: HttpRequest) -> HttpResponse:
+    """
+    Batch query resolution API - resolves many search queries in one request
+    Body: {"queries": ["pr 12345", "g django", ...]} (or a bare JSON list)
+    Returns: {"generation": ..., "results": [{"query", "url"} | {"query", "error"}, ...]}
     
-    # OpenSearch format: [query, [completions], [descriptions], [urls]]
-    return JsonResponse([query, suggestions, descriptions, urls], safe=False)
+    Uses the same parameter mapping rules as search_redirect. Results are streamed
+    in chunks so large batches never build the whole response in memory.
+    """
+    try:
+        payload = json.loads(request.body or b'null')
+    except (json.JSONDecodeError, UnicodeDecodeError) as e:
+        return JsonResponse({'error': f'Invalid JSON body: {e}'}, status=400)
+    
+    queries = payload.get('queries') if isinstance(payload, dict) else payload
+    if not isinstance(queries, list) or not all(isinstance(q, str) for q in queries):
+        return JsonResponse({'error': 'Expected {"queries": [<query string>, ...]}'}, status=400)
+    if len(queries) > settings.BUNNIFY_RESOLVE_MAX_QUERIES:
+        return JsonResponse(
+            {'error': f'Too many queries: {len(queries)} (max {settings.BUNNIFY_RESOLVE_MAX_QUERIES})'},
+            status=400
+        )
+    
+    snapshot = get_snapshot()
+    logger.info(f"Batch resolve request: {len(queries)} queries, generation={snapshot.generation}")
+    
+    def stream_results():
+        """Generator that yields the JSON document in chunks of results"""
+        yield f'{{"generation": {json.dumps(snapshot.generation)}, "results": ['
+        separator = ''
+        chunk = []
+        for query in queries:
+            try:
+                result = {'query': query, 'url': resolve_query(query, snapshot.get, settings.BUNNIFY_FALLBACK_KEY)}
+            except ResolveError as e:
+                result = {'query': query, 'error': error_details(e)}
+            chunk.append(json.dumps(result))
+            if len(chunk) == RESOLVE_CHUNK_SIZE:
+                yield separator + ', '.join(chunk)
+                separator, chunk = ', ', []
+        if chunk:
+            yield separator + ', '.join(chunk)
+        yield ']}'
+    
+    return StreamingHttpResponse(stream_results(), content_type='application/json')
 
 
 @never_cache
@@ -342,6 +525,8 @@ def command_history(request: HttpRequest) -> JsonResponse:
             history = history[:50]
             request.session['command_history'] = history
             logger.debug(f"Added command to history: {command}")
+            namespace = request_namespace(request)
+            record_query(namespace, command, snapshot_for(namespace).get)
             return JsonResponse({'status': 'ok', 'history': history})
     
     # GET request - return history
@@ -350,16 +535,11 @@ def command_history(request: HttpRequest) -> JsonResponse:
 
 
 @require_http_methods(["GET"])
-def request_copilot_review(request: HttpRequest) -> HttpResponse | StreamingHttpResponse:
+def request_copilot_review(request: HttpRequest) -> HttpResponse:
     """
-    Request a GitHub Copilot review for a PR and display it in Bunnify with live updates.
+    Request a GitHub Copilot review for a PR: submits a background review job
+    and redirects to its live progress page.
     """
-    import html as html_module
-    import subprocess
-    from pathlib import Path
-
-    from django.http import StreamingHttpResponse
-    
     pr_param = request.GET.get('pr', '')
     pr_number = str(pr_param) if pr_param else ''
     repo_param = request.GET.get('repo', 'shop/world')
@@ -378,17 +558,49 @@ def request_copilot_review(request: HttpRequest) -> HttpResponse | StreamingHttp
         logger.warning(f"Invalid repo format provided: {repo}")
         return HttpResponse(content="Error: Repository must be in format 'owner/name'.", status=400)
     
-    logger.info(f"Requesting private Copilot review with live updates for PR #{pr_number} in {repo}")
-    
     # Path to the private review script
-    script_path = Path(__file__).parent.parent / 'scripts' / 'get_copilot_review.sh'
-    
+    script_path = Path(settings.BUNNIFY_REVIEW_SCRIPT)
     if not script_path.exists():
         logger.error(f"Helper script not found: {script_path}")
         return HttpResponse(content=f"Error: Helper script not found at {script_path}", status=500)
     
+    try:
+        job = review_queue.submit(pr_number, repo)
+    except QueueFull as e:
+        logger.warning(f"Review queue full, rejecting PR #{pr_number} in {repo}: {e}")
+        response = HttpResponse(content=f"Error: Too many reviews in progress ({e}). Try again later.", status=503)
+        response['Retry-After'] = '30'
+        return response
+    
+    logger.info(f"Requesting private Copilot review for PR #{pr_number} in {repo}: job {job.id}")
+    return redirect('bookmarks:review_progress', job_id=job.id)
+
+
+def _js_string(value: str) -> str:
+    """JavaScript string literal that is safe inside a <script> element"""
+    return json.dumps(value).replace('<', '\\u003c')
+
+
+def _cursor_param(request: HttpRequest) -> int:
+    cursor_param = request.GET.get('cursor', '0')
+    return int(cursor_param) if str(cursor_param).isdigit() else 0
+
+
+@require_http_methods(["GET"])
+def review_progress(request: HttpRequest, job_id: str) -> HttpResponse | StreamingHttpResponse:
+    """
+    Live progress page of a review job. Any number of clients can attach at any
+    time: the buffered output is replayed from the start (or from ?cursor=N)
+    and then streamed as the script progresses.
+    """
+    job = review_queue.get(job_id)
+    if job is None:
+        return HttpResponseNotFound(content=f"Review job '{job_id}' not found")
+    pr_number, repo = job.pr_number, job.repo
+    cursor = _cursor_param(request)
+    
     def stream_review():
-        """Generator that yields HTML chunks as the script progresses"""
+        """Generator that yields HTML chunks as the job progresses"""
         # Yield the initial HTML with live update script
         yield f"""<!DOCTYPE html>
 <html>
@@ -510,7 +722,7 @@ def request_copilot_review(request: HttpRequest) -> HttpResponse | StreamingHttp
     </div>
     
     <div class="status">
-        <h2><span class="spinner"></span><span id="status-text">Requesting review...</span></h2>
+        <h2><span class="spinner"></span><span id="status-text">Queued...</span></h2>
     </div>
     
     <div class="log-container">
@@ -526,96 +738,86 @@ def request_copilot_review(request: HttpRequest) -> HttpResponse | StreamingHttp
 </html>
 """
         
-        # Now run the script and stream output
-        try:
-            import fcntl
-            import os
-            import select
-            
-            process = subprocess.Popen(
-                [str(script_path), pr_number, repo],
-                stdout=subprocess.PIPE,
-                stderr=subprocess.STDOUT,
-                text=True,
-                bufsize=1,
-                universal_newlines=True
-            )
-            
-            # Make stdout non-blocking
-            if process.stdout:
-                fd = process.stdout.fileno()
-                fl = fcntl.fcntl(fd, fcntl.F_GETFL)
-                fcntl.fcntl(fd, fcntl.F_SETFL, fl | os.O_NONBLOCK)
-            
-            output_buffer = []
-            review_content = ""
-            in_review_section = False
-            
-            while True:
-                # Check if process has finished
-                if process.poll() is not None:
-                    # Read any remaining output
-                    if process.stdout:
-                        remaining = process.stdout.read()
-                        if remaining:
-                            output_buffer.append(remaining)
-                            for line in remaining.split('\\n'):
-                                if line.strip():
-                                    escaped_line = html_module.escape(line)
-                                    yield f'<script>document.getElementById("log-output").innerHTML += "{escaped_line}\\n";</script>'
-                    break
+        review_content = ""
+        in_review_section = False
+        position = 0
+        while True:
+            lines, state = job.read(position, timeout=15)
+            if state == QUEUED:
+                waiting = review_queue.position(job)
+                if waiting:
+                    yield f'<script>document.getElementById("status-text").textContent = {_js_string(f"Queued (position {waiting})...")};</script>'
+            for line in lines:
+                emit = position >= cursor
+                position += 1
                 
-                # Try to read output
-                if process.stdout:
-                    try:
-                        line = process.stdout.readline()
-                        if line:
-                            output_buffer.append(line)
-                            
-                            # Check for review markers
-                            if "---COPILOT_REVIEW_START---" in line:
-                                in_review_section = True
-                                yield '<script>document.getElementById("status-text").innerHTML = "Processing review...";</script>'
-                                continue
-                            elif "---COPILOT_REVIEW_END---" in line:
-                                in_review_section = False
-                                # Display the review
-                                if review_content:
-                                    escaped_review = html_module.escape(review_content.strip())
-                                    yield f'<script>document.getElementById("review-content").textContent = "{escaped_review}"; document.getElementById("review-section").classList.add("show"); document.querySelector(".spinner").style.display = "none"; document.getElementById("status-text").className = "complete"; document.getElementById("status-text").innerHTML = "✅ Review complete!";</script>'
-                                continue
-                            
-                            if in_review_section:
-                                review_content += line
-                            else:
-                                # Update log output
-                                escaped_line = html_module.escape(line.rstrip())
-                                if escaped_line:
-                                    yield f'<script>var log = document.getElementById("log-output"); log.innerHTML += "{escaped_line}\\n"; log.scrollTop = log.scrollHeight;</script>'
-                                    
-                                # Update status based on content
-                                if "Posting review request" in line:
-                                    yield '<script>document.getElementById("status-text").innerHTML = "Posting review request...";</script>'
-                                elif "Waiting for Copilot" in line:
-                                    yield '<script>document.getElementById("status-text").innerHTML = "Waiting for Copilot response (max 60s)...";</script>'
-                                elif "Cleaning up" in line:
-                                    yield '<script>document.getElementById("status-text").innerHTML = "Cleaning up...";</script>'
-                                elif "Copilot did not respond" in line:
-                                    yield '<script>document.querySelector(".spinner").style.display = "none"; document.getElementById("status-text").innerHTML = "⏱️ Copilot did not respond within timeout";</script>'
-                    except (IOError, BlockingIOError):
-                        # No data available, wait a bit
-                        import time
-                        time.sleep(0.1)
-            
-            # Final status
-            if not review_content:
-                yield '<script>document.querySelector(".spinner").style.display = "none"; document.getElementById("status-text").className = "complete"; document.getElementById("status-text").innerHTML = "⏱️ Review completed (timeout or no response)";</script>'
-            
-            process.wait()
+                # Check for review markers
+                if "---COPILOT_REVIEW_START---" in line:
+                    in_review_section = True
+                    if emit:
+                        yield '<script>document.getElementById("status-text").textContent = "Processing review...";</script>'
+                    continue
+                elif "---COPILOT_REVIEW_END---" in line:
+                    in_review_section = False
+                    # Display the review
+                    if review_content:
+                        yield f'<script>document.getElementById("review-content").textContent = {_js_string(review_content.strip())}; document.getElementById("review-section").classList.add("show"); document.querySelector(".spinner").style.display = "none"; document.getElementById("status-text").className = "complete"; document.getElementById("status-text").textContent = "✅ Review complete!";</script>'
+                    continue
+                
+                if in_review_section:
+                    review_content += line + "\n"
+                elif emit and line.strip():
+                    # Update log output
+                    yield f'<script>var log = document.getElementById("log-output"); log.textContent += {_js_string(line + chr(10))}; log.scrollTop = log.scrollHeight;</script>'
+                    
+                    # Update status based on content
+                    if "Posting review request" in line:
+                        yield '<script>document.getElementById("status-text").textContent = "Posting review request...";</script>'
+                    elif "Waiting for Copilot" in line:
+                        yield '<script>document.getElementById("status-text").textContent = "Waiting for Copilot response (max 60s)...";</script>'
+                    elif "Cleaning up" in line:
+                        yield '<script>document.getElementById("status-text").textContent = "Cleaning up...";</script>'
+                    elif "Copilot did not respond" in line:
+                        yield '<script>document.querySelector(".spinner").style.display = "none"; document.getElementById("status-text").textContent = "⏱️ Copilot did not respond within timeout";</script>'
             
-        except Exception as e:
-            logger.error(f"Error during streaming: {e}", exc_info=True)
-            yield f'<script>document.querySelector(".spinner").style.display = "none"; document.getElementById("status-text").innerHTML = "❌ Error: {html_module.escape(str(e))}";</script>'
+            if job.finished and position >= len(job.lines):
+                break
+            if not lines:
+                # Keep-alive while waiting; a closed connection only detaches this client
+                yield '\n'
+        
+        # Final status
+        if state == FAILED and not review_content:
+            yield f'<script>document.querySelector(".spinner").style.display = "none"; document.getElementById("status-text").textContent = {_js_string(f"❌ Review failed (exit code {job.returncode})")};</script>'
+        elif not review_content:
+            yield '<script>document.querySelector(".spinner").style.display = "none"; document.getElementById("status-text").className = "complete"; document.getElementById("status-text").textContent = "⏱️ Review completed (timeout or no response)";</script>'
     
-    from django.http import StreamingHttpResponse
     return StreamingHttpResponse(stream_review(), content_type='text/html')
+
+
+@never_cache
+@require_http_methods(["GET"])
+def review_status(request: HttpRequest, job_id: str) -> JsonResponse:
+    """
+    Review job API - state and buffered output of a review job
+    GET ?cursor=N: Returns {"id", "pr", "repo", "state", "position", "lines", "cursor"}
+        with the output lines from N on; pass the returned cursor to get only newer lines
+    GET ?wait=S: Waits up to S seconds (max 30) for new output before answering
+    """
+    job = review_queue.get(job_id)
+    if job is None:
+        return JsonResponse({'error': f"Review job '{job_id}' not found"}, status=404)
+    cursor = _cursor_param(request)
+    wait_param = request.GET.get('wait', '0')
+    wait = min(float(wait_param), 30.0) if str(wait_param).replace('.', '', 1).isdigit() else 0.0
+    lines, state = job.read(cursor, timeout=wait)
+    return JsonResponse({
+        'id': job.id,
+        'pr': job.pr_number,
+        'repo': job.repo,
+        'state': state,
+        'position': review_queue.position(job),
+        'lines': lines,
+        'cursor': cursor + len(lines),
+        'returncode': job.returncode,
+    })
@@ -9,8 +9,16 @@ https://docs.djangoproject.com/en/6.0/howto/deployment/asgi/
 
 import os
 
+from django.conf import settings
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'bunnify.settings')
 
 application = get_asgi_application()
+
+# Answer /search/ and /<key>/ redirects from the in-memory bookmark snapshot,
+# skipping the middleware stack; everything else falls through to Django
+if settings.BUNNIFY_FAST_PATH:
+    from bookmarks.fastpath import FastPathASGI
+
+    application = FastPathASGI(application)
@@ -10,22 +10,40 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/6.0/ref/settings/
 """
 
+import os
 from pathlib import Path
 
+from django.core.exceptions import ImproperlyConfigured
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
 
+# Settings profile: 'development' (default) or 'production'.
+# Production turns DEBUG off (no per-request SQL query log), drops the admin with
+# its auth and messages middleware, and always uses the cached template loader.
+BUNNIFY_ENV = os.environ.get('BUNNIFY_ENV', 'development').lower()
+PRODUCTION = BUNNIFY_ENV == 'production'
+
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/6.0/howto/deployment/checklist/
 
+# The production profile has no fallback for these: a missing one fails startup
+if PRODUCTION:
+    missing = [name for name in ('BUNNIFY_SECRET_KEY', 'BUNNIFY_ALLOWED_HOSTS') if not os.environ.get(name)]
+    if missing:
+        raise ImproperlyConfigured(f"BUNNIFY_ENV=production requires {' and '.join(missing)} to be set")
+
 # SECURITY WARNING: keep the secret key used in production secret!
-SECRET_KEY = 'django-insecure--399tt_+5^q05=s3(ypxc3mez)qzo61dsoj7ok5u!#oyl$*ngq'
+SECRET_KEY = os.environ.get(
+    'BUNNIFY_SECRET_KEY',
+    'django-insecure--399tt_+5^q05=s3(ypxc3mez)qzo61dsoj7ok5u!#oyl$*ngq',
+)
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+DEBUG = not PRODUCTION
 
-ALLOWED_HOSTS = ['*']
+ALLOWED_HOSTS = os.environ.get('BUNNIFY_ALLOWED_HOSTS', '*').split(',')
 
 
 # Application definition
@@ -43,6 +61,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # First, so its Server-Timing total covers the rest of the stack (inactive unless enabled)
+    'bookmarks.profiling.ServerTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -52,37 +72,110 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+TEMPLATE_CONTEXT_PROCESSORS = [
+    'django.template.context_processors.request',
+    'django.contrib.auth.context_processors.auth',
+    'django.contrib.messages.context_processors.messages',
+]
+
+if PRODUCTION:
+    # The bookmark views only use sessions (command history); the admin needs
+    # auth and messages on every request, so it is development-only
+    ADMIN_APPS = {'django.contrib.admin', 'django.contrib.messages'}
+    INSTALLED_APPS = [app for app in INSTALLED_APPS if app not in ADMIN_APPS]
+    MIDDLEWARE = [
+        m for m in MIDDLEWARE
+        if m not in ('django.contrib.auth.middleware.AuthenticationMiddleware',
+                     'django.contrib.messages.middleware.MessageMiddleware')
+    ]
+    TEMPLATE_CONTEXT_PROCESSORS = ['django.template.context_processors.request']
+
 ROOT_URLCONF = 'bunnify.urls'
 
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [],
-        'APP_DIRS': True,
+        'APP_DIRS': not PRODUCTION,
         'OPTIONS': {
-            'context_processors': [
-                'django.template.context_processors.request',
-                'django.contrib.auth.context_processors.auth',
-                'django.contrib.messages.context_processors.messages',
-            ],
+            'context_processors': TEMPLATE_CONTEXT_PROCESSORS,
         },
     },
 ]
 
+if PRODUCTION:
+    # Compile each template once per process
+    TEMPLATES[0]['OPTIONS']['loaders'] = [
+        ('django.template.loaders.cached.Loader', ['django.template.loaders.app_directories.Loader']),
+    ]
+
 WSGI_APPLICATION = 'bunnify.wsgi.application'
 
 
 # Database
 # https://docs.djangoproject.com/en/6.0/ref/settings/#databases
 
+#
+# Storage mode: by default SQLite runs in WAL mode so that the bookmark watcher
+# can rewrite the Bookmark table while the server keeps reading the last
+# committed version (readers never wait on the reload writer). Set
+# BUNNIFY_SQLITE_WAL=false to fall back to SQLite's rollback journal.
+SQLITE_WAL = os.environ.get('BUNNIFY_SQLITE_WAL', 'true').lower() == 'true'
+
+SQLITE_PRAGMAS = [
+    'PRAGMA journal_mode=WAL',
+    'PRAGMA synchronous=NORMAL',  # Durable across app crashes; fsync only at checkpoints
+    'PRAGMA mmap_size=268435456',  # Serve reads from a 256 MB memory map
+] if SQLITE_WAL else []
+
+# Keep one connection per server thread instead of reconnecting on every request.
+# Connections are health-checked before reuse. 0 closes them after each request;
+# production keeps them for the life of the process unless this is set.
+CONN_MAX_AGE = (
+    int(os.environ['BUNNIFY_CONN_MAX_AGE']) if 'BUNNIFY_CONN_MAX_AGE' in os.environ
+    else None if PRODUCTION else 600
+)
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'NAME': Path(os.environ.get('BUNNIFY_DB_PATH', BASE_DIR / 'db.sqlite3')),
+        'CONN_MAX_AGE': CONN_MAX_AGE,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'init_command': ';'.join(SQLITE_PRAGMAS),
+            # Writers take the write lock up front and wait for it (busy timeout)
+            # instead of failing with "database is locked" on lock upgrade
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': 20,
+        },
     }
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/6.0/topics/cache/
+
+# Shared by every worker process: one SQLite file, bounded in bytes (oldest entries evicted first)
+BUNNIFY_CACHE_FILE = Path(os.environ.get('BUNNIFY_CACHE_FILE', BASE_DIR / 'bunnify.cache.sqlite3'))
+BUNNIFY_CACHE_MAX_BYTES = int(os.environ.get('BUNNIFY_CACHE_MAX_BYTES', str(64 * 1024 * 1024)))
+# Release label in shared cache keys, so results rendered by the previous code are never served
+# after a deploy; by default a hash of the bookmarks app's code and templates
+BUNNIFY_RELEASE = os.environ.get('BUNNIFY_RELEASE', '')
+
+CACHES = {
+    'default': {
+        'BACKEND': 'bookmarks.sharedcache.SQLiteCache',
+        'LOCATION': str(BUNNIFY_CACHE_FILE),
+        'TIMEOUT': 300,
+        'OPTIONS': {'MAX_BYTES': BUNNIFY_CACHE_MAX_BYTES},
+    }
+}
+
+# Tests get a temporary cache file instead of BUNNIFY_CACHE_FILE (see bookmarks/testrunner.py)
+TEST_RUNNER = 'bookmarks.testrunner.BunnifyTestRunner'
+
+
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
 
@@ -119,10 +212,88 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+# Compiled bookmark snapshot, rewritten by load_bookmarks after every reload.
+# Server processes watch it to know when to rebuild their in-memory lookups.
+BUNNIFY_SNAPSHOT_FILE = Path(os.environ.get('BUNNIFY_SNAPSHOT_FILE', BASE_DIR / 'bunnify.snapshot.json'))
+
+# Number of recent bookmark generations kept in memory to serve replicas deltas (/api/snapshot/)
+BUNNIFY_SNAPSHOT_HISTORY = int(os.environ.get('BUNNIFY_SNAPSHOT_HISTORY', '8'))
+
+# Per-user namespaces (?ns=<name>): snapshots of at most this many namespaces are kept in
+# memory; each holds only the namespace's personal bookmarks
+BUNNIFY_NAMESPACE_CACHE_SIZE = int(os.environ.get('BUNNIFY_NAMESPACE_CACHE_SIZE', '1000'))
+
+# Number of recent reloads whose phase timings are kept in the reload history
+# (bunnify.snapshot.reloads.jsonl next to the snapshot file), served by /api/metrics/
+BUNNIFY_RELOAD_HISTORY = int(os.environ.get('BUNNIFY_RELOAD_HISTORY', '50'))
+
+# Answer redirect routes in bunnify/wsgi.py and bunnify/asgi.py before the Django middleware stack
+BUNNIFY_FAST_PATH = os.environ.get('BUNNIFY_FAST_PATH', 'true').lower() == 'true'
+
+# Bookmark that receives the whole query when the first word is not a known key,
+# e.g. 'g' turns "django queryset docs" into a Google search instead of a 404
+BUNNIFY_FALLBACK_KEY = os.environ.get('BUNNIFY_FALLBACK_KEY', '')
+
+# Browser cache lifetime (seconds) of redirects to parameterless bookmarks; 0 disables caching.
+# Bookmarks can override it with a "cache" value in bunnify.json.
+BUNNIFY_REDIRECT_MAX_AGE = int(os.environ.get('BUNNIFY_REDIRECT_MAX_AGE', '0'))
+
+# Directory of the static redirects for a front proxy (manage.py export_redirects), rewritten
+# on every reload of the shared bookmarks; empty disables the export
+BUNNIFY_EXPORT_DIR = os.environ.get('BUNNIFY_EXPORT_DIR', '')
+
+# Number of longer-prefix suggestion responses kept in the LRU cache
+# (1-2 character prefixes are always precomputed per bookmark generation)
+BUNNIFY_SUGGESTION_CACHE_SIZE = int(os.environ.get('BUNNIFY_SUGGESTION_CACHE_SIZE', '1024'))
+
+# Bookmarks per page of /list/; further pages load from /api/bookmarks/ as the list scrolls
+BUNNIFY_LIST_PAGE_SIZE = int(os.environ.get('BUNNIFY_LIST_PAGE_SIZE', '100'))
+
+# Number of previously used parameter values remembered for omnibox completions
+# (least recently used values are evicted first)
+BUNNIFY_PARAM_HISTORY_SIZE = int(os.environ.get('BUNNIFY_PARAM_HISTORY_SIZE', '10000'))
+# Values waiting for the history thread; beyond this, new values are dropped rather than
+# making requests wait (counted in /api/metrics/ under param_history)
+BUNNIFY_PARAM_HISTORY_QUEUE_SIZE = int(os.environ.get('BUNNIFY_PARAM_HISTORY_QUEUE_SIZE', '10000'))
+
+# Unix domain socket of the shell resolver (manage.py serve_socket), used by the bash and
+# zsh completions in scripts/; they read the same BUNNIFY_SOCKET environment variable
+BUNNIFY_SOCKET = Path(os.environ.get('BUNNIFY_SOCKET', Path('/tmp') / f'bunnify-{os.getuid()}.sock'))
+
+# Maximum number of queries accepted by one POST /api/resolve/ request
+BUNNIFY_RESOLVE_MAX_QUERIES = int(os.environ.get('BUNNIFY_RESOLVE_MAX_QUERIES', '10000'))
+
+# Copilot review jobs (/review-pr/): at most BUNNIFY_REVIEW_WORKERS review scripts run at
+# once and up to BUNNIFY_REVIEW_MAX_QUEUED more wait; further requests get a 503.
+# Scripts still running after BUNNIFY_REVIEW_TIMEOUT seconds are killed.
+BUNNIFY_REVIEW_SCRIPT = Path(os.environ.get('BUNNIFY_REVIEW_SCRIPT', BASE_DIR / 'scripts' / 'get_copilot_review.sh'))
+BUNNIFY_REVIEW_WORKERS = int(os.environ.get('BUNNIFY_REVIEW_WORKERS', '2'))
+BUNNIFY_REVIEW_MAX_QUEUED = int(os.environ.get('BUNNIFY_REVIEW_MAX_QUEUED', '10'))
+BUNNIFY_REVIEW_TIMEOUT = int(os.environ.get('BUNNIFY_REVIEW_TIMEOUT', '300'))
+
+# Link checks (manage.py check_links): results younger than BUNNIFY_LINK_CHECK_TTL seconds
+# are reused instead of probing the URL again, and are shown on /list/
+BUNNIFY_LINK_CHECK_TTL = int(os.environ.get('BUNNIFY_LINK_CHECK_TTL', str(24 * 3600)))
+BUNNIFY_LINK_CHECK_TIMEOUT = float(os.environ.get('BUNNIFY_LINK_CHECK_TIMEOUT', '10'))
+BUNNIFY_LINK_CHECK_PER_HOST = int(os.environ.get('BUNNIFY_LINK_CHECK_PER_HOST', '4'))
+
+# Site icons and titles (manage.py fetch_sites): each bookmark host is fetched again after
+# BUNNIFY_SITE_TTL seconds; icons above BUNNIFY_SITE_ICON_MAX_BYTES are skipped, and once all
+# icons together exceed BUNNIFY_SITE_CACHE_MAX_BYTES the least recently fetched are dropped
+BUNNIFY_SITE_TTL = int(os.environ.get('BUNNIFY_SITE_TTL', str(7 * 24 * 3600)))
+BUNNIFY_SITE_ICON_MAX_BYTES = int(os.environ.get('BUNNIFY_SITE_ICON_MAX_BYTES', str(32 * 1024)))
+BUNNIFY_SITE_CACHE_MAX_BYTES = int(os.environ.get('BUNNIFY_SITE_CACHE_MAX_BYTES', str(2 * 1024 * 1024)))
+
+# Per-request instrumentation (bookmarks/profiling.py): a Server-Timing header with the
+# phase breakdown of each view, and cProfile/tracemalloc dumps of 1 in N requests
+# (0 disables sampling) or of requests sent with an X-Bunnify-Profile header
+BUNNIFY_SERVER_TIMING = os.environ.get('BUNNIFY_SERVER_TIMING', 'false').lower() == 'true'
+BUNNIFY_PROFILE_SAMPLE_RATE = int(os.environ.get('BUNNIFY_PROFILE_SAMPLE_RATE', '0'))
+BUNNIFY_PROFILE_HEADER = os.environ.get('BUNNIFY_PROFILE_HEADER', 'false').lower() == 'true'
+BUNNIFY_PROFILE_DIR = Path(os.environ.get('BUNNIFY_PROFILE_DIR', Path('/tmp') / 'bunnify-profiles'))
+
 # Logging Configuration
-import os
 import sys
-from pathlib import Path
 
 # Get log level from environment variable, default to WARNING
 LOG_LEVEL = os.environ.get('BUNNIFY_LOG_LEVEL', 'WARNING').upper()
@@ -6,6 +6,12 @@ import sys
 
 def main():
     """Run administrative tasks."""
+    if sys.argv[1:2] == ['resolve']:
+        # Answer from the compiled snapshot without booting Django (fast startup)
+        from bookmarks.cli import main as resolve_main
+        exit_code = resolve_main(sys.argv[2:])
+        if exit_code is not None:
+            sys.exit(exit_code)
     os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'bunnify.settings')
     try:
         from django.core.management import execute_from_command_line
@@ -0,0 +1,128 @@
+# Bash completion and the `bunny` command for Bunnify
+#
+# Answered by the resolver socket that bunnify-server starts (manage.py serve_socket),
+# so completing a key or a parameter never goes through HTTP or Django.
+#
+# Usage (e.g. in ~/.bashrc):
+#     source ~/work/bunnify/scripts/bunny-completion.bash
+#
+#     bunny pr<TAB>          # complete bookmark keys
+#     bunny pr 12<TAB>       # complete previously used parameter values
+#     bunny pr 12345         # open the resolved URL in the browser
+#
+# Environment:
+#     BUNNIFY_SOCKET    socket path (default: /tmp/bunnify-<uid>.sock, like the server)
+#     BUNNIFY_NS        personal namespace to resolve and complete in
+#
+# Bash cannot open Unix sockets itself: one connection is kept open through a
+# coprocess (socat, nc -U or python3), so each request is a single round trip.
+
+_bunny_socket="${BUNNIFY_SOCKET:-/tmp/bunnify-$(id -u).sock}"
+_bunny_reply=()
+
+# Relays stdin to the socket and the socket to stdout when neither socat nor nc is installed
+_bunny_bridge='
+import os, socket, sys, threading
+s = socket.socket(socket.AF_UNIX)
+s.connect(sys.argv[1])
+def pump():
+    while data := s.recv(65536):
+        os.write(1, data)
+    os._exit(0)
+threading.Thread(target=pump, daemon=True).start()
+while data := os.read(0, 65536):
+    s.sendall(data)
+'
+
+_bunny_disconnect() {
+    if [ -n "${_BUNNY_CONN_PID:-}" ]; then
+        kill "$_BUNNY_CONN_PID" 2>/dev/null
+        wait "$_BUNNY_CONN_PID" 2>/dev/null
+    fi
+    unset _BUNNY_CONN_PID
+}
+
+_bunny_connect() {
+    if [ -n "${_BUNNY_CONN_PID:-}" ] && kill -0 "$_BUNNY_CONN_PID" 2>/dev/null; then
+        return 0
+    fi
+    _bunny_disconnect
+    [ -S "$_bunny_socket" ] || return 1
+
+    # Job control messages of the coprocess would end up in the middle of the prompt
+    if command -v socat > /dev/null 2>&1; then
+        { coproc _BUNNY_CONN { exec socat - "UNIX-CONNECT:$_bunny_socket"; }; } 2>/dev/null
+    elif command -v nc > /dev/null 2>&1; then
+        { coproc _BUNNY_CONN { exec nc -U "$_bunny_socket"; }; } 2>/dev/null
+    elif command -v python3 > /dev/null 2>&1; then
+        { coproc _BUNNY_CONN { exec python3 -c "$_bunny_bridge" "$_bunny_socket"; }; } 2>/dev/null
+    else
+        return 1
+    fi
+    disown "$_BUNNY_CONN_PID" 2>/dev/null
+
+    if [ -n "${BUNNIFY_NS:-}" ]; then
+        _bunny_request ns "$BUNNIFY_NS" || return 1
+    fi
+}
+
+# Send one request; the response lines go to _bunny_reply. Fails on an error response.
+_bunny_request() {
+    local header line count i
+    _bunny_reply=()
+    _bunny_connect || return 1
+    if ! printf '%s %s\n' "$1" "$2" >&"${_BUNNY_CONN[1]}" 2>/dev/null ||
+        ! IFS= read -r -t 2 -u "${_BUNNY_CONN[0]}" header; then
+        _bunny_disconnect
+        return 1
+    fi
+    if [[ "$header" != "ok "* ]]; then
+        header="${header#error }"
+        printf 'bunny: %s\n' "${header#* }" >&2
+        return 1
+    fi
+    count="${header#ok }"
+    for ((i = 0; i < count; i++)); do
+        if ! IFS= read -r -t 2 -u "${_BUNNY_CONN[0]}" line; then
+            _bunny_disconnect
+            return 1
+        fi
+        _bunny_reply+=("$line")
+    done
+}
+
+_bunny_complete() {
+    local cur="${COMP_WORDS[COMP_CWORD]}" query entry value
+    COMPREPLY=()
+    if ((COMP_CWORD == 1)); then
+        _bunny_request keys "$cur" || return 0
+    else
+        # Everything typed after the command name, up to the cursor
+        query="${COMP_LINE:0:COMP_POINT}"
+        query="${query#"${COMP_WORDS[0]}"}"
+        _bunny_request params "$query" || return 0
+    fi
+    for entry in "${_bunny_reply[@]}"; do
+        value="${entry%%$'\t'*}"
+        printf -v value '%q' "$value"
+        COMPREPLY+=("$value")
+    done
+}
+
+bunny() {
+    if [ $# -eq 0 ]; then
+        echo "Usage: bunny <key> [parameters...]" >&2
+        return 1
+    fi
+    _bunny_request resolve "$*" || return 1
+    local url="${_bunny_reply[0]}"
+    if [[ "$OSTYPE" == darwin* ]]; then
+        open "$url"
+    elif command -v xdg-open > /dev/null 2>&1; then
+        xdg-open "$url" > /dev/null 2>&1
+    else
+        printf '%s\n' "$url"
+    fi
+}
+
+complete -F _bunny_complete bunny